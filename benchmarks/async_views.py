@@ -0,0 +1,141 @@
+"""Concurrent vote flow against a running server, sync vs async views.
+
+Every client logs in then repeat detail page, vote and results page of one
+question. Run it once against the sync views under WSGI and once against
+the async views under ASGI to compare latency of concurrent requests:
+
+    POLLS_ASYNC_VIEWS=False gunicorn -c gunicorn.conf.py mysite.wsgi &
+    python -m benchmarks.async_views http://127.0.0.1:8000
+    POLLS_ASYNC_VIEWS=True gunicorn -c gunicorn.conf.py \\
+        -k uvicorn.workers.UvicornWorker mysite.asgi &
+    python -m benchmarks.async_views http://127.0.0.1:8000
+
+The ASGI run needs ``uvicorn`` installed.
+
+Usage:
+    python -m benchmarks.async_views BASE_URL [--question ID]
+        [--username NAME] [--password PASSWORD]
+        [--concurrency N] [--duration SECONDS]
+"""
+
+import argparse
+import http.cookiejar
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from benchmarks.common import format_summary, summarize
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+CHOICE_INPUT = re.compile(r'name="choice"[^>]*value="(\d+)"')
+
+
+class Client:
+    """Browser-like client that keep cookies of its own session."""
+
+    def __init__(self, base_url: str):
+        """Create a client of the server at base_url."""
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, path: str, data: dict = None) -> str:
+        """GET path, or POST data to it, and return the page."""
+        body = urllib.parse.urlencode(data).encode() if data else None
+        request = urllib.request.Request(self.base_url + path, data=body)
+        request.add_header("Referer", self.base_url + path)
+        with self.opener.open(request, timeout=30) as response:
+            return response.read().decode()
+
+    def post_form(self, path: str, page: str, data: dict) -> str:
+        """POST data with the CSRF token of page."""
+        data = dict(data, csrfmiddlewaretoken=CSRF_INPUT.search(page).group(1))
+        return self.request(path, data)
+
+    def login(self, username: str, password: str) -> None:
+        """Log in with the login form."""
+        page = self.request("/accounts/login/")
+        self.post_form(
+            "/accounts/login/",
+            page,
+            {"username": username, "password": password}
+        )
+
+
+def timed(latencies: dict, name: str, func, *args):
+    """Call func and record its latency under name."""
+    start = time.perf_counter()
+    result = func(*args)
+    latencies[name].append(time.perf_counter() - start)
+    return result
+
+
+def vote_flow(client: Client, question: int, latencies: dict, turn: int) -> None:
+    """Open detail page, vote for one of the choices and open results."""
+    detail = f"/polls/{question}/"
+    page = timed(latencies, "detail", client.request, detail)
+    choices = CHOICE_INPUT.findall(page)
+    if not choices:
+        raise ValueError(f"Question {question} isn't open for voting")
+    timed(
+        latencies, "vote", client.post_form,
+        f"/polls/{question}/vote/", page,
+        {"choice": choices[turn % len(choices)]}
+    )
+    timed(latencies, "results", client.request, f"/polls/{question}/results/")
+
+
+def worker(args, deadline: float, latencies: dict, errors: list) -> None:
+    """Log in then repeat the vote flow until deadline."""
+    client = Client(args.base_url)
+    try:
+        client.login(args.username, args.password)
+    except (urllib.error.URLError, OSError) as err:
+        errors.append(err)
+        return
+
+    turn = 0
+    while time.monotonic() < deadline:
+        try:
+            vote_flow(client, args.question, latencies, turn)
+        except (urllib.error.URLError, OSError, ValueError) as err:
+            errors.append(err)
+        turn += 1
+
+
+def main():
+    """Run the vote flow from many clients and print latency per page."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base_url")
+    parser.add_argument("--question", type=int, default=2)
+    parser.add_argument("--username", default="demo1")
+    parser.add_argument("--password", default="hackme11")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    latencies = {"detail": [], "vote": [], "results": []}
+    errors = []
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(args, deadline, latencies, errors))
+        for _ in range(args.concurrency)
+    ]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    for name, samples in latencies.items():
+        print(format_summary(name, summarize(samples, elapsed)))
+    print(f"errors {len(errors)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Helpers shared by the benchmarks."""
+
+import statistics
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    """Return the given percentile of samples (nearest rank)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict[str, float]:
+    """Return throughput and latency summary of a run.
+
+    Args:
+        latencies (list[float]): seconds taken by each request
+        elapsed (float): wall clock seconds of the whole run
+
+    Returns:
+        dict[str, float]: requests/sec and latency percentiles in ms
+    """
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def format_summary(name: str, summary: dict[str, float]) -> str:
+    """Return one line report of summarize()."""
+    return (
+        f"{name:<24} {summary['requests']:>7} req "
+        f"{summary['rps']:>9.1f} req/s "
+        f"p50 {summary['p50_ms']:>7.1f} ms "
+        f"p95 {summary['p95_ms']:>7.1f} ms "
+        f"p99 {summary['p99_ms']:>7.1f} ms"
+    )
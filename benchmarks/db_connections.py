@@ -0,0 +1,81 @@
+"""Database connection overhead per request.
+
+Serve the same request many times through the Django test client, once
+closing the connection after every request (the old default) and once with
+persistent connections. The test client doesn't close connections, so
+close_old_connections() is called around each request like a real server
+does on request_started and request_finished. Use the database configured
+by the environment:
+
+    python -m benchmarks.db_connections
+    DATABASE_ENGINE=postgresql python -m benchmarks.db_connections
+
+Usage:
+    python -m benchmarks.db_connections [--path P] [--requests N]
+"""
+
+import argparse
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
+django.setup()
+
+from django.db import close_old_connections, connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from benchmarks.common import format_summary, summarize  # noqa: E402
+
+
+def connect_time(count: int) -> float:
+    """Return average seconds to open a new connection and run one query."""
+    start = time.perf_counter()
+    for _ in range(count):
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    connection.close()
+    return (time.perf_counter() - start) / count
+
+
+def serve(client: Client, path: str, count: int, conn_max_age: int) -> dict:
+    """Request path count times with the given CONN_MAX_AGE."""
+    connection.close()
+    connection.settings_dict["CONN_MAX_AGE"] = conn_max_age
+    latencies = []
+    start = time.monotonic()
+    for _ in range(count):
+        begin = time.perf_counter()
+        close_old_connections()
+        client.get(path)
+        close_old_connections()
+        latencies.append(time.perf_counter() - begin)
+    return summarize(latencies, time.monotonic() - start)
+
+
+def main():
+    """Run the benchmark and print latency with and without reuse."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default="/polls/index.json")
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{connection.vendor}: connect + SELECT 1 "
+          f"{connect_time(100) * 1000:.2f} ms")
+
+    client = Client()
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        original = connection.settings_dict["CONN_MAX_AGE"]
+        # Warm up caches so both runs do the same work
+        serve(client, args.path, 10, original)
+        for name, conn_max_age in (("close per request", 0), ("persistent", 60)):
+            summary = serve(client, args.path, args.requests, conn_max_age)
+            print(format_summary(name, summary))
+        connection.settings_dict["CONN_MAX_AGE"] = original
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Throughput, latency and query count of every polls endpoint.
+
+Create a test database, seed it with polls, users and votes built by the
+factories of ``polls/tests/helper.py``, then request every endpoint through
+the Django test client as a logged in user. Report requests/sec, latency
+percentiles and SQL queries per request, and with ``--check`` exit with an
+error when an endpoint run more queries than its budget in QUERY_BUDGETS.
+The test database of the configured engine is used and dropped afterward:
+
+    python -m benchmarks.endpoints
+    python -m benchmarks.endpoints --polls 500 --users 200 --votes-per-user 20
+    DATABASE_ENGINE=postgresql python -m benchmarks.endpoints --check
+
+Usage:
+    python -m benchmarks.endpoints [--polls N] [--users N]
+        [--votes-per-user N] [--requests N] [--seed N] [--check]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse  # noqa: E402
+
+from benchmarks.common import format_summary, summarize  # noqa: E402
+from polls.models import Vote  # noqa: E402
+from polls.tests.helper import (  # noqa: E402
+    create_dummies_question_and_2_choice,
+    create_test_user,
+)
+
+# Most SQL queries a request of each endpoint may run. Query count must not
+# depend on the number of polls or votes, lower a budget when a change save
+# a query so the next regression is caught.
+QUERY_BUDGETS = {
+    "index": 3,
+    "index open": 3,
+    "index.json": 1,
+    "detail": 5,
+    "results": 3,
+    "vote": 9,
+}
+
+
+def seed_dataset(
+    polls: int,
+    users: int,
+    votes_per_user: int,
+    seed: int = None,
+    prefix: str = "bench"
+):
+    """Create polls with two choices, users and their votes.
+
+    A quarter of the polls already ended, the others are open.
+
+    Args:
+        polls (int): number of questions
+        users (int): number of users
+        votes_per_user (int): questions each user vote on, at most polls
+        seed (int | None): seed of the random choices
+        prefix (str): prefix of usernames
+
+    Returns:
+        tuple[list[Question], list[User]]: created questions and users
+    """
+    rng = random.Random(seed)
+    questions = []
+    choices = []
+    for index in range(polls):
+        question, first, second = create_dummies_question_and_2_choice(
+            f"Benchmark question {index}",
+            pub_days=-rng.randint(2, 60),
+            end_days=-1 if index % 4 == 0 else None
+        )
+        questions.append(question)
+        choices.append((first, second))
+
+    voters = [create_test_user(username=f"{prefix}{index}") for index in range(users)]
+    for user in voters:
+        for index in rng.sample(range(polls), min(votes_per_user, polls)):
+            Vote.objects.cast(user, rng.choice(choices[index]))
+    return questions, voters
+
+
+def endpoint_requests(question, choices) -> dict:
+    """Return method, path and data of a request of each endpoint."""
+    return {
+        "index": ("get", reverse("polls:index"), None),
+        "index open": ("get", reverse("polls:index") + "?status=open", None),
+        "index.json": ("get", reverse("polls:index_json"), None),
+        "detail": ("get", reverse("polls:detail", args=(question.id,)), None),
+        "results": ("get", reverse("polls:results", args=(question.id,)), None),
+        # Vote alternate between the two choices so every request write
+        "vote": (
+            "post",
+            reverse("polls:vote", args=(question.id,)),
+            [{"choice": choice.id} for choice in choices],
+        ),
+    }
+
+
+def measure(client: Client, method: str, path: str, data, count: int) -> dict:
+    """Request an endpoint count times.
+
+    Returns:
+        dict: summarize() of the run with the most queries of a request
+    """
+    latencies = []
+    queries = []
+    send = getattr(client, method)
+    with CaptureQueriesContext(connection):
+        start = time.monotonic()
+        for turn in range(count):
+            connection.queries_log.clear()
+            begin = time.perf_counter()
+            send(path, data[turn % len(data)] if data else None)
+            latencies.append(time.perf_counter() - begin)
+            queries.append(len(connection.queries_log))
+        elapsed = time.monotonic() - start
+    return {**summarize(latencies, elapsed), "queries": max(queries)}
+
+
+def run_benchmark(client: Client, question, choices, count: int) -> dict:
+    """Return measure() of every endpoint by name."""
+    results = {}
+    for name, (method, path, data) in endpoint_requests(question, choices).items():
+        # Warm up caches so every request do the same work
+        measure(client, method, path, data, 5)
+        results[name] = measure(client, method, path, data, count)
+    return results
+
+
+def over_budget(results: dict) -> list[str]:
+    """Return endpoints that ran more queries than their budget."""
+    return [
+        f"{name}: {result['queries']} queries, budget {QUERY_BUDGETS[name]}"
+        for name, result in results.items()
+        if result["queries"] > QUERY_BUDGETS[name]
+    ]
+
+
+def main():
+    """Seed a test database, run the benchmark and check query budgets."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--polls", type=int, default=100)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--votes-per-user", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with an error when an endpoint is over its query budget.",
+    )
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            start = time.monotonic()
+            questions, users = seed_dataset(
+                args.polls, args.users, args.votes_per_user, args.seed
+            )
+            print(f"{connection.vendor}: seeded {args.polls} polls, {args.users} users, "
+                  f"{Vote.objects.count()} votes in {time.monotonic() - start:.1f}s")
+
+            question = next(q for q in reversed(questions) if q.can_vote())
+            client = Client()
+            client.force_login(users[0])
+            results = run_benchmark(
+                client, question, list(question.choice_set.all()), args.requests
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    for name, result in results.items():
+        print(f"{format_summary(name, result)} {result['queries']:>3} queries")
+
+    failures = over_budget(results)
+    for failure in failures:
+        print(f"Over query budget: {failure}", file=sys.stderr)
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
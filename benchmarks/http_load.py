@@ -0,0 +1,78 @@
+"""HTTP load test of a running ku-polls server.
+
+Send GET requests to one or more paths from many threads and report
+throughput and latency. Run it once against the development server and
+once against gunicorn to compare them:
+
+    python manage.py runserver 8000 &
+    python -m benchmarks.http_load http://127.0.0.1:8000
+    SERVER_MODE=production ./entrypoint.sh &
+    python -m benchmarks.http_load http://127.0.0.1:8000
+
+Usage:
+    python -m benchmarks.http_load BASE_URL [--path P ...]
+        [--concurrency N] [--duration SECONDS]
+"""
+
+import argparse
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.common import format_summary, summarize
+
+DEFAULT_PATHS = ["/polls/", "/polls/index.json"]
+
+
+def worker(url: str, deadline: float, latencies: list, errors: list) -> None:
+    """Request url again and again until deadline."""
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                response.read()
+        except (urllib.error.URLError, OSError) as err:
+            errors.append(err)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def run(url: str, concurrency: int, duration: float) -> tuple[dict, int]:
+    """Load url from concurrency threads for duration seconds.
+
+    Returns:
+        tuple[dict, int]: summary of the run and number of failed requests
+    """
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=worker, args=(url, deadline, latencies, errors))
+        for _ in range(concurrency)
+    ]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, time.monotonic() - start), len(errors)
+
+
+def main():
+    """Run the load test and print a report per path."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base_url")
+    parser.add_argument("--path", action="append", dest="paths")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    for path in args.paths or DEFAULT_PATHS:
+        summary, errors = run(
+            args.base_url.rstrip("/") + path, args.concurrency, args.duration
+        )
+        print(f"{format_summary(path, summary)} errors {errors}")
+
+
+if __name__ == "__main__":
+    main()
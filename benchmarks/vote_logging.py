@@ -0,0 +1,214 @@
+"""Benchmark of control flow and logging of the vote path.
+
+POST to the real ``polls:vote`` view through ``django.test.Client`` on a
+test database and report CPU time and queries per vote for every outcome
+of the vote path, the ones that log at INFO level (first vote, changed
+vote) and the ones that log at WARNING level (invalid or missing choice).
+Each case runs with the ``polls`` logger at DEBUG, which write every
+record to a file, and at WARNING, which drop the INFO records before they
+are formatted.
+
+Every case is measured twice: with the current view and, as a baseline,
+with ``exception_driven_vote``. That view is the vote view before the
+exception-driven control flow was removed. It has the same lookups,
+exceptions, ``logger.exception`` calls and eager f-strings, and writes
+the vote with the current ``record_vote`` because the old schema is gone.
+
+Usage:
+    python -m benchmarks.vote_logging [--votes N]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
+django.setup()
+
+from django.contrib import messages  # noqa: E402
+from django.contrib.auth.decorators import login_required  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.http import HttpResponseRedirect  # noqa: E402
+from django.shortcuts import get_object_or_404  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import include, path, reverse  # noqa: E402
+
+from polls import urls as polls_urls  # noqa: E402
+from polls.models import Choice, Question, Vote  # noqa: E402
+from polls.tests.helper import create_dummies_question_and_2_choice  # noqa: E402
+from polls.views import record_vote  # noqa: E402
+
+logger = logging.getLogger("polls")
+
+
+@login_required
+def exception_driven_vote(request, question_id):
+    """Vote view before exception-driven control flow was removed."""
+    username = request.user.username
+
+    try:
+        question = get_object_or_404(Question, pk=question_id)
+        q_text = question.question_text
+    except Question.DoesNotExist as err:
+        logger.exception(f"Non-existent question {question_id} %s", err)
+        messages.warning(request, "Polls doesn't exist")
+        return HttpResponseRedirect(reverse("polls:index"), request)
+
+    if not question.can_vote():
+        messages.warning(request, "Polls is unavailable right now")
+        return HttpResponseRedirect(reverse("polls:index"), request)
+
+    try:
+        selected_choice = question.choice_set.get(pk=request.POST["choice"])
+        c_text = selected_choice.choice_text
+    except KeyError as err:
+        messages.warning(request, "You haven't select the choice")
+        logger.exception(f"User {username} doesn't select a choice %s", err)
+        return HttpResponseRedirect(reverse("polls:detail", args=(question.id,)))
+    except Choice.DoesNotExist as err:
+        messages.warning(request, "You have selected a invalid choice")
+        logger.exception(f"User {username} select invalid choice %s", err)
+        return HttpResponseRedirect(reverse("polls:detail", args=(question.id,)))
+
+    try:
+        vote = request.user.vote_set.get(question=question)
+        previous_choice = vote.choice.choice_text
+        record_vote(request.user, selected_choice)
+        log_string = "User {} change vote from {} to {} for question {}"
+        logger.info(
+            log_string.format(username, previous_choice, c_text, q_text)
+        )
+        message_txt = "You have change your voted from {} to {}"
+        messages.success(request, message_txt.format(previous_choice, c_text))
+    except Vote.DoesNotExist as err:
+        record_vote(request.user, selected_choice)
+        logger.exception(f"User {username} never vote for question {q_text} %s", err)
+        logger.info(f"User {username} has vote {c_text} for question {q_text}")
+        messages.success(request, f"Your vote for {c_text} has been updated")
+
+    return HttpResponseRedirect(reverse("polls:results", args=(question.id,)))
+
+
+# URLconf of the baseline, polls URLs with the exception-driven vote view
+urlpatterns = [
+    path("polls/", include(([
+        pattern for pattern in polls_urls.urlpatterns if pattern.name != "vote"
+    ] + [
+        path("<int:question_id>/vote/", exception_driven_vote, name="vote"),
+    ], "polls"))),
+]
+
+VIEWS = {
+    "baseline": "benchmarks.vote_logging",
+    "current": "mysite.urls",
+}
+
+
+def make_clients(prefix: str, count: int) -> list[Client]:
+    """Return clients logged in as count new users."""
+    users = User.objects.bulk_create([
+        User(username=f"{prefix}{index}", password="!") for index in range(count)
+    ])
+    clients = []
+    for user in users:
+        client = Client()
+        client.force_login(user)
+        clients.append(client)
+    return clients
+
+
+def measure(posts: list) -> tuple[float, float]:
+    """Run (client, url, data) posts, return CPU seconds and queries per vote."""
+    queries = 0
+
+    # Counted here, the query log of CaptureQueriesContext keep 9000 queries
+    def count_query(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_query):
+        start = time.process_time()
+        for client, url, data in posts:
+            response = client.post(url, data)
+            assert response.status_code == 302, response.status_code
+        elapsed = time.process_time() - start
+    return elapsed / len(posts), queries / len(posts)
+
+
+def vote_cases(level_name: str, votes: int) -> dict[str, list]:
+    """Return posts of every case of the vote path."""
+    question, c1, c2 = create_dummies_question_and_2_choice(pub_days=-1)
+    _, other, _ = create_dummies_question_and_2_choice(pub_days=-1)
+    url = reverse("polls:vote", args=(question.id,))
+
+    voter = make_clients(f"{level_name}-change-", 1)[0]
+    voter.post(url, {"choice": c1.id})
+    return {
+        "first vote": [
+            (client, url, {"choice": c1.id})
+            for client in make_clients(f"{level_name}-first-", votes)
+        ],
+        "changed vote": [
+            (voter, url, {"choice": (c2, c1)[turn % 2].id}) for turn in range(votes)
+        ],
+        "invalid choice": [(voter, url, {"choice": other.id})] * votes,
+        "missing choice": [(voter, url, {})] * votes,
+    }
+
+
+def use_log_file(path: str, level: int) -> logging.Handler:
+    """Send records of the polls logger at level or above to path only."""
+    handler = logging.FileHandler(path)
+    handler.setFormatter(
+        logging.Formatter("{asctime} {module} {levelname} {message}", style="{")
+    )
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(level)
+    return handler
+
+
+def main():
+    """Run the benchmark and print CPU time and queries per vote."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--votes", type=int, default=300)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            ALLOWED_HOSTS=["testserver"], POLLS_VOTE_BUFFER=False, POLLS_RATE_LIMIT=False
+        ):
+            for level in (logging.DEBUG, logging.WARNING):
+                level_name = logging.getLevelName(level)
+                handler = use_log_file(os.path.join(directory, f"{level_name}.log"), level)
+                print(f"logger level {level_name}:")
+                for view, urlconf in VIEWS.items():
+                    with override_settings(ROOT_URLCONF=urlconf):
+                        cases = vote_cases(f"{view}-{level_name}", args.votes)
+                        for name, posts in cases.items():
+                            cpu, queries = measure(posts)
+                            print(
+                                f"  {view:<8} {name:<15} {cpu * 1e6:8.1f} us/vote "
+                                f"{queries:5.1f} queries/vote"
+                            )
+                handler.close()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == "__main__":
+    main()
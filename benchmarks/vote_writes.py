@@ -0,0 +1,117 @@
+"""Database writes of the vote flow per session and message storage.
+
+Log in, then repeat a vote followed by the result page it redirects to,
+counting INSERT, UPDATE and DELETE statements by table and reads of the
+session table. Compare session
+engines and message storages on a test database of the configured engine:
+
+    python -m benchmarks.vote_writes
+    python -m benchmarks.vote_writes --buffer
+
+Usage:
+    python -m benchmarks.vote_writes [--votes N] [--buffer]
+"""
+
+import argparse
+import os
+import re
+from collections import Counter
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse  # noqa: E402
+
+from polls.tests.helper import (  # noqa: E402
+    create_dummies_question_and_2_choice,
+    create_test_user,
+)
+
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+MESSAGE_STORAGES = {
+    "session messages": "django.contrib.messages.storage.session.SessionStorage",
+    "cookie messages": "django.contrib.messages.storage.cookie.CookieStorage",
+}
+WRITE = re.compile(r'^\s*(?:INSERT INTO|UPDATE|DELETE FROM)\s+"?(\w+)"?', re.I)
+
+
+def count_writes(queries) -> Counter:
+    """Return number of write statements by table, and of session reads."""
+    writes = Counter()
+    for query in queries:
+        match = WRITE.match(query["sql"])
+        if match:
+            writes[match.group(1)] += 1
+        elif 'FROM "django_session"' in query["sql"]:
+            writes["session reads"] += 1
+    return writes
+
+
+def vote_flow(user, question, choices, votes: int) -> Counter:
+    """Vote then open results votes times, return writes by table."""
+    client = Client()
+    client.force_login(user)
+    with CaptureQueriesContext(connection) as queries:
+        for turn in range(votes):
+            client.post(
+                reverse("polls:vote", args=(question.id,)),
+                {"choice": choices[turn % len(choices)].id},
+                follow=True
+            )
+    return count_writes(queries)
+
+
+def main():
+    """Print writes per vote of every storage combination."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--votes", type=int, default=50)
+    parser.add_argument(
+        "--buffer",
+        action="store_true",
+        help="Queue votes with the vote buffer (pending vote kept in session).",
+    )
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with override_settings(
+            ALLOWED_HOSTS=["testserver"], POLLS_VOTE_BUFFER=args.buffer
+        ):
+            question, c1, c2 = create_dummies_question_and_2_choice(pub_days=-1)
+            user = create_test_user()
+            for session_name, engine in SESSION_ENGINES.items():
+                for message_name, storage in MESSAGE_STORAGES.items():
+                    with override_settings(SESSION_ENGINE=engine, MESSAGE_STORAGE=storage):
+                        writes = vote_flow(user, question, [c1, c2], args.votes)
+                    reads = writes.pop("session reads", 0)
+                    tables = ", ".join(
+                        f"{table} {count / args.votes:.2f}"
+                        for table, count in sorted(writes.items())
+                    )
+                    print(
+                        f"{session_name:<15} {message_name:<17} "
+                        f"{sum(writes.values()) / args.votes:>5.2f} writes/vote "
+                        f"{reads / args.votes:>5.2f} session reads/vote ({tables})"
+                    )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,11 @@
 #!/bin/sh
 python ./manage.py migrate
-python ./manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+
+# SERVER_MODE=production serve with gunicorn (see gunicorn.conf.py),
+# anything else use the development server
+if [ "$SERVER_MODE" = "production" ]; then
+    python ./manage.py collectstatic --noinput
+    exec gunicorn -c gunicorn.conf.py mysite.wsgi
+else
+    exec python ./manage.py runserver 0.0.0.0:8000
+fi
@@ -0,0 +1,62 @@
+"""Gunicorn configuration for serving ku-polls in production.
+
+Every value can be overridden with an environment variable, see sample.env.
+Start with:
+    gunicorn -c gunicorn.conf.py mysite.wsgi
+"""
+
+import multiprocessing
+from pathlib import Path
+
+# ``config`` is itself a gunicorn setting so it can't be a module name here
+from decouple import config as env
+
+# Approximate resident memory of one preloaded Django worker
+WORKER_MEMORY_MB = env('GUNICORN_WORKER_MEMORY_MB', default=64, cast=int)
+
+
+def memory_limit_mb() -> int:
+    """Return memory limit of the container (cgroup v2 or v1) in MB."""
+    for path in (
+        "/sys/fs/cgroup/memory.max",
+        "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+    ):
+        try:
+            value = Path(path).read_text().strip()
+        except OSError:
+            continue
+        if value.isdigit():
+            return int(value) // (1024 * 1024)
+    return env('GUNICORN_MEMORY_LIMIT_MB', default=256, cast=int)
+
+
+def default_workers() -> int:
+    """Return 2 * cores + 1 workers, capped by what fit into memory.
+
+    One share of memory is kept for the master process.
+    """
+    by_cpu = multiprocessing.cpu_count() * 2 + 1
+    by_memory = memory_limit_mb() // WORKER_MEMORY_MB - 1
+    return max(1, min(by_cpu, by_memory))
+
+
+bind = env('GUNICORN_BIND', default="0.0.0.0:8000")
+
+# Process model: a few preloaded processes with threads for blocking I/O
+workers = env('GUNICORN_WORKERS', default=default_workers(), cast=int)
+threads = env('GUNICORN_THREADS', default=4, cast=int)
+worker_class = "gthread"
+preload_app = env('GUNICORN_PRELOAD', default=True, cast=bool)
+
+# Kill a request that take longer than timeout, give in-flight requests
+# graceful_timeout seconds to finish on restart (SIGHUP) or shutdown
+timeout = env('GUNICORN_TIMEOUT', default=30, cast=int)
+graceful_timeout = env('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+keepalive = env('GUNICORN_KEEPALIVE', default=5, cast=int)
+
+# Recycle workers regularly so memory stay under the container limit
+max_requests = env('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = env('GUNICORN_MAX_REQUESTS_JITTER', default=100, cast=int)
+
+accesslog = env('GUNICORN_ACCESS_LOG', default="-")
+errorlog = "-"
@@ -0,0 +1,213 @@
+"""Non-blocking logging pipeline.
+
+Request threads only put log records into a bounded in-memory queue. A single
+listener thread takes records from the queue in batches, write them to a
+size-rotated file and flush the file once per batch. When the queue is full
+records are dropped instead of blocking the request, and the number of
+dropped records is written to the log by the listener.
+"""
+
+import atexit
+import copy
+import logging
+import os
+import queue
+import threading
+import weakref
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+# Put into the queue to stop the listener
+_STOP = object()
+
+# Handlers created by queue_file_handler(), restarted in forked children
+_handlers = weakref.WeakSet()
+
+
+class BatchingRotatingFileHandler(RotatingFileHandler):
+    """Rotating file handler that flush only when asked by the listener."""
+
+    def flush(self):
+        """Skip flush after every record, see flush_batch()."""
+
+    def flush_batch(self):
+        """Flush every record written since the last batch."""
+        super().flush()
+
+
+class BatchingQueueListener:
+    """Thread that write records from a queue to a handler in batches."""
+
+    def __init__(
+        self,
+        records: queue.Queue,
+        handler: BatchingRotatingFileHandler,
+        batch_size: int = 100,
+        flush_interval: float = 1.0
+    ):
+        """Create a listener.
+
+        Args:
+            records (queue.Queue): queue of log records
+            handler (BatchingRotatingFileHandler): handler that write records
+            batch_size (int): maximum records written per flush
+            flush_interval (float): seconds to wait for a record
+        """
+        self.queue = records
+        self.handler = handler
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.reported_dropped = 0
+        self._thread = None
+
+    def start(self) -> None:
+        """Start the listener thread."""
+        self._thread = threading.Thread(
+            target=self._run,
+            name="log-listener",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write every queued record then stop the listener thread."""
+        if self._thread is None:
+            return
+        self.queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        """Listener loop."""
+        running = True
+        while running:
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for record in batch:
+                if record is _STOP:
+                    running = False
+                else:
+                    self.handler.handle(record)
+            self._report_dropped()
+            self.handler.flush_batch()
+
+    def _report_dropped(self) -> None:
+        """Write number of records dropped since the last report."""
+        dropped = self.dropped
+        if dropped == self.reported_dropped:
+            return
+        record = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            "Log queue full, dropped %d record(s) (%d in total)",
+            (dropped - self.reported_dropped, dropped), None
+        )
+        self.reported_dropped = dropped
+        self.handler.handle(record)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Queue handler that drop records instead of blocking when full."""
+
+    def __init__(self, records: queue.Queue, listener: BatchingQueueListener):
+        """Create a handler that put records into the listener queue."""
+        super().__init__(records)
+        self.listener = listener
+        self._dropped_lock = threading.Lock()
+
+    def setFormatter(self, fmt):
+        """Format records with fmt in the listener thread."""
+        super().setFormatter(fmt)
+        self.listener.handler.setFormatter(fmt)
+
+    def prepare(self, record):
+        """Merge message arguments, formatting is left to the listener."""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        """Put record into the queue, count it as dropped if it is full."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.listener.dropped += 1
+
+    def restart_after_fork(self):
+        """Give a forked child process its own queue and listener thread.
+
+        Threads don't survive fork() and the queue lock may have been held
+        by another thread of the parent, so both are created again.
+        """
+        records = queue.Queue(maxsize=self.queue.maxsize)
+        self.queue = records
+        self.listener.queue = records
+        self.listener.dropped = self.listener.reported_dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.listener.start()
+
+    def close(self):
+        """Stop the listener so queued records are written."""
+        self.listener.stop()
+        self.listener.handler.close()
+        super().close()
+
+
+def queue_file_handler(
+    filename: str,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    queue_size: int = 10000,
+    batch_size: int = 100,
+    flush_interval: float = 1.0
+) -> BoundedQueueHandler:
+    """Return handler for LOGGING that write to filename in background.
+
+    Args:
+        filename (str): log file
+        max_bytes (int): rotate file when it reach this size
+        backup_count (int): number of rotated files to keep
+        queue_size (int): maximum number of records waiting to be written
+        batch_size (int): maximum number of records written per flush
+        flush_interval (float): seconds between checks of the queue
+
+    Returns:
+        BoundedQueueHandler: handler to attach to loggers
+    """
+    records = queue.Queue(maxsize=queue_size)
+    file_handler = BatchingRotatingFileHandler(
+        filename,
+        maxBytes=max_bytes,
+        backupCount=backup_count
+    )
+    listener = BatchingQueueListener(
+        records,
+        file_handler,
+        batch_size=batch_size,
+        flush_interval=flush_interval
+    )
+    handler = BoundedQueueHandler(records, listener)
+    listener.start()
+    atexit.register(listener.stop)
+    _handlers.add(handler)
+    return handler
+
+
+def _restart_handlers_after_fork():
+    """Restart listeners in a child of a preforking server (e.g. gunicorn)."""
+    for handler in list(_handlers):
+        if handler.listener._thread is not None:
+            handler.restart_after_fork()
+
+
+os.register_at_fork(after_in_child=_restart_handlers_after_fork)
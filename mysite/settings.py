@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Choices, config
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,14 +42,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First so it measures the whole chain, removed when POLLS_METRICS is off
+    'polls.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Before sessions and auth so static files are served without them
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
 
 ROOT_URLCONF = 'mysite.urls'
@@ -75,25 +78,108 @@ WSGI_APPLICATION = 'mysite.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# DATABASE_ENGINE is sqlite3 (default) or postgresql.
+
+DATABASE_ENGINE = config('DATABASE_ENGINE', default='sqlite3')
+
+if DATABASE_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DATABASE_NAME', default='pollsdb'),
+            'USER': config('DATABASE_USER', default='pollsapp'),
+            'PASSWORD': config('DATABASE_PASSWORD', default='password'),
+            'HOST': config('DATABASE_HOST', default='localhost'),
+            'PORT': config('DATABASE_PORT', default='5432'),
+            'OPTIONS': {},
+        }
+    }
+    if config('DATABASE_POOL', default=False, cast=bool):
+        # psycopg 3 pool shared by the threads of a worker process,
+        # requires psycopg[pool] and doesn't work with persistent connections
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': config('DATABASE_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DATABASE_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DATABASE_POOL_TIMEOUT', default=10.0, cast=float),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DATABASE_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            'OPTIONS': {
+                # Seconds to wait for a lock held by another connection
+                'timeout': config('DATABASE_BUSY_TIMEOUT', default=5.0, cast=float),
+                # Take the write lock when a transaction start instead of
+                # failing when a reading transaction try to write
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA foreign_keys=ON;'
+                ),
+            },
+            # Test on a file too, in-memory databases don't support WAL and
+            # fail concurrent reads instead of waiting for the writer
+            'TEST': {'NAME': str(BASE_DIR / 'test_db.sqlite3')},
+        }
+    }
+
+# Times a vote is written again when SQLite is locked by another writer,
+# waiting a random time up to DELAY * 2 ** attempt seconds (at most 1s)
+POLLS_DB_LOCK_RETRIES = config('POLLS_DB_LOCK_RETRIES', default=5, cast=int)
+POLLS_DB_LOCK_RETRY_DELAY = config('POLLS_DB_LOCK_RETRY_DELAY', default=0.05, cast=float)
+
+# Reuse connection between requests, checked before reuse by health checks
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+DATABASES['default']['CONN_MAX_AGE'] = (
+    0 if 'pool' in DATABASES['default']['OPTIONS']
+    else config('DATABASE_CONN_MAX_AGE', default=60, cast=int)
+)
+
+# development (runserver, one process) or production (gunicorn with several
+# worker processes, see entrypoint.sh and gunicorn.conf.py)
+SERVER_MODE = config('SERVER_MODE', default='development')
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Cached results, versions of the result and poll list pages (their ETags)
+# and shared rate limit buckets must be seen by every process serving
+# requests. LocMemCache is private to one process so it is only the
+# development default, production default to a FileBasedCache directory
+# shared by the workers of a host. Use
+# django.core.cache.backends.db.DatabaseCache with a table name (run
+# python manage.py createcachetable) or a Redis cache for several hosts.
+CACHE_DEFAULTS = {
+    'development': ('django.core.cache.backends.locmem.LocMemCache', 'ku-polls'),
+    'production': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        str(BASE_DIR / 'cache'),
+    ),
+}
+DEFAULT_CACHE = CACHE_DEFAULTS['production' if SERVER_MODE == 'production' else 'development']
 
-# DATABASES = {
-#     "default": {
-#         "ENGINE": "django.db.backends.postgresql",
-#         "NAME": config("DATABASE_NAME", default="pollsdb"),
-#         "USER": config("DATABASE_USER", default="pollsapp"),
-#         "PASSWORD": config("DATABASE_PASSWORD", default="password"),
-#         "HOST": config("DATABASE_HOST", default="localhost"),
-#         "PORT": config("DATABASE_PORT", default="5432")
-#     }
-# }
-
-DATABASES = {
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config('CACHE_BACKEND', default=DEFAULT_CACHE[0]),
+        'LOCATION': config('CACHE_LOCATION', default=DEFAULT_CACHE[1]),
+        'OPTIONS': {
+            # Evicting the results generation key would bring back stale tallies
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int),
+        },
     }
 }
 
+# Seconds a cached poll result is kept
+POLLS_RESULTS_CACHE_TIMEOUT = config('POLLS_RESULTS_CACHE_TIMEOUT', default=300, cast=int)
+# Seconds between two pushes of live results to viewers of the result page
+POLLS_RESULTS_STREAM_INTERVAL = config('POLLS_RESULTS_STREAM_INTERVAL', default=1.0, cast=float)
+# A results stream served by a sync (WSGI) worker holds one of its threads:
+# seconds before it is closed and the browser reconnect, and number of
+# streams open at once per process
+POLLS_SYNC_STREAM_MAX_AGE = config('POLLS_SYNC_STREAM_MAX_AGE', default=5.0, cast=float)
+POLLS_SYNC_STREAMS = config('POLLS_SYNC_STREAMS', default=1, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -120,6 +206,72 @@ AUTHENTICATION_BACKENDS = [
 LOGIN_REDIRECT_URL = 'polls:index'  # after login, show list of polls
 LOGOUT_REDIRECT_URL = 'polls:index'       # after logout, return to login page
 
+# Number of polls shown per page of the poll list
+POLLS_INDEX_PAGE_SIZE = config('POLLS_INDEX_PAGE_SIZE', default=20, cast=int)
+
+# Buffer votes in memory and write them in batches by a background worker
+POLLS_VOTE_BUFFER = config('POLLS_VOTE_BUFFER', default=False, cast=bool)
+POLLS_VOTE_BUFFER_BATCH_SIZE = config('POLLS_VOTE_BUFFER_BATCH_SIZE', default=500, cast=int)
+# Maximum seconds a buffered vote waits before it is written
+POLLS_VOTE_BUFFER_MAX_LATENCY = config('POLLS_VOTE_BUFFER_MAX_LATENCY', default=1.0, cast=float)
+
+# Serve detail, results and vote with async views (run under an ASGI server)
+POLLS_ASYNC_VIEWS = config('POLLS_ASYNC_VIEWS', default=False, cast=bool)
+
+# Session storage: db, cached_db (database behind the cache), cache or
+# signed_cookies (kept by the browser, signed but readable, no server write)
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + config(
+    'SESSION_BACKEND',
+    default='db',
+    cast=Choices(['db', 'cached_db', 'cache', 'signed_cookies'])
+)
+
+# Keep flash messages in a cookie so pages of anonymous visitors are
+# rendered, and votes are confirmed, without reading or writing the session
+# (cookie, session or fallback).
+MESSAGE_STORAGE = {
+    'cookie': 'django.contrib.messages.storage.cookie.CookieStorage',
+    'session': 'django.contrib.messages.storage.session.SessionStorage',
+    'fallback': 'django.contrib.messages.storage.fallback.FallbackStorage',
+}[config('MESSAGE_BACKEND', default='cookie', cast=Choices(['cookie', 'session', 'fallback']))]
+
+# Seconds shared caches may keep poll list and result pages of anonymous
+# visitors, 0 to make them private
+POLLS_PUBLIC_CACHE_MAX_AGE = config('POLLS_PUBLIC_CACHE_MAX_AGE', default=10, cast=int)
+
+# Record per-view latency, query count and database time, served at /metrics
+POLLS_METRICS = config('POLLS_METRICS', default=False, cast=bool)
+# Log requests slower than this many seconds, 0 to disable
+POLLS_METRICS_SLOW_REQUEST = config('POLLS_METRICS_SLOW_REQUEST', default=0.0, cast=float)
+
+# Answer 429 to clients sending votes, logins or signups faster than the
+# limits below (see polls/ratelimit.py)
+POLLS_RATE_LIMIT = config('POLLS_RATE_LIMIT', default=False, cast=bool)
+# Cache alias keeping buckets shared by workers, empty to keep them in process
+POLLS_RATE_LIMIT_CACHE = config('POLLS_RATE_LIMIT_CACHE', default='')
+# Seconds between two logs of allowed and limited request counts
+POLLS_RATE_LIMIT_LOG_INTERVAL = config('POLLS_RATE_LIMIT_LOG_INTERVAL', default=60.0, cast=float)
+# Limits of every scope by key: (burst, tokens refilled per second).
+# Campus networks put many voters behind one IP, keep IP limits loose.
+POLLS_RATE_LIMITS = {
+    'vote': {
+        'ip': (config('POLLS_RATE_LIMIT_VOTE_IP_BURST', default=120, cast=int),
+               config('POLLS_RATE_LIMIT_VOTE_IP_RATE', default=20.0, cast=float)),
+        'user': (config('POLLS_RATE_LIMIT_VOTE_USER_BURST', default=10, cast=int),
+                 config('POLLS_RATE_LIMIT_VOTE_USER_RATE', default=1.0, cast=float)),
+    },
+    'login': {
+        'ip': (config('POLLS_RATE_LIMIT_LOGIN_IP_BURST', default=20, cast=int),
+               config('POLLS_RATE_LIMIT_LOGIN_IP_RATE', default=0.5, cast=float)),
+        'username': (config('POLLS_RATE_LIMIT_LOGIN_USER_BURST', default=5, cast=int),
+                     config('POLLS_RATE_LIMIT_LOGIN_USER_RATE', default=0.1, cast=float)),
+    },
+    'signup': {
+        'ip': (config('POLLS_RATE_LIMIT_SIGNUP_IP_BURST', default=5, cast=int),
+               config('POLLS_RATE_LIMIT_SIGNUP_IP_RATE', default=0.05, cast=float)),
+    },
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -143,19 +295,39 @@ STATICFILES_DIRS = [
     BASE_DIR / 'polls/static',
 ]
 
+# collectstatic hash names and precompress files with gzip and brotli,
+# WhiteNoise serve hashed names with a far-future immutable Cache-Control
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'polls.storage.StaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Logging
+# Records are put into a bounded queue and written to a rotating file by a
+# background thread, see mysite/log.py.
+
 LOGGING = {
     "version": 1,  # the dictConfig format version
     "disable_existing_loggers": False,  # retain the default loggers
     
     "handlers": {
         "file": {
-            "class": "logging.FileHandler",
-            "filename": "general.log",
+            "()": "mysite.log.queue_file_handler",
+            "filename": config('LOG_FILE', default="general.log"),
+            "max_bytes": config('LOG_MAX_BYTES', default=10 * 1024 * 1024, cast=int),
+            "backup_count": config('LOG_BACKUP_COUNT', default=5, cast=int),
+            "queue_size": config('LOG_QUEUE_SIZE', default=10000, cast=int),
+            "batch_size": config('LOG_BATCH_SIZE', default=100, cast=int),
+            "flush_interval": config('LOG_FLUSH_INTERVAL', default=1.0, cast=float),
             "level": "DEBUG",
             "formatter": "simple",
         },
@@ -163,7 +335,7 @@ LOGGING = {
     
     "loggers": {
         "": {
-            "level": "DEBUG",
+            "level": config('LOG_LEVEL', default="DEBUG"),
             "handlers": ["file"],
         },
     },
@@ -0,0 +1,33 @@
+"""
+Tests of the database connection settings.
+"""
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+
+class DatabaseSettingsTest(TestCase):
+
+    def test_persistent_connection(self):
+        """Connection is health checked and kept between requests."""
+        self.assertTrue(connection.settings_dict["CONN_HEALTH_CHECKS"])
+        self.assertGreater(connection.settings_dict["CONN_MAX_AGE"], 0)
+
+    @skipUnless(connection.vendor == "sqlite", "SQLite only")
+    def test_sqlite_pragmas(self):
+        """Pragmas of init_command are applied to every new connection."""
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA foreign_keys")
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertGreater(cursor.fetchone()[0], 0)
+
+    @skipUnless(connection.vendor == "sqlite", "SQLite only")
+    def test_sqlite_immediate_transaction(self):
+        """Transactions take the write lock when they start."""
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
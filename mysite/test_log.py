@@ -0,0 +1,90 @@
+"""
+Tests of the non-blocking logging pipeline.
+"""
+import logging
+import os
+import queue
+import tempfile
+
+from django.test import SimpleTestCase
+
+from mysite.log import (
+    BatchingQueueListener,
+    BatchingRotatingFileHandler,
+    BoundedQueueHandler,
+    queue_file_handler,
+)
+
+
+class QueueFileHandlerTest(SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, "test.log")
+
+    def make_logger(self, handler):
+        """Return a logger that only write to handler."""
+        logger = logging.Logger("test_log")
+        handler.setFormatter(logging.Formatter("{levelname} {message}", style="{"))
+        logger.addHandler(handler)
+        return logger
+
+    def read_log(self):
+        with open(self.filename) as log_file:
+            return log_file.read().splitlines()
+
+    def test_records_are_written_by_listener(self):
+        """Records are formatted and written in order once the listener stop."""
+        handler = queue_file_handler(self.filename, flush_interval=0.01)
+        logger = self.make_logger(handler)
+
+        for n in range(5):
+            logger.info("vote %s", n)
+        handler.close()
+
+        self.assertEqual(
+            self.read_log(),
+            [f"INFO vote {n}" for n in range(5)]
+        )
+
+    def test_full_queue_drop_and_report(self):
+        """Records that doesn't fit in the queue are dropped and counted."""
+        records = queue.Queue(maxsize=2)
+        listener = BatchingQueueListener(
+            records, BatchingRotatingFileHandler(self.filename)
+        )
+        handler = BoundedQueueHandler(records, listener)
+        logger = self.make_logger(handler)
+
+        # Listener isn't running yet so the queue fill up
+        for n in range(5):
+            logger.info("vote %s", n)
+        self.assertEqual(listener.dropped, 3)
+
+        listener.start()
+        handler.close()
+
+        self.assertEqual(
+            self.read_log(),
+            [
+                "INFO vote 0",
+                "INFO vote 1",
+                "WARNING Log queue full, dropped 3 record(s) (3 in total)",
+            ]
+        )
+
+    def test_file_is_rotated_by_size(self):
+        """Log file is rotated once it reach max_bytes."""
+        handler = queue_file_handler(
+            self.filename, max_bytes=100, backup_count=2, flush_interval=0.01
+        )
+        logger = self.make_logger(handler)
+
+        for n in range(20):
+            logger.info("a long enough message number %s", n)
+        handler.close()
+
+        self.assertTrue(os.path.exists(f"{self.filename}.1"))
+        self.assertFalse(os.path.exists(f"{self.filename}.3"))
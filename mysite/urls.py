@@ -15,17 +15,23 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
+from django.contrib.auth import views as auth_views
 from django.urls import path, include
 from django.views.generic.base import RedirectView
 from django.conf.urls.static import static
 from . import settings
 
 from mysite import views
+from polls import views as polls_views
+from polls.ratelimit import rate_limit
 
 urlpatterns = [
     path('', RedirectView.as_view(url='polls/')),
     path('polls/', include('polls.urls')),
     path('admin/', admin.site.urls),
+    # Before the auth URLs so the limited login view is the one matched
+    path('accounts/login/', rate_limit('login')(auth_views.LoginView.as_view()), name='login'),
     path('accounts/', include('django.contrib.auth.urls')),
-    path('signup/', views.signup, name='signup'),
+    path('signup/', rate_limit('signup')(views.signup), name='signup'),
+    path('metrics', polls_views.metrics, name='metrics'),
 ]
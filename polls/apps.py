@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class PollsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'polls'
+
+    def ready(self):
+        # Connect signal receivers and register system checks
+        from . import checks, signals
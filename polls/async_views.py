@@ -0,0 +1,268 @@
+"""Async version of question detail, result and vote views.
+
+Used instead of the views in ``polls.views`` when ``POLLS_ASYNC_VIEWS`` is
+enabled so an ASGI server can serve many slow clients per worker. Database
+reads use the async ORM, the vote is written in a thread by
+``sync_to_async`` because it needs a transaction.
+"""
+
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponseRedirect
+from django.urls import reverse
+from django.views import generic
+from django.views.generic.base import TemplateResponseMixin
+
+from .broadcast import astream_results, snapshot
+from .buffer import (
+    aforget_pending_vote,
+    apending_choice_id,
+    aremember_pending_vote,
+    overlay_pending_vote
+)
+from .conditional import make_etag
+from .models import Choice, Question, Vote
+from .results_cache import aget_results, aresults_version
+from .views import (
+    confirm_vote,
+    event_stream_response,
+    get_choice_id,
+    has_messages,
+    has_session,
+    logger,
+    not_modified_response,
+    queue_vote,
+    record_vote,
+    set_page_cache_headers,
+    warn_invalid_choice
+)
+
+
+async def aget_published_question(request, pk) -> Optional[Question]:
+    """Return published question, warn user if it isn't available.
+
+    Returns:
+        Question | None: question, None if it doesn't exist or isn't
+                         published yet
+    """
+    question = await Question.objects.filter(pk=pk).afirst()
+
+    if question is None:
+        messages.warning(request, "Polls doesn't exist")
+        return None
+    if not question.is_published():
+        messages.warning(request, "Polls is unavailable right now")
+        return None
+    return question
+
+
+class AsyncPublishedQuestionView(TemplateResponseMixin, generic.View):
+    """Base of async question page that allow only published question."""
+
+    async def get(self, request, pk):
+        """Load question and user then render the page."""
+        question = await aget_published_question(request, pk)
+        if question is None:
+            return HttpResponseRedirect(reverse("polls:index"), request)
+
+        # Template read request.user, keep the user loaded asynchronously.
+        # No session means no logged in user, don't load it from session
+        if has_session(request):
+            request.user = await request.auser()
+        else:
+            request.user = AnonymousUser()
+
+        context = {"question": question, "object": question, "view": self}
+        context.update(await self.get_context_data(question))
+        return self.render_to_response(context)
+
+    async def get_context_data(self, question) -> dict:
+        """Return extra context data of the page."""
+        return {}
+
+
+class AsyncConditionalGetMixin:
+    """Async version of polls.views.ConditionalGetMixin."""
+
+    async def aget_version_parts(self, pk) -> list:
+        """Return versions of the content of the page."""
+        raise NotImplementedError
+
+    def is_public(self) -> bool:
+        """Return True if the page is the same for every anonymous visitor."""
+        return not has_session(self.request)
+
+    async def aget_etag(self, pk) -> Optional[str]:
+        """Return ETag of the page for this visitor, None to always render."""
+        request = self.request
+        # Flash messages must be rendered once, session storage is sync only
+        if await sync_to_async(has_messages)(request):
+            return None
+        if self.is_public():
+            return make_etag(*await self.aget_version_parts(pk))
+        return make_etag(
+            *await self.aget_version_parts(pk), await request.session.aget(SESSION_KEY)
+        )
+
+    async def get(self, request, pk):
+        """Return 304 if visitor has the current page, set ETag otherwise."""
+        etag = await self.aget_etag(pk)
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = await super().get(request, pk)
+        return set_page_cache_headers(request, response, etag, self.is_public())
+
+
+class AsyncDetailView(AsyncPublishedQuestionView):
+    """Async version of DetailView."""
+
+    template_name = "polls/detail.html"
+
+    async def get_context_data(self, question) -> dict:
+        """Return choices and choice that this user voted for."""
+        context = {
+            "choice_list": [choice async for choice in question.choice_set.all()]
+        }
+
+        user = self.request.user
+        if user.is_authenticated:
+            previous_id = await apending_choice_id(self.request.session, question.pk)
+            if previous_id is None:
+                previous_id = await Vote.objects.filter(
+                    user=user,
+                    question=question
+                ).values_list("choice_id", flat=True).afirst()
+            context["previous_selected_id"] = previous_id
+
+        return context
+
+
+class AsyncResultsView(AsyncConditionalGetMixin, AsyncPublishedQuestionView):
+    """Async version of ResultsView."""
+
+    template_name = "polls/results.html"
+
+    async def aget_version_parts(self, pk) -> list:
+        """Return version of the results and queued vote of this visitor."""
+        if self.is_public():
+            return [await aresults_version(pk)]
+        return [
+            await aresults_version(pk),
+            await apending_choice_id(self.request.session, pk),
+        ]
+
+    async def get_context_data(self, question) -> dict:
+        """Return tally of every choice, live updates are streamed."""
+        choice_list = await aget_results(question)
+        total = sum(choice.votes for choice in choice_list)
+
+        if self.request.user.is_authenticated:
+            total = await self.apply_pending_vote(question, choice_list, total)
+
+        return {"choice_list": choice_list, "total_votes": total, "live_results": True}
+
+    async def apply_pending_vote(self, question, choice_list, total) -> int:
+        """Show queued vote of this user that isn't flushed yet.
+
+        Returns:
+            int: total votes after overlay
+        """
+        session = self.request.session
+        pending_id = await apending_choice_id(session, question.pk)
+        if pending_id is None:
+            return total
+
+        stored_id = await Vote.objects.filter(
+            user=self.request.user,
+            question=question
+        ).values_list("choice_id", flat=True).afirst()
+
+        if stored_id == pending_id:
+            await aforget_pending_vote(session, question.pk)
+            return total
+
+        return overlay_pending_vote(choice_list, pending_id, stored_id)
+
+
+async def aget_selected_choice(request, question) -> Optional[Choice]:
+    """Async version of polls.views.get_selected_choice()."""
+    choice_id = get_choice_id(request, question)
+    if choice_id is None:
+        return None
+
+    selected_choice = None
+    if choice_id.isdecimal():
+        selected_choice = await question.choice_set.filter(pk=choice_id).afirst()
+
+    if selected_choice is None:
+        warn_invalid_choice(request, question, choice_id)
+
+    return selected_choice
+
+
+async def results_stream(request, pk):
+    """Async version of polls.views.results_stream()."""
+    question = await Question.objects.published().filter(pk=pk).afirst()
+    if question is None:
+        raise Http404("No question found")
+
+    # Cache and ORM of the first update are sync only
+    first_update = await sync_to_async(snapshot)(question)
+    return event_stream_response(astream_results(question, first_update))
+
+
+@login_required
+async def vote(request, question_id):
+    """Async version of polls.views.vote().
+
+    Args:
+        request (django.http.HttpRequest): http request from django
+        question_id (int):  question id which is primary key of question
+                            instance in database
+
+    Returns:
+        django.http.HttpResponse: redirect to the result page
+    """
+    if request.method == "GET":
+        messages.warning(request, "Page unavailable")
+        return HttpResponseRedirect(reverse("polls:index"), request)
+
+    request.user = await request.auser()
+
+    question = await Question.objects.filter(pk=question_id).afirst()
+    if question is None:
+        logger.warning("Non-existent question %s", question_id)
+        messages.warning(request, "Polls doesn't exist")
+        return HttpResponseRedirect(reverse("polls:index"), request)
+
+    if not question.can_vote():
+        messages.warning(request, "Polls is unavailable right now")
+        return HttpResponseRedirect(reverse("polls:index"), request)
+
+    selected_choice = await aget_selected_choice(request, question)
+    if selected_choice is None:
+        return HttpResponseRedirect(
+            reverse("polls:detail", args=(question.id,))
+        )
+
+    if settings.POLLS_VOTE_BUFFER:
+        queue_vote(request, question, selected_choice)
+        await aremember_pending_vote(
+            request.session, question.id, selected_choice.id
+        )
+    else:
+        # Vote and tally are written in one transaction which is sync only
+        previous_choice = await sync_to_async(record_vote)(
+            request.user, selected_choice
+        )
+        confirm_vote(request, question, selected_choice, previous_choice)
+
+    return HttpResponseRedirect(reverse("polls:results", args=(question.id,)))
@@ -0,0 +1,348 @@
+"""Module for pushing live poll results to subscribed viewers.
+
+Viewers of a result page subscribe to its question through the results
+stream (Server-Sent Events). A vote only marks its question as changed with
+``publish()``. A broadcaster thread wakes up once per tick, reads tally of
+every changed question once and push the choices whose tally changed to
+every subscriber of that question, so the number of tally reads doesn't
+grow with the number of viewers.
+
+Subscriptions live in memory of the worker process, a vote recorded by
+another process reach viewers of this process on its next vote or when they
+reconnect.
+
+An open stream holds a thread of a sync (WSGI) worker, so there the stream
+is closed after ``POLLS_SYNC_STREAM_MAX_AGE`` seconds with a ``retry:`` hint
+and at most ``POLLS_SYNC_STREAMS`` streams are open at once per process, the
+others only get the current tally. The result page only opens the stream
+when ``POLLS_ASYNC_VIEWS`` serve it from an ASGI server.
+"""
+
+import asyncio
+import atexit
+import json
+import logging
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .results_cache import get_results
+
+logger = logging.getLogger('polls')
+
+# Seconds between comments that keep an idle stream open through proxies
+STREAM_KEEPALIVE = 15
+
+# Seconds after which an async stream is closed, the browser reconnect by itself
+STREAM_MAX_AGE = 300
+
+
+class Subscription:
+    """Changes of a question tally waiting to be sent to one viewer.
+
+    Changes that arrive before the viewer took the previous ones are merged,
+    so a slow viewer only get the latest tally instead of a growing backlog.
+    """
+
+    def __init__(self, question_id: int):
+        """Create a subscription to tally of a question."""
+        self.question_id = question_id
+        self.closed = False
+        self._total = None
+        self._changes = {}
+        self._condition = threading.Condition()
+        self._loop = None
+        self._event = None
+
+    def push(self, total: int, changes: dict[int, int]) -> None:
+        """Merge new tally of changed choices into the pending update."""
+        with self._condition:
+            self._total = total
+            self._changes.update(changes)
+            self._condition.notify_all()
+            self._wake_async()
+
+    def close(self) -> None:
+        """Wake up the viewer so it can stop streaming."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+            self._wake_async()
+
+    def get(self, timeout: float) -> Optional[dict]:
+        """Wait for an update of the tally.
+
+        Returns:
+            dict | None: total and vote count of each changed choice,
+                         None if nothing changed within timeout
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._changes or self.closed,
+                timeout=timeout
+            )
+            return self._take()
+
+    async def aget(self, timeout: float) -> Optional[dict]:
+        """Async version of get(), wait without holding a thread."""
+        with self._condition:
+            if self._event is None:
+                self._loop = asyncio.get_running_loop()
+                self._event = asyncio.Event()
+            self._event.clear()
+            if self._changes or self.closed:
+                return self._take()
+
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        with self._condition:
+            return self._take()
+
+    def _take(self) -> Optional[dict]:
+        """Return and clear the pending update, lock must be held."""
+        if not self._changes:
+            return None
+        update = {"total": self._total, "choices": self._changes}
+        self._changes = {}
+        return update
+
+    def _wake_async(self) -> None:
+        """Wake up aget() from another thread, lock must be held."""
+        if self._event is not None:
+            self._loop.call_soon_threadsafe(self._event.set)
+
+
+class ResultsBroadcaster:
+    """Aggregate tally of changed questions once per tick for all viewers."""
+
+    def __init__(self, interval: float = 1.0, autostart: bool = True):
+        """Create a broadcaster.
+
+        Args:
+            interval (float): seconds between two pushes to viewers
+            autostart (bool): start broadcaster thread on the first subscribe
+        """
+        self.interval = interval
+        self.autostart = autostart
+        self.aggregations = 0
+        self._subscriptions = {}
+        self._last_counts = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._stopping = threading.Event()
+
+    def subscribe(self, question_id: int) -> Subscription:
+        """Return a new subscription to tally of a question."""
+        subscription = Subscription(question_id)
+        with self._lock:
+            self._subscriptions.setdefault(question_id, set()).add(subscription)
+        if self.autostart and self._worker is None:
+            self.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop pushing updates to a subscription."""
+        question_id = subscription.question_id
+        with self._lock:
+            subscriptions = self._subscriptions.get(question_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(question_id, None)
+                self._last_counts.pop(question_id, None)
+
+    def subscribers(self, question_id: int) -> int:
+        """Return number of viewers subscribed to a question."""
+        with self._lock:
+            return len(self._subscriptions.get(question_id, ()))
+
+    def publish(self, question_id: int) -> None:
+        """Mark tally of a question as changed, it is pushed on next tick."""
+        with self._lock:
+            if question_id in self._subscriptions:
+                self._dirty.add(question_id)
+
+    def start(self) -> None:
+        """Start the broadcaster thread if it isn't running."""
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._stopping.clear()
+            self._worker = threading.Thread(
+                target=self._run,
+                name="polls-results-broadcaster",
+                daemon=True
+            )
+            self._worker.start()
+            atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Stop the broadcaster thread and close every subscription."""
+        self._stopping.set()
+        worker = self._worker
+        if worker is not None:
+            worker.join()
+            self._worker = None
+        with self._lock:
+            subscriptions = [
+                subscription
+                for question in self._subscriptions.values()
+                for subscription in question
+            ]
+        for subscription in subscriptions:
+            subscription.close()
+
+    def tick(self) -> int:
+        """Push new tally of every changed question to its subscribers.
+
+        Returns:
+            int: number of questions whose tally was read
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+
+        for question_id in dirty:
+            self._broadcast(question_id)
+        return len(dirty)
+
+    def _broadcast(self, question_id: int) -> None:
+        """Read tally of a question once and push what changed."""
+        from .models import Question
+
+        choice_list = get_results(Question(pk=question_id))
+        self.aggregations += 1
+        counts = {choice.pk: choice.votes for choice in choice_list}
+        total = sum(counts.values())
+
+        with self._lock:
+            last = self._last_counts.get(question_id, {})
+            self._last_counts[question_id] = counts
+            subscriptions = list(self._subscriptions.get(question_id, ()))
+
+        changes = {
+            pk: votes for pk, votes in counts.items() if last.get(pk) != votes
+        }
+        if not changes:
+            return
+        for subscription in subscriptions:
+            subscription.push(total, changes)
+
+    def _run(self) -> None:
+        """Broadcaster loop, push changes once per interval."""
+        while not self._stopping.wait(self.interval):
+            try:
+                if self.tick():
+                    close_old_connections()
+            except Exception:
+                logger.exception("Failed to broadcast poll results")
+
+
+class StreamCounter:
+    """Number of streams open in this process, bounded by a limit."""
+
+    def __init__(self):
+        """Create a counter with no open stream."""
+        self.open = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, limit: int) -> bool:
+        """Count a new stream, return False if limit streams are open."""
+        with self._lock:
+            if self.open >= limit:
+                return False
+            self.open += 1
+            return True
+
+    def release(self) -> None:
+        """Count a stream as closed."""
+        with self._lock:
+            self.open -= 1
+
+
+_sync_streams = StreamCounter()
+
+_broadcaster: Optional[ResultsBroadcaster] = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_results_broadcaster() -> ResultsBroadcaster:
+    """Return results broadcaster of this process, create it from settings."""
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            _broadcaster = ResultsBroadcaster(
+                interval=settings.POLLS_RESULTS_STREAM_INTERVAL
+            )
+        return _broadcaster
+
+
+def publish_results(question_id: int) -> None:
+    """Tell viewers of a question that its tally changed, after commit."""
+    broadcaster = get_results_broadcaster()
+    transaction.on_commit(lambda: broadcaster.publish(question_id))
+
+
+def format_event(update: dict) -> str:
+    """Return an update of the tally as a Server-Sent Event."""
+    return f"event: results\ndata: {json.dumps(update)}\n\n"
+
+
+def snapshot(question) -> dict:
+    """Return tally of every choice of a question as the first update."""
+    choice_list = get_results(question)
+    return {
+        "total": sum(choice.votes for choice in choice_list),
+        "choices": {choice.pk: choice.votes for choice in choice_list},
+    }
+
+
+def stream_results(question):
+    """Yield tally of a question as Server-Sent Events for a sync worker.
+
+    Stream is closed after ``POLLS_SYNC_STREAM_MAX_AGE`` seconds and the
+    browser is told to reconnect after as long, like long polling. Past
+    ``POLLS_SYNC_STREAMS`` open streams only the current tally is sent.
+    """
+    max_age = settings.POLLS_SYNC_STREAM_MAX_AGE
+    yield f"retry: {round(max_age * 1000)}\n\n"
+    if not _sync_streams.acquire(settings.POLLS_SYNC_STREAMS):
+        yield format_event(snapshot(question))
+        return
+
+    broadcaster = get_results_broadcaster()
+    subscription = broadcaster.subscribe(question.pk)
+    deadline = time.monotonic() + max_age
+    try:
+        yield format_event(snapshot(question))
+        while not subscription.closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            update = subscription.get(timeout=min(STREAM_KEEPALIVE, remaining))
+            if update is not None:
+                yield format_event(update)
+            elif remaining > STREAM_KEEPALIVE:
+                yield ": keepalive\n\n"
+    finally:
+        broadcaster.unsubscribe(subscription)
+        _sync_streams.release()
+
+
+async def astream_results(question, first_update: dict):
+    """Async version of stream_results(), first update is read by caller."""
+    broadcaster = get_results_broadcaster()
+    subscription = broadcaster.subscribe(question.pk)
+    deadline = time.monotonic() + STREAM_MAX_AGE
+    try:
+        yield format_event(first_update)
+        while not subscription.closed and time.monotonic() < deadline:
+            update = await subscription.aget(timeout=STREAM_KEEPALIVE)
+            yield ": keepalive\n\n" if update is None else format_event(update)
+    finally:
+        broadcaster.unsubscribe(subscription)
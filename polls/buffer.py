@@ -0,0 +1,272 @@
+"""Module for buffered vote ingestion.
+
+When ``POLLS_VOTE_BUFFER`` is enabled the vote() view only validates a vote
+and put it into an in-process queue. A background worker writes queued votes
+in batches with ``Vote.objects.cast_many()`` so a burst of submissions cost
+one transaction per batch instead of one per vote.
+
+Queued votes live in memory of the worker process, so votes that wasn't
+flushed yet are lost if the process is killed.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .broadcast import publish_results
+from .results_cache import invalidate_results, summarize_results
+from .retry import retry_on_lock
+
+logger = logging.getLogger('polls')
+
+# Session key of votes that the user submitted but may not be flushed yet
+PENDING_VOTES_SESSION_KEY = "pending_votes"
+
+# Seconds after which a pending vote is assumed to be flushed (or dropped)
+PENDING_VOTE_TTL = 60
+
+
+class VoteBuffer:
+    """In-process queue of votes flushed in batches by a worker thread."""
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        max_latency: float = 1.0,
+        autostart: bool = True
+    ):
+        """Create a vote buffer.
+
+        Args:
+            batch_size (int): maximum number of votes written per batch
+            max_latency (float): maximum seconds a vote wait in the queue
+            autostart (bool): start worker thread on the first submit
+        """
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.autostart = autostart
+        self.flushed = 0
+        self._queue = queue.Queue()
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._worker = None
+        self._stopping = threading.Event()
+
+    def submit(self, user_id: int, question_id: int, choice_id: int) -> None:
+        """Queue a vote that already got validated."""
+        self._queue.put((user_id, question_id, choice_id))
+        if self.autostart and self._worker is None:
+            self.start()
+
+    def pending(self) -> int:
+        """Return number of votes waiting in the queue."""
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        """Start the worker thread if it isn't running."""
+        with self._start_lock:
+            if self._worker is not None:
+                return
+            self._stopping.clear()
+            self._worker = threading.Thread(
+                target=self._run,
+                name="polls-vote-buffer",
+                daemon=True
+            )
+            self._worker.start()
+            atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Stop the worker thread and write every queued vote."""
+        self._stopping.set()
+        worker = self._worker
+        if worker is not None:
+            worker.join()
+            self._worker = None
+        self.flush()
+
+    def flush(self) -> int:
+        """Write every queued vote right now.
+
+        Returns:
+            int: number of vote rows written
+        """
+        written = 0
+        with self._write_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    return written
+                written += self._write(batch)
+
+    def _drain(self, limit: int) -> list:
+        """Take up to limit votes from the queue without waiting."""
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _collect(self) -> list:
+        """Wait for votes until batch is full or max latency elapsed."""
+        try:
+            batch = [self._queue.get(timeout=self.max_latency)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        """Worker loop, write a batch whenever it is full or old enough."""
+        while not self._stopping.is_set():
+            # Lock is held while collecting so flush() can't write newer
+            # votes of the same user before this batch
+            with self._write_lock:
+                batch = self._collect()
+                if batch:
+                    self._write(batch)
+                    close_old_connections()
+
+    def _write(self, batch: list) -> int:
+        """Write a batch, retry vote by vote if the batch is rejected."""
+        from .models import Vote
+
+        try:
+            written = retry_on_lock(Vote.objects.cast_many, batch)
+        except Exception:
+            logger.exception(
+                "Vote batch of %d failed, retry one by one", len(batch)
+            )
+            written = 0
+            for entry in batch:
+                try:
+                    written += retry_on_lock(Vote.objects.cast_many, [entry])
+                except Exception:
+                    logger.exception("Drop invalid buffered vote %s", entry)
+
+        for question_id in {entry[1] for entry in batch}:
+            invalidate_results(question_id)
+            publish_results(question_id)
+
+        self.flushed += len(batch)
+        logger.debug("Flushed %d buffered vote(s), %d written", len(batch), written)
+        return written
+
+
+_vote_buffer: Optional[VoteBuffer] = None
+_vote_buffer_lock = threading.Lock()
+
+
+def get_vote_buffer() -> VoteBuffer:
+    """Return vote buffer of this process, create it from settings."""
+    global _vote_buffer
+    with _vote_buffer_lock:
+        if _vote_buffer is None:
+            _vote_buffer = VoteBuffer(
+                batch_size=settings.POLLS_VOTE_BUFFER_BATCH_SIZE,
+                max_latency=settings.POLLS_VOTE_BUFFER_MAX_LATENCY,
+            )
+        return _vote_buffer
+
+
+def _pending_choice(entry) -> Optional[int]:
+    """Return choice id of a pending vote entry, None if it expired."""
+    if entry is None:
+        return None
+    choice_id, queued_at = entry
+    if time.time() - queued_at > PENDING_VOTE_TTL:
+        return None
+    return choice_id
+
+
+def _forget(pending: dict, question_id: int) -> Optional[dict]:
+    """Remove question from pending votes, None if nothing was removed."""
+    if pending.pop(str(question_id), None) is None:
+        return None
+    return pending
+
+
+def remember_pending_vote(session, question_id: int, choice_id: int) -> None:
+    """Remember queued vote in session for read-your-write."""
+    pending = session.get(PENDING_VOTES_SESSION_KEY, {})
+    pending[str(question_id)] = [choice_id, time.time()]
+    session[PENDING_VOTES_SESSION_KEY] = pending
+
+
+def pending_choice_id(session, question_id: int) -> Optional[int]:
+    """Return choice id of queued vote of this session on the question."""
+    pending = session.get(PENDING_VOTES_SESSION_KEY, {})
+    return _pending_choice(pending.get(str(question_id)))
+
+
+def forget_pending_vote(session, question_id: int) -> None:
+    """Forget queued vote once it is visible in the database."""
+    pending = _forget(session.get(PENDING_VOTES_SESSION_KEY, {}), question_id)
+    if pending is None:
+        return
+    if pending:
+        session[PENDING_VOTES_SESSION_KEY] = pending
+    else:
+        del session[PENDING_VOTES_SESSION_KEY]
+
+
+async def aremember_pending_vote(session, question_id: int, choice_id: int) -> None:
+    """Async version of remember_pending_vote()."""
+    pending = await session.aget(PENDING_VOTES_SESSION_KEY, {})
+    pending[str(question_id)] = [choice_id, time.time()]
+    await session.aset(PENDING_VOTES_SESSION_KEY, pending)
+
+
+async def apending_choice_id(session, question_id: int) -> Optional[int]:
+    """Async version of pending_choice_id()."""
+    pending = await session.aget(PENDING_VOTES_SESSION_KEY, {})
+    return _pending_choice(pending.get(str(question_id)))
+
+
+async def aforget_pending_vote(session, question_id: int) -> None:
+    """Async version of forget_pending_vote()."""
+    pending = await session.aget(PENDING_VOTES_SESSION_KEY, {})
+    pending = _forget(pending, question_id)
+    if pending is None:
+        return
+    if pending:
+        await session.aset(PENDING_VOTES_SESSION_KEY, pending)
+    else:
+        await session.apop(PENDING_VOTES_SESSION_KEY)
+
+
+def overlay_pending_vote(choice_list, pending_id, stored_id) -> int:
+    """Apply a not yet flushed vote on top of the stored tally.
+
+    Args:
+        choice_list (list[ChoiceResult]): tally from get_results()
+        pending_id (int): choice of the queued vote
+        stored_id (int | None): choice of the vote in database, if any
+
+    Returns:
+        int: total number of votes after overlay
+    """
+    for choice in choice_list:
+        if choice.pk == pending_id:
+            choice.vote_count += 1
+        elif choice.pk == stored_id:
+            choice.vote_count -= 1
+
+    return summarize_results(choice_list)
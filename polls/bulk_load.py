@@ -0,0 +1,348 @@
+"""Module for loading poll data in bulk.
+
+Used by the ``load_polls_data`` command. Fixture files are read one object
+at a time instead of as a whole, references are checked in memory and rows
+are written with ``bulk_create`` in batches, without per-object signals.
+Callers must run the load in a transaction and rebuild the tally after it
+(see ``BulkLoader.finish()``).
+"""
+
+import datetime
+import json
+import random
+from collections import Counter
+from typing import Iterator
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.core.serializers.python import Deserializer
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import Choice, Question, Vote
+from .conditional import invalidate_index
+from .results_cache import invalidate_all_results
+
+# Models that can be bulk loaded, in the order they are flushed
+LOADABLE_MODELS = {
+    "auth.user": User,
+    "polls.question": Question,
+    "polls.choice": Choice,
+    "polls.vote": Vote,
+}
+
+# Password of generated users
+GENERATED_PASSWORD = "loadtest"
+
+
+class InvalidReference(ValueError):
+    """Object refer to a row that doesn't exist."""
+
+
+class ConflictingRow(ValueError):
+    """Object break a unique constraint, e.g. a second vote of a user."""
+
+
+def find_duplicate_vote(votes: list) -> str:
+    """Describe the first vote of votes on a question already voted by its user.
+
+    Looked for among votes then among stored votes of another pk, empty
+    if there is none.
+    """
+    seen = {}
+    for vote in votes:
+        key = (vote.user_id, vote.question_id)
+        if seen.get(key, vote.pk) != vote.pk:
+            return (
+                f"Vote {vote.pk} is a second vote of user {vote.user_id} on "
+                f"question {vote.question_id}, after vote {seen[key]}"
+            )
+        seen[key] = vote.pk
+
+    stored = Vote.objects.filter(
+        user_id__in={user_id for user_id, _ in seen},
+        question_id__in={question_id for _, question_id in seen},
+    ).values_list("pk", "user_id", "question_id")
+    for pk, user_id, question_id in stored:
+        duplicate = seen.get((user_id, question_id), pk)
+        if duplicate != pk:
+            return (
+                f"Vote {duplicate} is a second vote of user {user_id} on "
+                f"question {question_id}, after vote {pk}"
+            )
+    return ""
+
+
+def _skip_separators(buffer: str, position: int) -> int:
+    """Return position of the first character after whitespace and commas."""
+    while position < len(buffer) and buffer[position] in " \t\r\n,":
+        position += 1
+    return position
+
+
+def iter_json_array(file, chunk_size: int = 1 << 16) -> Iterator[dict]:
+    """Yield items of a JSON array file one by one.
+
+    Only one chunk and the item being decoded are kept in memory, so file
+    of any size can be read.
+
+    Args:
+        file (TextIO): file that contain a JSON array
+        chunk_size (int): number of characters read at once
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        position = _skip_separators(buffer, position)
+
+        if position < len(buffer) and not started:
+            if buffer[position] != "[":
+                raise ValueError("Fixture must be a JSON array")
+            started = True
+            position += 1
+            continue
+        if position < len(buffer) and buffer[position] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            if eof and not buffer.strip():
+                if started:
+                    raise ValueError("Fixture array isn't closed")
+                return
+            continue
+
+        yield item
+        position = end
+
+
+class BulkLoader:
+    """Collect objects and write them with bulk_create in batches."""
+
+    def __init__(self, batch_size: int = 5000):
+        """Create a loader.
+
+        Args:
+            batch_size (int): maximum rows written per INSERT
+        """
+        self.batch_size = batch_size
+        self.counts = Counter()
+        self._pending = {model: [] for model in LOADABLE_MODELS.values()}
+        self._m2m_rows = {}
+        self._users = set(User.objects.values_list("pk", flat=True))
+        self._questions = set(Question.objects.values_list("pk", flat=True))
+        self._choices = dict(Choice.objects.values_list("pk", "question_id"))
+
+    def load_file(self, file) -> None:
+        """Load every object of a fixture file."""
+        for data in iter_json_array(file):
+            model = LOADABLE_MODELS.get(data.get("model", "").lower())
+            if model is None:
+                raise ValueError(f"Can't bulk load model {data.get('model')!r}")
+            for deserialized in Deserializer([data], ignorenonexistent=True):
+                self.add(deserialized.object, deserialized.m2m_data)
+
+    def add(self, obj, m2m_data=None) -> None:
+        """Check references of obj then queue it for writing."""
+        self.check_references(obj)
+
+        model = type(obj)
+        pending = self._pending[model]
+        pending.append(obj)
+        for field_name, values in (m2m_data or {}).items():
+            self._queue_m2m(obj, field_name, values)
+        if len(pending) >= self.batch_size:
+            self.flush(model)
+
+    def check_references(self, obj) -> None:
+        """Remember pk of obj, raise InvalidReference if it refer to nothing."""
+        if isinstance(obj, User):
+            self._users.add(obj.pk)
+        elif isinstance(obj, Question):
+            self._questions.add(obj.pk)
+        elif isinstance(obj, Choice):
+            if obj.question_id not in self._questions:
+                raise InvalidReference(
+                    f"Choice {obj.pk} refer to missing question {obj.question_id}"
+                )
+            self._choices[obj.pk] = obj.question_id
+        elif isinstance(obj, Vote):
+            self._check_vote(obj)
+
+    def _check_vote(self, vote) -> None:
+        """Check user and choice of a vote, fill its question from choice."""
+        if vote.user_id not in self._users:
+            raise InvalidReference(f"Vote {vote.pk} refer to missing user {vote.user_id}")
+        question_id = self._choices.get(vote.choice_id)
+        if question_id is None:
+            raise InvalidReference(
+                f"Vote {vote.pk} refer to missing choice {vote.choice_id}"
+            )
+        if vote.question_id is None:
+            vote.question_id = question_id
+        elif vote.question_id != question_id:
+            raise InvalidReference(
+                f"Vote {vote.pk} choice {vote.choice_id} isn't a choice of "
+                f"question {vote.question_id}"
+            )
+
+    def _queue_m2m(self, obj, field_name: str, values) -> None:
+        """Queue rows of a many-to-many field of obj."""
+        field = type(obj)._meta.get_field(field_name)
+        through = field.remote_field.through
+        rows = self._m2m_rows.setdefault(through, [])
+        for value in values:
+            rows.append(through(**{
+                f"{field.m2m_field_name()}_id": obj.pk,
+                f"{field.m2m_reverse_field_name()}_id": value,
+            }))
+
+    def flush(self, model=None) -> None:
+        """Write queued objects of model, of every model if None."""
+        models = [model] if model else list(LOADABLE_MODELS.values())
+        for current in models:
+            objects = self._pending[current]
+            if not objects:
+                continue
+            self._write(current, objects)
+            self.counts[current._meta.label] += len(objects)
+            self._pending[current] = []
+
+    def _write(self, model, objects: list) -> None:
+        """Insert objects, raise ConflictingRow naming the row the database refused."""
+        try:
+            # Savepoint, so the caller transaction is still usable after an error
+            with transaction.atomic():
+                if objects[0].pk is None:
+                    model.objects.bulk_create(objects, batch_size=self.batch_size)
+                else:
+                    # Same as loaddata, row with the same pk is overwritten
+                    model.objects.bulk_create(
+                        objects,
+                        batch_size=self.batch_size,
+                        update_conflicts=True,
+                        unique_fields=["pk"],
+                        update_fields=[
+                            field.name for field in model._meta.concrete_fields
+                            if not field.primary_key
+                        ],
+                    )
+        except IntegrityError as err:
+            row = find_duplicate_vote(objects) if model is Vote else ""
+            raise ConflictingRow(
+                row or f"{model._meta.label} rows refused by the database: {err}"
+            ) from err
+
+    def finish(self) -> None:
+        """Write everything left, rebuild tally and reset sequences."""
+        self.flush()
+        for through, rows in self._m2m_rows.items():
+            through.objects.bulk_create(
+                rows, batch_size=self.batch_size, ignore_conflicts=True
+            )
+        self._m2m_rows = {}
+
+        if self.counts[Vote._meta.label] or self.counts[Choice._meta.label]:
+            Choice.objects.rebuild_vote_counts()
+        reset_sequences()
+        invalidate_all_results()
+        invalidate_index()
+
+
+def reset_sequences() -> None:
+    """Move id sequences past rows inserted with an explicit pk."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), list(LOADABLE_MODELS.values())
+    )
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def next_pk(model) -> int:
+    """Return pk after the largest pk of model."""
+    last = model.objects.order_by("-pk").values_list("pk", flat=True).first()
+    return (last or 0) + 1
+
+
+def generate_data(
+    loader: BulkLoader,
+    votes: int,
+    questions: int = 100,
+    choices: int = 4,
+    users: int = None,
+    seed: int = None
+) -> None:
+    """Queue synthetic questions, choices, users and votes into loader.
+
+    Every user vote on distinct questions, so there are enough users for
+    ``votes`` one-vote-per-question ballots. A third of questions are open
+    without end date, a third end in the future and a third already ended.
+
+    Args:
+        loader (BulkLoader): loader that write generated rows
+        votes (int): number of votes
+        questions (int): number of questions
+        choices (int): number of choices per question
+        users (int | None): number of users, the least needed if None
+        seed (int | None): seed of the random choices
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    users = users or max(1, -(-votes // questions))
+    if users * questions < votes:
+        raise ValueError(f"{users} users can't cast {votes} votes on {questions} questions")
+
+    question_ids = []
+    first_question = next_pk(Question)
+    for index in range(questions):
+        pk = first_question + index
+        ends = (None, now + datetime.timedelta(days=30), now - datetime.timedelta(days=1))
+        loader.add(Question(
+            pk=pk,
+            question_text=f"Load test question {pk}",
+            pub_date=now - datetime.timedelta(days=rng.randint(2, 365)),
+            end_date=ends[index % 3],
+        ))
+        question_ids.append(pk)
+
+    question_choices = {}
+    pk = next_pk(Choice)
+    for question_id in question_ids:
+        question_choices[question_id] = list(range(pk, pk + choices))
+        for choice_pk in question_choices[question_id]:
+            loader.add(Choice(
+                pk=choice_pk,
+                question_id=question_id,
+                choice_text=f"Choice {choice_pk}",
+            ))
+        pk += choices
+
+    # Hashing is slow, every generated user share the same hash
+    password = make_password(GENERATED_PASSWORD)
+    first_user = next_pk(User)
+    for pk in range(first_user, first_user + users):
+        loader.add(User(pk=pk, username=f"loadtest{pk}", password=password))
+
+    vote_pk = next_pk(Vote)
+    for index in range(votes):
+        user_id = first_user + index // questions
+        question_id = question_ids[index % questions]
+        loader.add(Vote(
+            pk=vote_pk + index,
+            user_id=user_id,
+            question_id=question_id,
+            choice_id=rng.choice(question_choices[question_id]),
+        ))
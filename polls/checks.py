@@ -0,0 +1,36 @@
+"""Module for system checks of the polls deployment."""
+
+from decouple import config
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+LOCAL_CACHE = "django.core.cache.backends.locmem.LocMemCache"
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Refuse a per-process cache when production run several workers.
+
+    Results cache, result and poll list versions and rate limit buckets
+    are kept in the default cache. With LocMemCache a vote only drop the
+    cache of the worker that handled it, other workers keep serving the
+    stale tally, or a 304, until the cached entries expire.
+    """
+    if settings.SERVER_MODE != "production":
+        return []
+    if settings.CACHES["default"]["BACKEND"] != LOCAL_CACHE:
+        return []
+    if config("GUNICORN_WORKERS", default=0, cast=int) == 1:
+        return []
+    return [
+        Error(
+            "LocMemCache is private to each gunicorn worker, votes handled "
+            "by one worker aren't seen in results served by the others.",
+            hint=(
+                "Set CACHE_BACKEND to a cache shared between processes, e.g. "
+                "django.core.cache.backends.filebased.FileBasedCache, or run "
+                "a single worker with GUNICORN_WORKERS=1."
+            ),
+            id="polls.E001",
+        )
+    ]
@@ -0,0 +1,81 @@
+"""Module for conditional GET of the poll pages.
+
+A page gets an ETag made of the versions of what it shows and of the
+visitor, so a refresh of an unchanged page is answered with 304 Not
+Modified after a cache lookup, without queries or rendering. Result pages
+use the version kept by ``polls.results_cache``. The poll list use the
+index version defined here, changed when a question is edited and when the
+next question get published or closed.
+"""
+
+import datetime
+import hashlib
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.http import quote_etag
+
+from .models import Question
+from .results_cache import new_version
+
+INDEX_VERSION_KEY = "polls:index:version"
+
+
+def next_index_change(now: datetime.datetime) -> Optional[datetime.datetime]:
+    """Return next time a question get published or closed, None if never.
+
+    Both dates are read from their index with ORDER BY ... LIMIT 1.
+    """
+    next_pub = Question.objects.filter(pub_date__gt=now).order_by(
+        "pub_date"
+    ).values_list("pub_date", flat=True).first()
+    next_end = Question.objects.filter(end_date__gte=now).order_by(
+        "end_date"
+    ).values_list("end_date", flat=True).first()
+    if next_end is not None:
+        # Question stay open until the end date has passed
+        next_end += datetime.timedelta(microseconds=1)
+    return min(filter(None, [next_pub, next_end]), default=None)
+
+
+def refresh_index_version(now=None) -> str:
+    """Store a new version of the poll list and return it."""
+    now = now or timezone.now()
+    version = new_version()
+    cache.set(
+        INDEX_VERSION_KEY,
+        (version, next_index_change(now)),
+        timeout=settings.POLLS_RESULTS_CACHE_TIMEOUT
+    )
+    return version
+
+
+def index_version(now=None) -> str:
+    """Return version of the poll list.
+
+    The version is stored with the time it expire, the next publish or end
+    date of a question, and is only made again after that time, after a
+    question changed or when it was evicted from the cache.
+    """
+    now = now or timezone.now()
+    stored = cache.get(INDEX_VERSION_KEY)
+    if stored is None or (stored[1] is not None and now >= stored[1]):
+        return refresh_index_version(now)
+    return stored[0]
+
+
+def invalidate_index() -> None:
+    """Change version of the poll list now and after transaction commit."""
+    refresh_index_version()
+    transaction.on_commit(refresh_index_version)
+
+
+def make_etag(*parts) -> str:
+    """Return quoted ETag of parts."""
+    digest = hashlib.md5(
+        "|".join(map(str, parts)).encode(), usedforsecurity=False
+    ).hexdigest()
+    return quote_etag(digest)
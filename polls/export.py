@@ -0,0 +1,142 @@
+"""Module for exporting poll results and raw votes.
+
+Rows are read with ``QuerySet.iterator()`` (a server-side cursor on
+PostgreSQL) and encoded one at a time, so an export of any size can be
+streamed with a flat memory use by the export view and the
+``export_polls_data`` command.
+"""
+
+import csv
+import datetime
+import json
+from typing import Iterable, Iterator, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Choice, Question, Vote
+
+# Rows fetched from the database at once
+EXPORT_CHUNK_SIZE = 2000
+
+# Columns of each kind of export, in order
+EXPORT_FIELDS = {
+    "results": [
+        "question_id", "question_text", "pub_date", "end_date",
+        "choice_id", "choice_text", "votes",
+    ],
+    "votes": ["vote_id", "question_id", "choice_id", "user_id"],
+}
+
+# Content type of each format
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def parse_bound(value: Optional[str]) -> Optional[datetime.datetime]:
+    """Return aware datetime of a date or datetime string, None if empty.
+
+    Raises:
+        ValueError: if value isn't a date or a datetime
+    """
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"{value!r} isn't a date or a datetime")
+        parsed = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_questions(question_id: int = None, since=None, until=None):
+    """Return questions to export.
+
+    Votes have no timestamp so the date range apply to the publish date of
+    their question.
+
+    Args:
+        question_id (int | None): only this question, every question if None
+        since (datetime | None): published at or after this time
+        until (datetime | None): published before this time
+    """
+    questions = Question.objects.all()
+    if question_id is not None:
+        questions = questions.filter(pk=question_id)
+    if since is not None:
+        questions = questions.filter(pub_date__gte=since)
+    if until is not None:
+        questions = questions.filter(pub_date__lt=until)
+    return questions
+
+
+def result_rows(questions) -> Iterator[dict]:
+    """Yield tally of every choice of questions."""
+    return Choice.objects.filter(
+        question__in=questions.values("pk")
+    ).order_by("question_id", "pk").values(
+        "question_id",
+        "choice_text",
+        question_text=F("question__question_text"),
+        pub_date=F("question__pub_date"),
+        end_date=F("question__end_date"),
+        choice_id=F("pk"),
+        votes=F("vote_count"),
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def vote_rows(questions) -> Iterator[dict]:
+    """Yield every vote on questions."""
+    return Vote.objects.filter(
+        question__in=questions.values("pk")
+    ).order_by("pk").values(
+        "question_id", "choice_id", "user_id", vote_id=F("pk")
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+class _Echo:
+    """File-like object that return what is written, for csv.writer."""
+
+    def write(self, value: str) -> str:
+        """Return value instead of storing it."""
+        return value
+
+
+def encode_csv(rows: Iterable[dict], fields: list[str]) -> Iterator[str]:
+    """Yield CSV header then one line per row."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([
+            row[field].isoformat() if isinstance(row[field], datetime.datetime)
+            else row[field]
+            for field in fields
+        ])
+
+
+def encode_ndjson(rows: Iterable[dict], fields: list[str]) -> Iterator[str]:
+    """Yield one JSON object per line per row."""
+    for row in rows:
+        yield json.dumps(
+            {field: row[field] for field in fields}, cls=DjangoJSONEncoder
+        ) + "\n"
+
+
+def export_lines(kind: str, fmt: str, questions) -> Iterator[str]:
+    """Yield lines of an export.
+
+    Args:
+        kind (str): "results" or "votes"
+        fmt (str): "csv" or "ndjson"
+        questions (QuerySet): questions to export
+    """
+    rows = result_rows(questions) if kind == "results" else vote_rows(questions)
+    encode = encode_csv if fmt == "csv" else encode_ndjson
+    return encode(rows, EXPORT_FIELDS[kind])
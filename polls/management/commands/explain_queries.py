@@ -0,0 +1,181 @@
+"""Management command for checking query plans of the polls views."""
+
+import json
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from polls.models import Choice, Question, Vote
+from polls.pagination import keyset_filter
+
+# Full table scan in a plan, group 1 is the table
+FULL_SCAN_PATTERNS = {
+    # "SCAN polls_vote" but not "SCAN polls_vote USING COVERING INDEX ..."
+    "sqlite": re.compile(r"\bSCAN (\w+)(?! USING)(?:\s|$)"),
+    "postgresql": re.compile(r"\bSeq Scan on (\w+)"),
+}
+INDEX_PATTERN = re.compile(r"\bINDEX (\w+)|\bIndex (?:Only )?Scan (?:Backward )?using (\w+)")
+
+
+def view_queries(question_id: int, user_id: int) -> dict:
+    """Return queries that the views run, by name.
+
+    Args:
+        question_id (int): question used for detail, results and vote
+        user_id (int): user used for vote lookups
+
+    Returns:
+        dict[str, QuerySet]: query of each view step
+    """
+    now = timezone.now()
+    page_size = 21
+    position = (now, question_id)
+    return {
+        "index all": keyset_filter(
+            Question.objects.published(now).with_availability(now), None
+        )[:page_size],
+        "index open": keyset_filter(
+            Question.objects.open(now).with_availability(now), None
+        )[:page_size],
+        "index closed": keyset_filter(
+            Question.objects.closed(now).with_availability(now), None
+        )[:page_size],
+        "index next page": keyset_filter(
+            Question.objects.published(now).with_availability(now), position
+        )[:page_size],
+        "detail question": Question.objects.filter(pk=question_id),
+        "detail choices": Choice.objects.filter(question_id=question_id),
+        "detail previous vote": Vote.objects.filter(
+            user_id=user_id, question_id=question_id
+        ).values_list("choice_id", flat=True)[:1],
+        "results tally": Choice.objects.filter(question_id=question_id).tally(),
+        "vote previous vote": Vote.objects.select_related("choice").filter(
+            user_id=user_id, question_id=question_id
+        )[:1],
+    }
+
+
+def analyze(plan: str, vendor: str) -> dict:
+    """Return tables read by full scan and indexes used by a plan."""
+    pattern = FULL_SCAN_PATTERNS.get(vendor)
+    scans = sorted(set(pattern.findall(plan))) if pattern else []
+    indexes = {
+        name for match in INDEX_PATTERN.findall(plan) for name in match if name
+    }
+    if "PRIMARY KEY" in plan:
+        indexes.add("primary key")
+    return {"full_scans": scans, "indexes": sorted(indexes)}
+
+
+class Command(BaseCommand):
+    """Run EXPLAIN on queries of each view and report plan regressions."""
+
+    help = (
+        "Show query plan of every query the polls views run and report "
+        "full table scans, or plans that got worse than a saved baseline."
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--baseline",
+            help="JSON file of plans to compare with, fail on regressions.",
+        )
+        parser.add_argument(
+            "--save",
+            help="Write plans to this JSON file to use as a baseline later.",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Fail if any query read a whole table.",
+        )
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Print full plan of every query.",
+        )
+
+    def handle(self, *args, **options):
+        """Explain every query and compare with baseline."""
+        plans = self.explain_all()
+
+        regressions = []
+        baseline = self.load_baseline(options["baseline"])
+        for name, result in plans.items():
+            problems = self.problems(result, baseline.get(name), options["check"])
+            regressions.extend(f"{name}: {problem}" for problem in problems)
+            self.report(name, result, problems, options["verbose_plans"])
+
+        if options["save"]:
+            with open(options["save"], "w") as file:
+                json.dump(plans, file, indent=2, sort_keys=True)
+            self.stdout.write(f"Plans saved to {options['save']}")
+
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} plan regression(s):\n" + "\n".join(regressions)
+            )
+
+    def explain_all(self) -> dict:
+        """Return plan and its analysis of every view query."""
+        question = Question.objects.order_by("pk").first()
+        user = User.objects.order_by("pk").first()
+        queries = view_queries(question.pk if question else 1, user.pk if user else 1)
+
+        plans = {}
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # Small tables are read by Seq Scan whatever index exist,
+                # show which index the planner would use on a large table
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            for name, queryset in queries.items():
+                plan = queryset.explain()
+                plans[name] = {"plan": plan, **analyze(plan, connection.vendor)}
+        return plans
+
+    @staticmethod
+    def load_baseline(path) -> dict:
+        """Return saved plans, empty if no baseline is given."""
+        if not path:
+            return {}
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (OSError, ValueError) as err:
+            raise CommandError(f"Can't read baseline {path}: {err}")
+
+    @staticmethod
+    def problems(result: dict, saved, check: bool) -> list[str]:
+        """Return regressions of a plan compared with baseline."""
+        problems = []
+        saved_scans = set(saved["full_scans"]) if saved else set()
+        new_scans = set(result["full_scans"]) - saved_scans
+        if new_scans and (check or saved):
+            problems.append(f"full scan of {', '.join(sorted(new_scans))}")
+
+        if saved:
+            lost = set(saved["indexes"]) - set(result["indexes"])
+            if lost:
+                problems.append(f"no longer use {', '.join(sorted(lost))}")
+        return problems
+
+    def report(self, name: str, result: dict, problems: list, verbose: bool):
+        """Print summary of a plan."""
+        indexes = ", ".join(result["indexes"]) or "no index"
+        line = f"{name:<26} {indexes}"
+        if problems:
+            self.stdout.write(self.style.ERROR(f"{line}  <- {'; '.join(problems)}"))
+        elif result["full_scans"]:
+            scans = ", ".join(result["full_scans"])
+            self.stdout.write(self.style.WARNING(f"{line}  (full scan of {scans})"))
+        else:
+            self.stdout.write(line)
+
+        if verbose:
+            for plan_line in result["plan"].splitlines():
+                self.stdout.write(f"    {plan_line}")
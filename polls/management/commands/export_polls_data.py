@@ -0,0 +1,67 @@
+"""Management command for exporting poll results and raw votes."""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from polls.export import (
+    EXPORT_FIELDS,
+    EXPORT_FORMATS,
+    export_lines,
+    export_questions,
+    parse_bound
+)
+
+
+class Command(BaseCommand):
+    """Write results or votes as CSV or NDJSON, one row at a time."""
+
+    help = (
+        "Export tally of every choice (results) or raw votes (votes) as CSV "
+        "or NDJSON, of one question or of questions published in a range."
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument("kind", choices=sorted(EXPORT_FIELDS))
+        parser.add_argument(
+            "--format",
+            choices=sorted(EXPORT_FORMATS),
+            default="csv",
+        )
+        parser.add_argument(
+            "--question",
+            type=int,
+            help="Only export this question id.",
+        )
+        parser.add_argument(
+            "--since",
+            help="Only questions published at or after this date or datetime.",
+        )
+        parser.add_argument(
+            "--until",
+            help="Only questions published before this date or datetime.",
+        )
+        parser.add_argument(
+            "--output",
+            help="File to write, standard output by default.",
+        )
+
+    def handle(self, *args, **options):
+        """Write every line of the export."""
+        try:
+            questions = export_questions(
+                question_id=options["question"],
+                since=parse_bound(options["since"]),
+                until=parse_bound(options["until"]),
+            )
+        except ValueError as err:
+            raise CommandError(err)
+
+        lines = export_lines(options["kind"], options["format"], questions)
+        if not options["output"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        with open(options["output"], "w", newline="", encoding="utf-8") as file:
+            file.writelines(lines)
+        self.stderr.write(f"Exported {options['kind']} to {options['output']}")
@@ -0,0 +1,87 @@
+"""Management command for bulk loading poll data and synthetic load data."""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from polls.bulk_load import BulkLoader, ConflictingRow, InvalidReference, generate_data
+
+DEFAULT_FILES = [
+    "data/polls-v4.json",
+    "data/users.json",
+    "data/votes-v4.json",
+]
+
+
+class Command(BaseCommand):
+    """Load fixtures of data/ or generate synthetic data with bulk inserts."""
+
+    help = (
+        "Load poll, user and vote fixtures in batches inside one transaction, "
+        "or generate synthetic data with --generate."
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "files",
+            nargs="*",
+            help=f"Fixture files to load (default: {' '.join(DEFAULT_FILES)}).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows written per INSERT.",
+        )
+        parser.add_argument(
+            "--generate",
+            type=int,
+            metavar="VOTES",
+            help="Generate this many votes with their questions and users.",
+        )
+        parser.add_argument("--questions", type=int, default=100)
+        parser.add_argument("--choices", type=int, default=4)
+        parser.add_argument("--users", type=int)
+        parser.add_argument("--seed", type=int)
+
+    def handle(self, *args, **options):
+        """Load every file or generate data, all or nothing."""
+        start = time.monotonic()
+
+        try:
+            with transaction.atomic():
+                loader = BulkLoader(batch_size=options["batch_size"])
+                if options["generate"] is not None:
+                    generate_data(
+                        loader,
+                        options["generate"],
+                        questions=options["questions"],
+                        choices=options["choices"],
+                        users=options["users"],
+                        seed=options["seed"],
+                    )
+                else:
+                    self.load_files(loader, options["files"] or DEFAULT_FILES)
+                loader.finish()
+        except (InvalidReference, ConflictingRow, ValueError) as err:
+            raise CommandError(f"Nothing loaded: {err}")
+        except IntegrityError as err:
+            raise CommandError(f"Nothing loaded, the database refused a row: {err}")
+
+        for label, count in sorted(loader.counts.items()):
+            self.stdout.write(f"{label}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Loaded in {time.monotonic() - start:.1f}s")
+        )
+
+    def load_files(self, loader: BulkLoader, files: list[str]) -> None:
+        """Load fixture files in the given order."""
+        for path in files:
+            try:
+                with open(path, encoding="utf-8") as file:
+                    loader.load_file(file)
+            except OSError as err:
+                raise CommandError(f"Can't read {path}: {err}")
+            self.stdout.write(f"Read {path}")
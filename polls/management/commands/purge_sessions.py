@@ -0,0 +1,73 @@
+"""Management command for deleting expired sessions in batches."""
+
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from polls.retry import retry_on_lock
+
+
+def delete_batch(model, keys: list) -> int:
+    """Delete sessions by key and return how many were deleted."""
+    deleted, _ = model.objects.filter(pk__in=keys).delete()
+    return deleted
+
+
+class Command(BaseCommand):
+    """Delete expired sessions a batch at a time.
+
+    ``clearsessions`` delete every expired session with a single DELETE
+    that lock the table while it runs, on SQLite it block every vote until
+    it is done. Each batch here is a short transaction of its own.
+    """
+
+    help = "Delete expired sessions in batches of --batch-size rows."
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Sessions deleted per statement.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to wait between batches to let other writers in.",
+        )
+
+    def handle(self, *args, **options):
+        """Delete expired sessions until none is left."""
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store, "get_model_class"):
+            self.stdout.write(
+                f"{settings.SESSION_ENGINE} doesn't store sessions in the "
+                "database, nothing to purge"
+            )
+            return
+
+        model = store.get_model_class()
+        expired = model.objects.filter(expire_date__lt=timezone.now())
+        batch_size = options["batch_size"]
+        total = batches = 0
+
+        while True:
+            keys = list(expired.values_list("pk", flat=True)[:batch_size])
+            if not keys:
+                break
+            total += retry_on_lock(delete_batch, model, keys)
+            batches += 1
+            if len(keys) < batch_size:
+                break
+            time.sleep(options["pause"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {total} expired session(s) in {batches} batch(es)"
+            )
+        )
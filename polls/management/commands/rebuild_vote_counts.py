@@ -0,0 +1,63 @@
+"""Management command for rebuild the denormalized vote tally."""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from polls.models import Choice
+from polls.results_cache import invalidate_all_results
+
+
+class Command(BaseCommand):
+    """Rebuild or verify Choice.vote_count from Vote rows."""
+
+    help = "Rebuild (or verify with --check) Choice.vote_count from Vote rows."
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report choices that are out of sync, do not write.",
+        )
+        parser.add_argument(
+            "--question",
+            type=int,
+            help="Limit to choices of this question id.",
+        )
+
+    def handle(self, *args, **options):
+        """Verify every tally then rebuild it unless --check is given."""
+        choices = Choice.objects.all()
+        if options["question"] is not None:
+            choices = choices.filter(question_id=options["question"])
+
+        with transaction.atomic():
+            stale = list(
+                choices.out_of_sync().values_list(
+                    "id", "vote_count", "counted_votes"
+                )
+            )
+            for choice_id, stored, counted in stale:
+                self.stdout.write(
+                    f"Choice {choice_id}: stored {stored}, counted {counted}"
+                )
+
+            if options["check"]:
+                if stale:
+                    raise CommandError(
+                        f"{len(stale)} choice(s) have a stale vote count"
+                    )
+                self.stdout.write(self.style.SUCCESS("All vote counts match"))
+                return
+
+            updated = choices.rebuild_vote_counts()
+
+        # Tally was changed with update() which doesn't send signals
+        invalidate_all_results()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt vote count of {updated} choice(s), "
+                f"{len(stale)} were out of sync"
+            )
+        )
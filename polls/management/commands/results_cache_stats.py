@@ -0,0 +1,41 @@
+"""Management command for show hit and miss of the results cache."""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from polls.checks import LOCAL_CACHE
+from polls.results_cache import cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    """Show number of hits and misses of the results cache."""
+
+    help = "Show hit and miss counters of the results cache."
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset counters to zero after showing them.",
+        )
+
+    def handle(self, *args, **options):
+        """Print counters and hit ratio."""
+        if settings.CACHES["default"]["BACKEND"] == LOCAL_CACHE:
+            self.stderr.write(
+                "LocMemCache is private to each process, counters of the "
+                "running server can't be read from this command. Use a cache "
+                "shared between processes (CACHE_BACKEND)."
+            )
+        stats = cache_stats()
+        lookups = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / lookups * 100 if lookups else 0.0
+
+        self.stdout.write(f"hits: {stats['hits']}")
+        self.stdout.write(f"misses: {stats['misses']}")
+        self.stdout.write(f"hit ratio: {ratio:.1f}%")
+
+        if options["reset"]:
+            reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
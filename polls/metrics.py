@@ -0,0 +1,252 @@
+"""Module for per-view request metrics.
+
+``MetricsMiddleware`` measure latency, number of SQL queries and time spent
+in the database of every request, labelled by URL name, and keep them in
+a per-process registry that ``render_metrics()`` format as Prometheus text.
+
+Queries are counted by a wrapper appended to ``execute_wrappers`` of every
+database connection (the list used by ``connection.execute_wrapper()``).
+The wrapper add to the collector of the current request found in a context
+variable, so queries run in ``sync_to_async`` threads by async views are
+counted too. Queries run while a streaming response is consumed are not.
+
+Metrics are kept per process, every worker of a multi-process server serve
+its own counters.
+"""
+
+import bisect
+import contextvars
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('polls')
+
+# Upper bounds of latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Upper bounds of query count buckets
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Label of requests that didn't match any URL pattern
+UNRESOLVED_VIEW = "<unresolved>"
+
+_collector = contextvars.ContextVar("polls_metrics_collector", default=None)
+
+
+class QueryCollector:
+    """Number of queries and database time of one request."""
+
+    __slots__ = ("queries", "duration")
+
+    def __init__(self):
+        """Create an empty collector."""
+        self.queries = 0
+        self.duration = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper that time queries of the request being measured."""
+    collector = _collector.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        collector.queries += 1
+        collector.duration += time.perf_counter() - start
+
+
+def install_query_wrapper(sender=None, connection=None, **kwargs) -> None:
+    """Add record_query to a connection, to open connections if None.
+
+    Connected to ``connection_created`` for new connections and to
+    ``request_started``, which is sent from the thread that run the sync
+    part of the request, for connections opened before the middleware.
+    """
+    wrapped = [connection] if connection else connections.all(initialized_only=True)
+    for current in wrapped:
+        if record_query not in current.execute_wrappers:
+            current.execute_wrappers.append(record_query)
+
+
+class _Histogram:
+    """Count of observations per bucket, their sum and count."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple):
+        """Create an empty histogram with bucket upper bounds."""
+        self.bounds = bounds
+        # Last slot count observations above the largest bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Add one observation."""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> list[str]:
+        """Return Prometheus lines of cumulative buckets, sum and count."""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum:g}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics of every view since the process started."""
+
+    def __init__(self):
+        """Create an empty registry."""
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._queries = {}
+        self._db_time = {}
+
+    def observe(self, view: str, duration: float, queries: int, db_time: float):
+        """Record one request of view."""
+        with self._lock:
+            if view not in self._latency:
+                self._latency[view] = _Histogram(LATENCY_BUCKETS)
+                self._queries[view] = _Histogram(QUERY_BUCKETS)
+                self._db_time[view] = 0.0
+            self._latency[view].observe(duration)
+            self._queries[view].observe(queries)
+            self._db_time[view] += db_time
+
+    def reset(self) -> None:
+        """Forget every recorded request."""
+        with self._lock:
+            self._latency.clear()
+            self._queries.clear()
+            self._db_time.clear()
+
+    def render(self) -> str:
+        """Return metrics in Prometheus text format."""
+        with self._lock:
+            views = sorted(self._latency)
+            lines = [
+                "# HELP polls_request_duration_seconds Request latency by view.",
+                "# TYPE polls_request_duration_seconds histogram",
+            ]
+            for view in views:
+                lines += self._latency[view].lines(
+                    "polls_request_duration_seconds", _labels(view)
+                )
+            lines += [
+                "# HELP polls_request_db_queries SQL queries per request by view.",
+                "# TYPE polls_request_db_queries histogram",
+            ]
+            for view in views:
+                lines += self._queries[view].lines(
+                    "polls_request_db_queries", _labels(view)
+                )
+            lines += [
+                "# HELP polls_request_db_duration_seconds_total Time spent in SQL queries by view.",
+                "# TYPE polls_request_db_duration_seconds_total counter",
+            ]
+            for view in views:
+                lines.append(
+                    f"polls_request_db_duration_seconds_total{{{_labels(view)}}} "
+                    f"{self._db_time[view]:g}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _labels(view: str) -> str:
+    """Return label set of a view with the value escaped."""
+    escaped = view.replace("\\", "\\\\").replace('"', '\\"')
+    return f'view="{escaped}"'
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Return registry of this process."""
+    return _registry
+
+
+def render_metrics() -> str:
+    """Return metrics of this process in Prometheus text format."""
+    return _registry.render()
+
+
+class MetricsMiddleware:
+    """Record latency, query count and database time of every request.
+
+    Enabled by ``POLLS_METRICS``, when it is off the middleware remove
+    itself from the chain. Requests slower than ``POLLS_METRICS_SLOW_REQUEST``
+    seconds are logged, 0 disable the log.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """Install query wrapper, skip the middleware if metrics are off."""
+        if not settings.POLLS_METRICS:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.slow_request = settings.POLLS_METRICS_SLOW_REQUEST
+        connection_created.connect(install_query_wrapper)
+        request_started.connect(install_query_wrapper)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """Measure the rest of the chain."""
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        collector = QueryCollector()
+        token = _collector.set(collector)
+        start = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            _collector.reset(token)
+            self.record(request, time.perf_counter() - start, collector)
+
+    async def __acall__(self, request):
+        """Measure the rest of the chain of an async request."""
+        collector = QueryCollector()
+        token = _collector.set(collector)
+        start = time.perf_counter()
+        try:
+            return await self.get_response(request)
+        finally:
+            _collector.reset(token)
+            self.record(request, time.perf_counter() - start, collector)
+
+    def record(self, request, duration: float, collector: QueryCollector):
+        """Add request to the registry and log it if it is slow."""
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else UNRESOLVED_VIEW
+        _registry.observe(view, duration, collector.queries, collector.duration)
+
+        if self.slow_request and duration >= self.slow_request:
+            logger.warning(
+                "Slow request %s %s (%s) %.3fs, %d queries in %.3fs",
+                request.method,
+                request.path,
+                view,
+                duration,
+                collector.queries,
+                collector.duration
+            )
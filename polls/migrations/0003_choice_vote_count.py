@@ -0,0 +1,39 @@
+# Generated by Django 5.1 on 2026-10-18 09:00
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_vote_count(apps, schema_editor):
+    """Fill the new vote_count column from the existing Vote rows."""
+    Choice = apps.get_model("polls", "Choice")
+    Vote = apps.get_model("polls", "Vote")
+    Choice.objects.update(
+        vote_count=Coalesce(
+            Subquery(
+                Vote.objects.filter(choice=OuterRef("pk"))
+                .order_by()
+                .values("choice")
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0002_remove_choice_votes_vote'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='choice',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_vote_count, migrations.RunPython.noop),
+    ]
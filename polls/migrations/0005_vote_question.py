@@ -0,0 +1,76 @@
+# Generated by Django 5.1 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_vote_question(apps, schema_editor):
+    """Copy question from choice and keep only the latest vote per question."""
+    Choice = apps.get_model("polls", "Choice")
+    Vote = apps.get_model("polls", "Vote")
+
+    Vote.objects.update(
+        question_id=Subquery(
+            Choice.objects.filter(pk=OuterRef("choice_id")).values("question_id")
+        )
+    )
+
+    # Older code could store more than one vote of a user on the same question
+    duplicates = (
+        Vote.objects.values("user_id", "question_id")
+        .annotate(latest=Max("pk"), total=Count("pk"))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        Vote.objects.filter(
+            user_id=duplicate["user_id"],
+            question_id=duplicate["question_id"],
+        ).exclude(pk=duplicate["latest"]).delete()
+
+    # Removed duplicates must not be counted in the tally anymore
+    Choice.objects.update(
+        vote_count=Coalesce(
+            Subquery(
+                Vote.objects.filter(choice=OuterRef("pk"))
+                .order_by()
+                .values("choice")
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    # Every operation runs in its own transaction. On PostgreSQL the UPDATE of
+    # the question foreign key leave deferred trigger events that forbid an
+    # ALTER TABLE of polls_vote later in the same transaction.
+    atomic = False
+
+    dependencies = [
+        ('polls', '0004_question_pub_date_id_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vote',
+            name='question',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='polls.question'),
+        ),
+        migrations.RunPython(fill_vote_question, migrations.RunPython.noop, atomic=True),
+        migrations.AlterField(
+            model_name='vote',
+            name='question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='polls.question'),
+        ),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('user', 'question'), name='polls_vote_unique_user_question'),
+        ),
+    ]
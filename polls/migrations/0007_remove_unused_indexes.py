@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-18 04:51
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0006_question_end_pub_vote_question_choice_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='question',
+            name='polls_question_end_pub_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vote',
+            name='polls_vote_question_choice_idx',
+        ),
+    ]
@@ -1,15 +1,62 @@
 """File for create database model."""
 
 import datetime
-from django.db import models
+from collections import defaultdict
+from django.db import connections, models, router, transaction
+from django.db.models import (
+    BooleanField, Case, Count, ExpressionWrapper, F, FloatField, OuterRef, Q,
+    Subquery, Sum, When, Window
+)
+from django.db.models.functions import Coalesce, Greatest, NullIf
+from django.dispatch import Signal
 from django.utils import timezone
 from django.contrib.auth.models import User
 # Create your models here.
 
 
+class QuestionQuerySet(models.QuerySet):
+    """Queryset for question that evaluate availability in SQL.
+
+    Every method accept ``now`` so chained filters and annotations can be
+    evaluated against the same point in time.
+    """
+
+    @staticmethod
+    def open_condition(now: datetime.datetime) -> Q:
+        """Return condition of question that can be voted at ``now``."""
+        return Q(pub_date__lte=now) & (
+            Q(end_date__isnull=True) | Q(end_date__gte=now)
+        )
+
+    def published(self, now=None):
+        """Return question that already published."""
+        return self.filter(pub_date__lte=now or timezone.now())
+
+    def open(self, now=None):
+        """Return question that available to vote."""
+        return self.filter(self.open_condition(now or timezone.now()))
+
+    def closed(self, now=None):
+        """Return published question that already ended."""
+        now = now or timezone.now()
+        return self.published(now).filter(end_date__lt=now)
+
+    def with_availability(self, now=None):
+        """Annotate ``is_available`` which is the SQL version of can_vote()."""
+        return self.annotate(
+            is_available=Case(
+                When(self.open_condition(now or timezone.now()), then=True),
+                default=False,
+                output_field=BooleanField()
+            )
+        )
+
+
 class Question(models.Model):
     """Question model."""
 
+    objects = QuestionQuerySet.as_manager()
+
     question_text = models.CharField(max_length=200)
     pub_date = models.DateTimeField(
         "date published",
@@ -22,6 +69,15 @@ class Question(models.Model):
         null=True
         )
 
+    class Meta:
+        indexes = [
+            # Poll list is ordered and paginated by (pub_date, id)
+            models.Index(
+                fields=["-pub_date", "-id"],
+                name="polls_question_pub_id_idx"
+            ),
+        ]
+
     def __str__(self) -> str:
         """Return question text."""
         return str(self.question_text)
@@ -76,33 +132,321 @@ class Question(models.Model):
 
     @property
     def available(self) -> bool:
-        """Return a boolean vales which tell that does question is available or not."""
+        """Return a boolean vales which tell that does question is available or not.
+
+        Use ``is_available`` annotation from
+        ``Question.objects.with_availability()`` when it was loaded.
+        """
+        if "is_available" in self.__dict__:
+            return self.is_available
         return self.can_vote()
 
 
+def counted_votes():
+    """Return a subquery that counts Vote rows of the outer choice."""
+    return Coalesce(
+        Subquery(
+            Vote.objects.filter(choice=OuterRef("pk"))
+            .order_by()
+            .values("choice")
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0
+    )
+
+
+class ChoiceQuerySet(models.QuerySet):
+    """Queryset for choice with helpers to maintain the vote tally."""
+
+    def with_counted_votes(self):
+        """Annotate each choice with the number of Vote rows it really has."""
+        return self.annotate(counted_votes=counted_votes())
+
+    def out_of_sync(self):
+        """Return choices whose vote_count differs from their Vote rows."""
+        return self.with_counted_votes().exclude(
+            vote_count=F("counted_votes")
+        )
+
+    def tally(self):
+        """Annotate choices with the question total and their percentage.
+
+        Total is computed with a window function so choices, their counts,
+        total and percentage are read with a single query.
+        """
+        total = Window(Sum("vote_count"), partition_by=[F("question_id")])
+        return self.annotate(
+            total_votes=total,
+            percentage=Coalesce(
+                ExpressionWrapper(
+                    F("vote_count") * 100.0 / NullIf(total, 0),
+                    output_field=FloatField()
+                ),
+                0.0
+            )
+        ).order_by("pk")
+
+    def move_vote(self, old_choice_id, new_choice_id) -> None:
+        """Move one vote in the tally from old choice to new choice.
+
+        Must be called in the same transaction that writes the Vote row.
+
+        Args:
+            old_choice_id (int | None): previous choice, None for a new vote
+            new_choice_id (int): choice that receive the vote
+        """
+        if old_choice_id == new_choice_id:
+            return
+        deltas = {new_choice_id: 1}
+        if old_choice_id is not None:
+            deltas[old_choice_id] = -1
+        self.apply_deltas(deltas)
+
+    def remove_votes(self, votes) -> set[int]:
+        """Take votes about to be deleted out of the tally.
+
+        Votes are counted per choice with one query and removed with a
+        single UPDATE, whatever the number of votes.
+
+        Args:
+            votes (QuerySet[Vote]): votes that are deleted
+
+        Returns:
+            set[int]: questions whose tally changed
+        """
+        counts = votes.order_by().values("choice_id", "question_id").annotate(
+            count=Count("pk")
+        )
+        deltas = {}
+        question_ids = set()
+        for row in counts:
+            deltas[row["choice_id"]] = -row["count"]
+            question_ids.add(row["question_id"])
+        self.apply_deltas(deltas)
+        return question_ids
+
+    def apply_deltas(self, deltas: dict[int, int]) -> None:
+        """Add delta to tally of every choice with a single UPDATE.
+
+        Tally never goes below 0, a tally that is stale from votes loaded
+        without signals is left to rebuild_vote_counts instead of failing
+        the vote.
+
+        Args:
+            deltas (dict[int, int]): map choice id to change of its tally
+        """
+        deltas = {pk: delta for pk, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        self.filter(pk__in=deltas).update(
+            vote_count=Greatest(
+                F("vote_count") + Case(
+                    *[When(pk=pk, then=delta) for pk, delta in deltas.items()],
+                    default=0
+                ),
+                0
+            )
+        )
+
+    def rebuild_vote_counts(self) -> int:
+        """Recompute vote_count from Vote rows.
+
+        Returns:
+            int: number of choices that got updated
+        """
+        return self.update(vote_count=counted_votes())
+
+
 class Choice(models.Model):
     """Question Choice model."""
 
+    objects = ChoiceQuerySet.as_manager()
+
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     choice_text = models.CharField(max_length=200)
-    # votes = models.IntegerField(default=0)
+    # Denormalized tally of Vote rows pointing at this choice. It is kept in
+    # sync by the vote() view and can be rebuilt with the
+    # ``rebuild_vote_counts`` management command.
+    vote_count = models.PositiveIntegerField(default=0)
 
     @property
     def votes(self) -> int:
         """Return number of votes on this choice."""
-        return self.vote_set.count()
+        return self.vote_count
 
     def __str__(self) -> str:
         """Return choice text."""
         return str(self.choice_text)
 
 
+class VoteQuerySet(models.QuerySet):
+    """Queryset for vote with the write path of a user vote."""
+
+    def lock_voters(self, user_ids) -> None:
+        """Lock rows of users so votes of a user are written one at a time.
+
+        The vote row of a first vote doesn't exist yet and can't be locked,
+        without this two first votes of a user read "no previous vote" and
+        both add to the tally. Must be called in the transaction writing
+        the votes. SQLite has no row lock, its write transaction already
+        run one at a time.
+
+        Args:
+            user_ids (Iterable[int]): users about to vote
+        """
+        if not connections[self.db].features.has_select_for_update:
+            return
+        list(
+            User.objects.using(self.db).select_for_update()
+            .filter(pk__in=user_ids).order_by("pk").values_list("pk", flat=True)
+        )
+
+    def cast(self, user, choice):
+        """Record vote of user for choice and update the tally.
+
+        The vote is written with a single ``INSERT ... ON CONFLICT DO
+        UPDATE`` on (user, question) so concurrent submissions can't create
+        duplicate votes, after the row of the user is locked so the previous
+        vote read here is still true when the tally is updated.
+
+        Args:
+            user (User): user who vote
+            choice (Choice): selected choice
+
+        Returns:
+            Choice | None: previous choice of user on this question,
+                           None if this is the first vote
+        """
+        with transaction.atomic(using=self.db):
+            self.lock_voters([user.pk])
+            previous = self.select_related("choice").filter(
+                user=user, question_id=choice.question_id
+            ).first()
+            previous_choice = previous.choice if previous else None
+
+            if previous_choice is None or previous_choice.pk != choice.pk:
+                self.bulk_create(
+                    [Vote(user=user, question_id=choice.question_id, choice=choice)],
+                    update_conflicts=True,
+                    unique_fields=["user", "question"],
+                    update_fields=["choice"],
+                )
+                Choice.objects.move_vote(
+                    previous_choice.pk if previous_choice else None,
+                    choice.pk
+                )
+
+        return previous_choice
+
+    def cast_many(self, entries) -> int:
+        """Record many votes at once and update the tally.
+
+        Used to flush buffered votes. When a user vote on the same question
+        more than once in the batch only the last vote is kept.
+
+        Args:
+            entries (Iterable[tuple[int, int, int]]): (user id, question id,
+                                                      choice id) in order
+                                                      of submission
+
+        Returns:
+            int: number of vote rows written
+        """
+        latest = {}
+        for user_id, question_id, choice_id in entries:
+            latest[(user_id, question_id)] = choice_id
+        if not latest:
+            return 0
+
+        user_ids = {user_id for user_id, _ in latest}
+        question_ids = {question_id for _, question_id in latest}
+
+        with transaction.atomic(using=self.db):
+            self.lock_voters(user_ids)
+            stored = {
+                (user_id, question_id): choice_id
+                for user_id, question_id, choice_id
+                in self.filter(
+                    user_id__in=user_ids,
+                    question_id__in=question_ids
+                ).values_list("user_id", "question_id", "choice_id")
+            }
+
+            changed = {
+                key: choice_id for key, choice_id in latest.items()
+                if stored.get(key) != choice_id
+            }
+            self.bulk_create(
+                [
+                    Vote(user_id=user_id, question_id=question_id, choice_id=choice_id)
+                    for (user_id, question_id), choice_id in changed.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["user", "question"],
+                update_fields=["choice"],
+            )
+
+            deltas = defaultdict(int)
+            for key, choice_id in changed.items():
+                deltas[choice_id] += 1
+                if key in stored:
+                    deltas[stored[key]] -= 1
+            Choice.objects.apply_deltas(deltas)
+
+        return len(changed)
+
+    def delete(self):
+        """Delete votes and take them out of the tally of their choices.
+
+        Votes deleted with their user are taken out by the pre_delete
+        receiver of User, votes deleted with their choice need no tally.
+        """
+        with transaction.atomic(using=self.db):
+            question_ids = Choice.objects.using(self.db).remove_votes(self)
+            deleted = super().delete()
+        votes_deleted.send(sender=Vote, question_ids=question_ids)
+        return deleted
+
+
+# Sent with question_ids after votes are deleted, as Vote has no delete
+# receivers so cascades from Question and Choice can delete votes in bulk
+votes_deleted = Signal()
+
+
 class Vote(models.Model):
     """A vote by user."""
 
+    objects = VoteQuerySet.as_manager()
+
+    # Denormalized from choice.question to enforce one vote per question
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
     choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "question"],
+                name="polls_vote_unique_user_question"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Fill question from choice before save."""
+        if self.question_id is None:
+            self.question_id = self.choice.question_id
+        super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        """Delete vote and take it out of the tally of its choice."""
+        using = using or router.db_for_write(Vote, instance=self)
+        with transaction.atomic(using=using):
+            Choice.objects.using(using).apply_deltas({self.choice_id: -1})
+            deleted = super().delete(using=using, keep_parents=keep_parents)
+        votes_deleted.send(sender=Vote, question_ids={self.question_id})
+        return deleted
+
     def __str__(self) -> str:
         """Return choice test."""
         return self.choice_text
@@ -0,0 +1,118 @@
+"""Module for keyset (cursor) pagination of question list."""
+
+import base64
+import binascii
+import datetime
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from django.db.models import Q, QuerySet
+
+
+@dataclass
+class KeysetPage:
+    """A page of object from keyset pagination."""
+
+    object_list: list[Any]
+    next_cursor: Optional[str]
+    cursor: Optional[str] = None
+
+    @property
+    def has_next(self) -> bool:
+        """Return True if there is a page after this one."""
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        """Return True if this page isn't the first page."""
+        return self.cursor is not None
+
+
+def encode_cursor(pub_date: datetime.datetime, pk: int) -> str:
+    """Encode position of a question into an opaque url-safe cursor.
+
+    Args:
+        pub_date (datetime): published date of the last question in page
+        pk (int): primary key of the last question in page
+
+    Returns:
+        str: url-safe cursor
+    """
+    raw = f"{pub_date.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[tuple[datetime.datetime, int]]:
+    """Decode cursor from encode_cursor().
+
+    Returns:
+        tuple[datetime, int] | None: position of cursor,
+                                     None if cursor is invalid
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        pub_date, pk = raw.rsplit("|", 1)
+        return datetime.datetime.fromisoformat(pub_date), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def keyset_filter(
+    queryset: QuerySet,
+    position: Optional[tuple[datetime.datetime, int]]
+) -> QuerySet:
+    """Return queryset ordered by ``(-pub_date, -id)`` that start after position.
+
+    Args:
+        queryset (QuerySet): question queryset
+        position (tuple[datetime, int] | None): (pub_date, id) of last row
+                                                of previous page, if any
+
+    Returns:
+        QuerySet: ordered and filtered queryset
+    """
+    queryset = queryset.order_by("-pub_date", "-id")
+    if position is None:
+        return queryset
+
+    pub_date, pk = position
+    return queryset.filter(
+        Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+    )
+
+
+def keyset_paginate(
+    queryset: QuerySet,
+    cursor: Optional[str],
+    page_size: int
+) -> KeysetPage:
+    """Return page of question that come after cursor.
+
+    Queryset is ordered by ``(-pub_date, -id)`` and page is selected by
+    comparing with last row of previous page instead of OFFSET, so every
+    page is a single index range scan no matter how deep it is.
+
+    Args:
+        queryset (QuerySet): question queryset
+        cursor (str | None): cursor of previous page, None for first page
+        page_size (int): number of question per page
+
+    Returns:
+        KeysetPage: page of question
+    """
+    position = decode_cursor(cursor) if cursor else None
+    if position is None:
+        cursor = None
+    queryset = keyset_filter(queryset, position)
+
+    # Fetch one more row to know does next page exist
+    object_list = list(queryset[:page_size + 1])
+
+    next_cursor = None
+    if len(object_list) > page_size:
+        object_list = object_list[:page_size]
+        last = object_list[-1]
+        next_cursor = encode_cursor(last.pub_date, last.pk)
+
+    return KeysetPage(object_list, next_cursor, cursor)
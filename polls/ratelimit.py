@@ -0,0 +1,241 @@
+"""Module for rate limiting votes and logins with token buckets.
+
+Every client has a bucket per key of a scope, e.g. its IP address and its
+user for ``vote``. A bucket hold up to ``burst`` tokens and is refilled
+with ``rate`` tokens per second, each request take one token and a request
+that find a bucket empty is answered with 429 Too Many Requests before the
+view run, so a flood of votes or password guesses cost no transaction or
+password hash.
+
+Buckets are kept in this process by default. When POLLS_RATE_LIMIT_CACHE
+name a cache, buckets are kept there and shared by every worker using it.
+Reading and updating a shared bucket isn't atomic, concurrent requests of
+one client may both take the last token.
+
+The IP address is read by ``get_client_ip()``, which trust the first
+address of X-Forwarded-For, behind a proxy that doesn't overwrite that
+header a client can pick the IP it is limited by. The user bucket still
+apply to such a client.
+"""
+
+import functools
+import logging
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Optional
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .views import get_client_ip, has_session
+
+logger = logging.getLogger('polls')
+
+# Buckets kept in process before the least recently used are dropped
+MAX_LOCAL_BUCKETS = 100_000
+
+
+def refill(state: Optional[tuple], burst: int, rate: float, now: float) -> float:
+    """Return tokens of a bucket state (tokens, updated) at now."""
+    if state is None:
+        return float(burst)
+    tokens, updated = state
+    return min(float(burst), tokens + max(0.0, now - updated) * rate)
+
+
+def take(state: Optional[tuple], burst: int, rate: float, now: float):
+    """Take a token of a bucket.
+
+    Return the new state and seconds to wait before a token is available,
+    0 when the token was taken.
+    """
+    tokens = refill(state, burst, rate, now)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    wait = (1 - tokens) / rate if rate > 0 else math.inf
+    return (tokens, now), wait
+
+
+class LocalBuckets:
+    """Buckets kept in this process."""
+
+    def __init__(self, max_buckets: int = MAX_LOCAL_BUCKETS):
+        """Create an empty store of at most max_buckets buckets."""
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, burst: int, rate: float, now: float) -> float:
+        """Take a token of the bucket of key, return seconds to wait."""
+        with self._lock:
+            state, wait = take(self._buckets.get(key), burst, rate, now)
+            self._buckets[key] = state
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        """Drop every bucket."""
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBuckets:
+    """Buckets kept in a cache shared by every worker."""
+
+    def __init__(self, alias: str):
+        """Create a store of buckets in cache alias."""
+        self.cache = caches[alias]
+
+    def take(self, key: str, burst: int, rate: float, now: float) -> float:
+        """Take a token of the bucket of key, return seconds to wait."""
+        cache_key = f"polls:ratelimit:{key}"
+        state, wait = take(self.cache.get(cache_key), burst, rate, now)
+        # A bucket left alone this long is full again, same as a missing one
+        timeout = math.ceil(burst / rate) if rate > 0 else None
+        self.cache.set(cache_key, state, timeout=timeout)
+        return wait
+
+    def clear(self) -> None:
+        """Buckets in the cache expire on their own."""
+
+
+class RateLimiter:
+    """Token bucket limits of every scope, with counts of their hits."""
+
+    def __init__(self, buckets, clock: Callable[[], float] = time.time):
+        """Create limiter of buckets, clock return current time in seconds.
+
+        Wall clock time is used so workers sharing cached buckets agree.
+        """
+        self.buckets = buckets
+        self.clock = clock
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._reported = clock()
+
+    def hit(self, scope: str, key: str, value, burst: int, rate: float) -> float:
+        """Take a token of a client, return seconds to wait, 0 if allowed."""
+        wait = self.buckets.take(f"{scope}:{key}:{value}", burst, rate, self.clock())
+        if wait:
+            logger.debug("Rate limit of %s reached by %s %s", scope, key, value)
+        return wait
+
+    def count(self, scope: str, outcome: str) -> None:
+        """Count outcome of a request, log the counts once per log interval."""
+        now = self.clock()
+        with self._stats_lock:
+            self.stats[scope, outcome] += 1
+            if now - self._reported < settings.POLLS_RATE_LIMIT_LOG_INTERVAL:
+                return
+            self._reported = now
+            summary = ", ".join(
+                f"{scope} {outcome}={count}"
+                for (scope, outcome), count in sorted(self.stats.items())
+            )
+        logger.info("Rate limit stats: %s", summary)
+
+    def reset(self) -> None:
+        """Drop every bucket and count."""
+        self.buckets.clear()
+        with self._stats_lock:
+            self.stats.clear()
+            self._reported = self.clock()
+
+
+_limiter = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return rate limiter of this process, created on first use."""
+    global _limiter
+    if _limiter is None:
+        alias = settings.POLLS_RATE_LIMIT_CACHE
+        _limiter = RateLimiter(CacheBuckets(alias) if alias else LocalBuckets())
+    return _limiter
+
+
+def too_many_requests(wait: float) -> HttpResponse:
+    """Return 429 response telling the client when to retry."""
+    response = HttpResponse(
+        "Too many requests, please try again later.\n",
+        status=429,
+        content_type="text/plain; charset=utf-8"
+    )
+    response["Retry-After"] = str(max(1, math.ceil(wait)))
+    return response
+
+
+def client_key(request, key: str):
+    """Return value of a client key read from the request, None if missing."""
+    if key == "ip":
+        return get_client_ip(request)
+    if key == "username":
+        return request.POST.get("username", "").lower() or None
+    raise ValueError(f"Unknown rate limit key {key}")
+
+
+def check(request, scope: str, user_id=None) -> float:
+    """Take a token of every limit of scope, return seconds to wait.
+
+    Limits are checked in order and the first empty bucket stop the check,
+    so keys that need a lookup, like the user, are listed last.
+    """
+    limiter = get_rate_limiter()
+    for key, (burst, rate) in settings.POLLS_RATE_LIMITS[scope].items():
+        if key == "user":
+            if user_id is None and has_session(request):
+                user_id = request.session.get(SESSION_KEY)
+            value = user_id
+        else:
+            value = client_key(request, key)
+        if value is None:
+            continue
+        wait = limiter.hit(scope, key, value, burst, rate)
+        if wait:
+            limiter.count(scope, "limited")
+            return wait
+    limiter.count(scope, "allowed")
+    return 0.0
+
+
+def is_limited(request) -> bool:
+    """Return True if the request count toward the limits."""
+    return settings.POLLS_RATE_LIMIT and request.method == "POST"
+
+
+def rate_limit(scope: str):
+    """Decorate a view to answer 429 to POST over the limits of scope.
+
+    The limits of a scope are POLLS_RATE_LIMITS[scope]. Async views get the
+    user of the session before the check, as the session can't be read
+    synchronously there.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def wrapped(request, *args, **kwargs):
+                if is_limited(request):
+                    user_id = None
+                    if "user" in settings.POLLS_RATE_LIMITS[scope] and has_session(request):
+                        user_id = await request.session.aget(SESSION_KEY)
+                    wait = check(request, scope, user_id)
+                    if wait:
+                        return too_many_requests(wait)
+                return await view(request, *args, **kwargs)
+        else:
+            @functools.wraps(view)
+            def wrapped(request, *args, **kwargs):
+                if is_limited(request):
+                    wait = check(request, scope)
+                    if wait:
+                        return too_many_requests(wait)
+                return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
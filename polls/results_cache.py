@@ -0,0 +1,195 @@
+"""Module for caching tally of poll results.
+
+Tally of each question is stored in Django cache framework keyed by question
+id. It is populated on a miss and invalidated whenever a vote or a choice of
+the question change (see ``polls.signals`` and the vote() view).
+
+Every invalidation also change the version of the question results, used
+as ETag of the result page so an unchanged page isn't rendered again.
+"""
+
+import uuid
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+HITS_KEY = "polls:results:hits"
+MISSES_KEY = "polls:results:misses"
+GENERATION_KEY = "polls:results:generation"
+VERSION_KEY = "polls:results:version:{}"
+
+
+@dataclass
+class ChoiceResult:
+    """Tally of a choice as shown in the result page."""
+
+    pk: int
+    choice_text: str
+    vote_count: int
+    percentage: float = 0.0
+
+    @property
+    def id(self) -> int:
+        """Return choice id."""
+        return self.pk
+
+    @property
+    def votes(self) -> int:
+        """Return number of votes on this choice."""
+        return self.vote_count
+
+
+def results_key(question_id: int) -> str:
+    """Return cache key of tally of a question."""
+    generation = cache.get_or_set(GENERATION_KEY, 1, timeout=None)
+    return f"polls:results:{generation}:{question_id}"
+
+
+async def aresults_key(question_id: int) -> str:
+    """Async version of results_key()."""
+    generation = await cache.aget_or_set(GENERATION_KEY, 1, timeout=None)
+    return f"polls:results:{generation}:{question_id}"
+
+
+def new_version() -> str:
+    """Return a version token different from every previous one."""
+    return uuid.uuid4().hex
+
+
+def results_version(question_id: int) -> str:
+    """Return version of the results of a question.
+
+    Cost one cache lookup, a new version is made up when it was evicted.
+    """
+    key = VERSION_KEY.format(question_id)
+    values = cache.get_many([GENERATION_KEY, key])
+    version = values.get(key) or cache.get_or_set(
+        key, new_version, timeout=settings.POLLS_RESULTS_CACHE_TIMEOUT
+    )
+    return f"{values.get(GENERATION_KEY, 1)}.{version}"
+
+
+async def aresults_version(question_id: int) -> str:
+    """Async version of results_version()."""
+    key = VERSION_KEY.format(question_id)
+    values = await cache.aget_many([GENERATION_KEY, key])
+    version = values.get(key) or await cache.aget_or_set(
+        key, new_version, timeout=settings.POLLS_RESULTS_CACHE_TIMEOUT
+    )
+    return f"{values.get(GENERATION_KEY, 1)}.{version}"
+
+
+def _count(key: str) -> None:
+    """Increase a statistic counter."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_results(question) -> list[ChoiceResult]:
+    """Return tally of every choice of the question, read from cache if any.
+
+    Args:
+        question (Question): question to get result
+
+    Returns:
+        list[ChoiceResult]: tally of each choice ordered by choice id
+    """
+    key = results_key(question.pk)
+    rows = cache.get(key)
+
+    if rows is None:
+        _count(MISSES_KEY)
+        rows = [
+            (choice.pk, choice.choice_text, choice.vote_count, choice.percentage)
+            for choice in question.choice_set.tally()
+        ]
+        cache.set(key, rows, timeout=settings.POLLS_RESULTS_CACHE_TIMEOUT)
+    else:
+        _count(HITS_KEY)
+
+    return [ChoiceResult(*row) for row in rows]
+
+
+async def _acount(key: str) -> None:
+    """Async version of _count()."""
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=None)
+        await cache.aincr(key)
+
+
+async def aget_results(question) -> list[ChoiceResult]:
+    """Async version of get_results()."""
+    key = await aresults_key(question.pk)
+    rows = await cache.aget(key)
+
+    if rows is None:
+        await _acount(MISSES_KEY)
+        rows = [
+            (choice.pk, choice.choice_text, choice.vote_count, choice.percentage)
+            async for choice in question.choice_set.tally()
+        ]
+        await cache.aset(key, rows, timeout=settings.POLLS_RESULTS_CACHE_TIMEOUT)
+    else:
+        await _acount(HITS_KEY)
+
+    return [ChoiceResult(*row) for row in rows]
+
+
+def summarize_results(choice_list: list[ChoiceResult]) -> int:
+    """Recompute percentage of each choice after vote_count got changed.
+
+    Returns:
+        int: total number of votes
+    """
+    total = sum(choice.vote_count for choice in choice_list)
+    for choice in choice_list:
+        choice.percentage = choice.vote_count * 100.0 / total if total else 0.0
+    return total
+
+
+def invalidate_results(question_id: int) -> None:
+    """Drop cached tally and change version of a question now and on commit.
+
+    Doing it again on commit prevent a request that read the database
+    before commit from keeping a stale tally in the cache or under the
+    new version.
+    """
+    key = results_key(question_id)
+    version_key = VERSION_KEY.format(question_id)
+
+    def invalidate():
+        cache.delete(key)
+        cache.set(
+            version_key, new_version(), timeout=settings.POLLS_RESULTS_CACHE_TIMEOUT
+        )
+
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def invalidate_all_results() -> None:
+    """Drop cached tally of every question."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, timeout=None)
+
+
+def cache_stats() -> dict[str, int]:
+    """Return number of cache hits and misses."""
+    return {
+        "hits": cache.get(HITS_KEY, 0),
+        "misses": cache.get(MISSES_KEY, 0),
+    }
+
+
+def reset_cache_stats() -> None:
+    """Reset number of cache hits and misses to zero."""
+    cache.delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,58 @@
+"""Module for retrying writes that failed on a locked database.
+
+SQLite allow one writer at a time. A writer that can't get the lock within
+the busy timeout, or that hit a lock held by a shared-cache connection,
+fail with ``OperationalError: database is locked``. Those writes are safe to
+run again since the failed transaction was rolled back.
+"""
+
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+logger = logging.getLogger('polls')
+
+# Longest wait between two attempts in seconds
+MAX_BACKOFF = 1.0
+
+
+def is_lock_error(err: Exception) -> bool:
+    """Return True if err is caused by a lock held by another connection."""
+    return isinstance(err, OperationalError) and "locked" in str(err)
+
+
+def retry_on_lock(func, *args, **kwargs):
+    """Call func, call it again with jittered backoff while database is locked.
+
+    Retry happens only outside of a transaction, inside one the lock error
+    must roll back the whole transaction so it is raised to the caller.
+
+    Returns:
+        Any: return value of func
+    """
+    attempts = settings.POLLS_DB_LOCK_RETRIES
+    delay = settings.POLLS_DB_LOCK_RETRY_DELAY
+
+    for attempt in range(attempts + 1):
+        try:
+            return func(*args, **kwargs)
+        except OperationalError as err:
+            if (
+                attempt == attempts
+                or connection.in_atomic_block
+                or not is_lock_error(err)
+            ):
+                raise
+            # Full jitter so writers that collided don't collide again
+            backoff = random.uniform(0, min(delay * 2 ** attempt, MAX_BACKOFF))
+            logger.debug(
+                "Database locked, retry %s in %.3fs (%d/%d)",
+                getattr(func, "__name__", func),
+                backoff,
+                attempt + 1,
+                attempts
+            )
+            time.sleep(backoff)
@@ -0,0 +1,87 @@
+"""Module for signal receivers that keep tallies and cached results up to date."""
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .broadcast import publish_results
+from .conditional import invalidate_index
+from .models import Choice, Question, Vote, votes_deleted
+from .results_cache import invalidate_results
+
+# Vote has no pre_delete or post_delete receiver on purpose: Django would
+# then load and signal every vote of a deleted question or user one by one
+# instead of deleting them with a single query.
+
+
+@receiver(post_save, sender=Vote)
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def invalidate_question_results(sender, instance, **kwargs):
+    """Drop cached tally of question and tell its live viewers on change.
+
+    Args:
+        sender : Signal sender
+        instance (Vote | Choice): saved or deleted instance
+    """
+    invalidate_results(instance.question_id)
+    publish_results(instance.question_id)
+
+
+@receiver(post_save, sender=Vote)
+def count_created_vote(sender, instance, created, raw, **kwargs):
+    """Add a vote saved outside the vote path to the tally of its choice.
+
+    The vote path write votes with bulk_create, which send no signal, and
+    keep the tally itself. Votes loaded as fixtures are left to
+    rebuild_vote_counts.
+
+    Args:
+        sender : Signal sender
+        instance (Vote): saved vote
+        created (bool): True if the vote is new
+        raw (bool): True if the vote is loaded as is, e.g. by loaddata
+    """
+    if created and not raw:
+        Choice.objects.apply_deltas({instance.choice_id: 1})
+
+
+@receiver(pre_delete, sender=User)
+def remove_votes_of_deleted_user(sender, instance, **kwargs):
+    """Take votes of a user out of the tally before they are deleted with it.
+
+    Args:
+        sender : Signal sender
+        instance (User): deleted user
+    """
+    db = instance._state.db
+    question_ids = Choice.objects.using(db).remove_votes(
+        Vote.objects.using(db).filter(user=instance)
+    )
+    refresh_results(sender, question_ids)
+
+
+@receiver(votes_deleted, sender=Vote)
+def refresh_results(sender, question_ids, **kwargs):
+    """Drop cached tally of questions that lost votes and tell live viewers.
+
+    Args:
+        sender : Signal sender
+        question_ids (set[int]): questions whose votes got deleted
+    """
+    for question_id in question_ids:
+        invalidate_results(question_id)
+        publish_results(question_id)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_pages(sender, instance, **kwargs):
+    """Change version of the poll list and result page of a question.
+
+    Args:
+        sender : Signal sender
+        instance (Question): saved or deleted question
+    """
+    invalidate_index()
+    invalidate_results(instance.pk)
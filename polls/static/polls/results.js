@@ -0,0 +1,26 @@
+// Update the result table with live tally pushed by the results stream.
+(function () {
+    const table = document.getElementById("results");
+    if (!table || !table.dataset.streamUrl || !window.EventSource) {
+        return;
+    }
+
+    const votes = {};
+    table.querySelectorAll("tr[data-choice-id]").forEach(function (row) {
+        votes[row.dataset.choiceId] = Number(row.querySelector(".votes").textContent);
+    });
+
+    const source = new EventSource(table.dataset.streamUrl);
+    source.addEventListener("results", function (event) {
+        const update = JSON.parse(event.data);
+        Object.assign(votes, update.choices);
+
+        table.querySelectorAll("tr[data-choice-id]").forEach(function (row) {
+            const count = votes[row.dataset.choiceId] || 0;
+            const percentage = update.total ? count * 100 / update.total : 0;
+            row.querySelector(".votes").textContent = count;
+            row.querySelector(".percentage").textContent = percentage.toFixed(1) + "%";
+        });
+        document.getElementById("total-votes").textContent = update.total;
+    });
+})();
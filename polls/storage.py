@@ -0,0 +1,26 @@
+"""Module for the static files storage.
+
+``collectstatic`` save every static file under a name with a hash of its
+content, e.g. ``polls/style.4f1c9e2d7a3b.css``, and a gzip and brotli copy
+next to it. WhiteNoise serve the hashed names as immutable and the
+compressed copies to browsers accepting them, so a page load after the
+first one doesn't request static files again until they change.
+"""
+
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """Hashed, precompressed static files, plain names until collected.
+
+    Without a manifest, as in tests and in development before
+    ``collectstatic`` has run, ``{% static %}`` return the original name
+    instead of failing, served from the app directories by WhiteNoise or
+    runserver.
+    """
+
+    def stored_name(self, name):
+        """Return hashed name of a static file, name if nothing is collected."""
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
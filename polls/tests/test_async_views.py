@@ -0,0 +1,187 @@
+"""Polls app test file"""
+
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+from django.utils.cache import get_max_age
+
+from mysite.views import signup
+from polls import async_views, views
+from polls.buffer import VoteBuffer
+from polls.models import Vote
+from .helper import *
+
+urlpatterns = [
+    path("polls/", include(([
+        path("", views.IndexView.as_view(), name="index"),
+        path("<int:pk>/", async_views.AsyncDetailView.as_view(), name="detail"),
+        path(
+            "<int:pk>/results/",
+            async_views.AsyncResultsView.as_view(),
+            name="results"
+        ),
+        path(
+            "<int:pk>/results/stream/",
+            async_views.results_stream,
+            name="results_stream"
+        ),
+        path("<int:question_id>/vote/", async_views.vote, name="vote"),
+    ], "polls"))),
+    path("accounts/", include("django.contrib.auth.urls")),
+    path("signup/", signup, name="signup"),
+]
+
+
+@override_settings(ROOT_URLCONF="polls.tests.test_async_views")
+class AsyncViewTest(TestCase):
+    """
+    Test async detail, results and vote views
+    """
+
+    async def test_detail_show_choices(self):
+        """Detail page list every choice of the question"""
+        q, c1, c2 = await sync_to_async(create_dummies_question_and_2_choice)()
+
+        response = await self.async_client.get(reverse("polls:detail", args=(q.id,)))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, c1.choice_text)
+        self.assertContains(response, c2.choice_text)
+
+    async def test_detail_redirect_unpublished_question(self):
+        """Visitor is redirected from question that isn't published yet"""
+        q, _, _ = await sync_to_async(create_dummies_question_and_2_choice)(pub_days=1)
+
+        response = await self.async_client.get(reverse("polls:detail", args=(q.id,)))
+
+        self.assertRedirects(
+            response,
+            reverse("polls:index"),
+            fetch_redirect_response=False
+        )
+
+    async def test_detail_redirect_non_existent_question(self):
+        """Visitor is redirected from question that doesn't exist"""
+        response = await self.async_client.get(reverse("polls:detail", args=(999,)))
+
+        self.assertRedirects(
+            response,
+            reverse("polls:index"),
+            fetch_redirect_response=False
+        )
+
+    async def test_vote_require_login(self):
+        """Anonymous visitor is sent to the login page"""
+        q, c1, _ = await sync_to_async(create_dummies_question_and_2_choice)()
+
+        response = await self.async_client.post(
+            reverse("polls:vote", args=(q.id,)),
+            {"choice": c1.id}
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("login", response.url)
+        self.assertFalse(await Vote.objects.aexists())
+
+    async def test_vote_and_results(self):
+        """Vote is recorded and shown in the results page"""
+        q, c1, c2 = await sync_to_async(create_dummies_question_and_2_choice)()
+        user = await User.objects.acreate(username="tester")
+        await self.async_client.aforce_login(user)
+
+        response = await self.async_client.post(
+            reverse("polls:vote", args=(q.id,)),
+            {"choice": c1.id}
+        )
+        self.assertRedirects(
+            response,
+            reverse("polls:results", args=(q.id,)),
+            fetch_redirect_response=False
+        )
+
+        response = await self.async_client.post(
+            reverse("polls:vote", args=(q.id,)),
+            {"choice": c2.id}
+        )
+        await c1.arefresh_from_db()
+        await c2.arefresh_from_db()
+        self.assertEqual((c1.vote_count, c2.vote_count), (0, 1))
+
+        response = await self.async_client.get(reverse("polls:results", args=(q.id,)))
+        self.assertEqual(response.context["total_votes"], 1)
+
+        response = await self.async_client.get(reverse("polls:detail", args=(q.id,)))
+        self.assertEqual(response.context["previous_selected_id"], c2.id)
+
+    async def test_vote_invalid_choice(self):
+        """User is sent back to the detail page when choice is invalid"""
+        q, _, _ = await sync_to_async(create_dummies_question_and_2_choice)()
+        user = await User.objects.acreate(username="tester")
+        await self.async_client.aforce_login(user)
+
+        response = await self.async_client.post(
+            reverse("polls:vote", args=(q.id,)),
+            {"choice": "abc"}
+        )
+
+        self.assertRedirects(
+            response,
+            reverse("polls:detail", args=(q.id,)),
+            fetch_redirect_response=False
+        )
+        self.assertFalse(await Vote.objects.aexists())
+
+    @override_settings(POLLS_VOTE_BUFFER=True)
+    async def test_buffered_vote_is_shown_before_flush(self):
+        """Queued vote is shown in the results page of the voter"""
+        q, c1, _ = await sync_to_async(create_dummies_question_and_2_choice)()
+        user = await User.objects.acreate(username="tester")
+        await self.async_client.aforce_login(user)
+        buffer = VoteBuffer(autostart=False)
+
+        with mock.patch("polls.views.get_vote_buffer", return_value=buffer):
+            await self.async_client.post(
+                reverse("polls:vote", args=(q.id,)),
+                {"choice": c1.id}
+            )
+
+        self.assertEqual(buffer.pending(), 1)
+        response = await self.async_client.get(reverse("polls:results", args=(q.id,)))
+        self.assertEqual(response.context["total_votes"], 1)
+
+    async def test_unchanged_results_not_rendered(self):
+        """Results page that didn't change since last visit answer 304"""
+        q, c1, _ = await sync_to_async(create_dummies_question_and_2_choice)()
+        user = await User.objects.acreate(username="tester")
+        await self.async_client.aforce_login(user)
+        url = reverse("polls:results", args=(q.id,))
+        etag = (await self.async_client.get(url))["ETag"]
+
+        response = await self.async_client.get(url, headers={"if-none-match": etag})
+
+        self.assertEqual(response.status_code, 304)
+
+        await self.async_client.post(reverse("polls:vote", args=(q.id,)), {"choice": c1.id})
+        # First render show the vote confirmation
+        await self.async_client.get(url, headers={"if-none-match": etag})
+        response = await self.async_client.get(url, headers={"if-none-match": etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    async def test_anonymous_results_without_session(self):
+        """Anonymous results page don't read the session and is public"""
+        q, _, _ = await sync_to_async(create_dummies_question_and_2_choice)()
+
+        with mock.patch("django.contrib.auth.aget_user") as aget_user:
+            response = await self.async_client.get(reverse("polls:results", args=(q.id,)))
+
+        aget_user.assert_not_called()
+        self.assertFalse(response.asgi_request.session.accessed)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertEqual(get_max_age(response), 10)
+        self.assertNotIn("Cookie", response.get("Vary", ""))
+        self.assertContains(response, "To vote on polls please login")
+        self.assertContains(response, "results.js")
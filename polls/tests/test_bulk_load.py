@@ -0,0 +1,132 @@
+"""Polls app test file"""
+
+import io
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from polls.bulk_load import iter_json_array
+from polls.models import Choice, Question, Vote
+
+
+class IterJsonArrayTest(TestCase):
+    """
+    Test reading fixture file one object at a time
+    """
+
+    def test_items_split_across_chunks(self):
+        """Items are decoded whatever size of the chunks"""
+        items = [
+            {"model": "polls.question", "pk": 1, "fields": {"question_text": "a, [b]"}},
+            {"model": "polls.choice", "pk": 2, "fields": {"choice_text": "}{\"]"}},
+        ]
+        text = json.dumps(items, indent=4)
+
+        for chunk_size in (1, 3, 7, 1 << 16):
+            self.assertEqual(
+                list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)),
+                items
+            )
+
+    def test_empty_array(self):
+        """Empty array has no item"""
+        self.assertEqual(list(iter_json_array(io.StringIO(" [ ] "))), [])
+
+    def test_not_an_array(self):
+        """Fixture must be an array"""
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO('{"model": "polls.question"}')))
+
+    def test_truncated_file(self):
+        """Truncated fixture is an error"""
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO('[{"pk": 1}, {"pk": '), chunk_size=4))
+
+
+class LoadPollsDataTest(TestCase):
+    """
+    Test load_polls_data command
+    """
+
+    def write_fixture(self, objects) -> str:
+        """Write objects to a fixture file and return its path."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "fixture.json")
+        with open(path, "w") as file:
+            json.dump(objects, file)
+        return path
+
+    def test_load_data_snapshot(self):
+        """Default files are loaded with a tally matching the votes"""
+        call_command("load_polls_data", stdout=StringIO())
+
+        self.assertEqual(Question.objects.count(), 8)
+        self.assertEqual(User.objects.count(), 6)
+        self.assertEqual(Vote.objects.count(), 19)
+        self.assertFalse(Choice.objects.out_of_sync().exists())
+        self.assertEqual(
+            sum(Choice.objects.values_list("vote_count", flat=True)),
+            19
+        )
+
+    def test_invalid_reference_load_nothing(self):
+        """Vote for a missing choice abort the whole load"""
+        path = self.write_fixture([
+            {"model": "auth.user", "pk": 1, "fields": {"username": "tester", "password": ""}},
+            {"model": "polls.vote", "pk": 1, "fields": {"user": 1, "choice": 99}},
+        ])
+
+        with self.assertRaisesMessage(CommandError, "missing choice 99"):
+            call_command("load_polls_data", path, stdout=StringIO())
+        self.assertFalse(User.objects.exists())
+
+    def test_second_vote_of_user_load_nothing(self):
+        """Two votes of a user on a question abort the load naming the vote"""
+        call_command("load_polls_data", "data/polls-v4.json", "data/users.json", stdout=StringIO())
+        path = self.write_fixture([
+            {"model": "polls.vote", "pk": 1, "fields": {"user": 1, "choice": 17}},
+            {"model": "polls.vote", "pk": 2, "fields": {"user": 1, "choice": 18}},
+        ])
+
+        with self.assertRaisesMessage(
+            CommandError, "Vote 2 is a second vote of user 1 on question 3, after vote 1"
+        ):
+            call_command("load_polls_data", path, stdout=StringIO())
+        self.assertFalse(Vote.objects.exists())
+
+    def test_vote_question_filled_from_choice(self):
+        """Vote without question get the question of its choice"""
+        call_command("load_polls_data", "data/polls-v4.json", "data/users.json", stdout=StringIO())
+        path = self.write_fixture([
+            {"model": "polls.vote", "pk": 1, "fields": {"user": 1, "choice": 17}},
+        ])
+
+        call_command("load_polls_data", path, stdout=StringIO())
+
+        self.assertEqual(Vote.objects.get(pk=1).question_id, 3)
+
+    def test_generate(self):
+        """Generated votes are one per user and question and counted"""
+        call_command(
+            "load_polls_data",
+            generate=50,
+            questions=10,
+            choices=3,
+            batch_size=7,
+            seed=1,
+            stdout=StringIO()
+        )
+
+        self.assertEqual(Question.objects.count(), 10)
+        self.assertEqual(Choice.objects.count(), 30)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Vote.objects.count(), 50)
+        self.assertFalse(Choice.objects.out_of_sync().exists())
+        self.assertTrue(User.objects.first().check_password("loadtest"))
@@ -0,0 +1,146 @@
+"""Polls app test file"""
+
+import threading
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.test import Client, SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from polls.models import Choice, Vote
+from polls.retry import retry_on_lock
+from .helper import *
+
+USERS = 16
+VOTES_PER_USER = 5
+
+
+class ConcurrentVotingTest(TransactionTestCase):
+    """
+    Test many users voting at the same time
+    """
+
+    def vote_repeatedly(self, client, choices, errors):
+        """Change vote of a logged in client on every request."""
+        try:
+            for turn in range(VOTES_PER_USER):
+                response = client.post(
+                    reverse("polls:vote", args=(choices[0].question_id,)),
+                    {"choice": choices[turn % len(choices)].id}
+                )
+                if response.status_code != 302:
+                    errors.append(response.status_code)
+        except Exception as err:
+            errors.append(err)
+        finally:
+            connection.close()
+
+    def test_no_lost_or_duplicated_votes(self):
+        """Every user end with exactly one vote counted once"""
+        q, c1, c2 = create_dummies_question_and_2_choice()
+        users = [
+            create_test_user(username=f"tester{index}") for index in range(USERS)
+        ]
+        errors = []
+        clients = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+
+        threads = [
+            threading.Thread(
+                target=self.vote_repeatedly,
+                args=(client, [c1, c2], errors)
+            )
+            for client in clients
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Vote.objects.filter(question=q).count(), USERS)
+        # Last vote of every user is the choice of the last turn
+        last_choice = [c1, c2][(VOTES_PER_USER - 1) % 2]
+        self.assertEqual(
+            Vote.objects.filter(choice=last_choice).count(),
+            USERS
+        )
+        self.assertFalse(Choice.objects.out_of_sync().exists())
+        self.assertEqual(
+            sum(q.choice_set.values_list("vote_count", flat=True)),
+            USERS
+        )
+
+    def test_same_user_first_votes_counted_once(self):
+        """Simultaneous first votes of one user add one vote to the tally"""
+        q, c1, c2 = create_dummies_question_and_2_choice()
+        user = create_test_user()
+        errors = []
+        barrier = threading.Barrier(USERS)
+
+        def first_vote(choice):
+            client = Client()
+            client.force_login(user)
+            barrier.wait()
+            try:
+                response = client.post(
+                    reverse("polls:vote", args=(q.id,)), {"choice": choice.id}
+                )
+                if response.status_code != 302:
+                    errors.append(response.status_code)
+            except Exception as err:
+                errors.append(err)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=first_vote, args=([c1, c2][index % 2],))
+            for index in range(USERS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Vote.objects.filter(question=q).count(), 1)
+        self.assertFalse(Choice.objects.out_of_sync().exists())
+        self.assertEqual(sum(q.choice_set.values_list("vote_count", flat=True)), 1)
+
+
+@override_settings(POLLS_DB_LOCK_RETRIES=3, POLLS_DB_LOCK_RETRY_DELAY=0)
+class RetryOnLockTest(SimpleTestCase):
+    """
+    Test retrying a write on a locked database
+    """
+
+    def test_retry_until_success(self):
+        """Write is called again while database is locked"""
+        write = mock.Mock(side_effect=[
+            OperationalError("database is locked"),
+            OperationalError("database is locked"),
+            "done",
+        ])
+
+        self.assertEqual(retry_on_lock(write, 1, key="value"), "done")
+        self.assertEqual(write.call_count, 3)
+        write.assert_called_with(1, key="value")
+
+    def test_give_up_after_retries(self):
+        """Lock error is raised when every retry failed"""
+        write = mock.Mock(side_effect=OperationalError("database is locked"))
+
+        with self.assertRaises(OperationalError):
+            retry_on_lock(write)
+        self.assertEqual(write.call_count, 4)
+
+    def test_other_error_is_not_retried(self):
+        """Only lock errors are retried"""
+        write = mock.Mock(side_effect=OperationalError("no such table: polls_vote"))
+
+        with self.assertRaises(OperationalError):
+            retry_on_lock(write)
+        self.assertEqual(write.call_count, 1)
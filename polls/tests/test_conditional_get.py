@@ -0,0 +1,112 @@
+"""Polls app test file"""
+
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from .helper import *
+
+
+class ConditionalGetTest(TestCase):
+    """
+    Test 304 Not Modified answer of unchanged result and index pages
+    """
+
+    def setUp(self):
+        self.question, self.c1, self.c2 = create_dummies_question_and_2_choice(
+            pub_days=-1
+        )
+        self.results_url = reverse("polls:results", args=(self.question.id,))
+        self.index_url = reverse("polls:index")
+
+    def refresh(self, url, etag):
+        """Get url again with the ETag of the previous visit."""
+        return self.client.get(url, headers={"if-none-match": etag})
+
+    def test_unchanged_results_not_rendered(self):
+        """Refresh of unchanged results cost no query"""
+        etag = self.client.get(self.results_url)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.refresh(self.results_url, etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_vote_change_results(self):
+        """Results are rendered again after a vote"""
+        self.client.force_login(create_test_user())
+        etag = self.client.get(self.results_url)["ETag"]
+
+        user_vote(self.client, self.c1)
+        # First render show the vote confirmation
+        self.assertEqual(self.refresh(self.results_url, etag).status_code, 200)
+
+        response = self.refresh(self.results_url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_results_differ_between_users(self):
+        """Page of another user isn't reused after login"""
+        etag = self.client.get(self.results_url)["ETag"]
+
+        self.client.force_login(create_test_user())
+
+        self.assertEqual(self.refresh(self.results_url, etag).status_code, 200)
+
+    def test_results_with_message_rendered(self):
+        """Page with a flash message is always rendered"""
+        self.client.force_login(create_test_user())
+        etag = self.client.get(self.results_url)["ETag"]
+
+        # Vote without a choice leave a warning message
+        self.client.post(reverse("polls:vote", args=(self.question.id,)))
+        response = self.refresh(self.results_url, etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+        self.assertEqual(len(response.context["messages"]), 1)
+
+    def test_unchanged_index_not_rendered(self):
+        """Refresh of unchanged poll list cost no query"""
+        etag = self.client.get(self.index_url)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.refresh(self.index_url, etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_question_edit_change_index(self):
+        """Poll list and results are rendered again after question edit"""
+        index_etag = self.client.get(self.index_url)["ETag"]
+        results_etag = self.client.get(self.results_url)["ETag"]
+
+        self.question.question_text = "Edited question"
+        self.question.save()
+
+        self.assertEqual(self.refresh(self.index_url, index_etag).status_code, 200)
+        self.assertEqual(self.refresh(self.results_url, results_etag).status_code, 200)
+
+    def test_publish_date_change_index(self):
+        """Poll list change when a question get published"""
+        future = create_question("Future question", pub_days=1)
+        etag = self.client.get(self.index_url)["ETag"]
+
+        later = future.pub_date + datetime.timedelta(seconds=1)
+        with mock.patch("polls.conditional.timezone.now", return_value=later):
+            response = self.refresh(self.index_url, etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_end_date_change_index(self):
+        """Poll list change when a question is closed"""
+        closing = create_question("Closing question", pub_days=-1, end_days=1)
+        etag = self.client.get(self.index_url)["ETag"]
+
+        with mock.patch("polls.conditional.timezone.now", return_value=closing.end_date):
+            self.assertEqual(self.refresh(self.index_url, etag).status_code, 304)
+
+        later = closing.end_date + datetime.timedelta(seconds=1)
+        with mock.patch("polls.conditional.timezone.now", return_value=later):
+            self.assertEqual(self.refresh(self.index_url, etag).status_code, 200)
@@ -0,0 +1,74 @@
+"""Polls app test file"""
+
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from polls.management.commands.explain_queries import analyze
+
+
+class ExplainQueriesTest(TestCase):
+    """
+    Test query plan checks of the views
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = os.path.join(directory.name, "plans.json")
+
+    def test_view_queries_use_index(self):
+        """No view query read a whole table"""
+        out = StringIO()
+
+        call_command("explain_queries", "--check", stdout=out)
+
+        self.assertIn("polls_question_pub_id_idx", out.getvalue())
+
+    def test_same_plans_as_baseline(self):
+        """Saved plans aren't a regression of themselves"""
+        call_command("explain_queries", "--save", self.baseline, stdout=StringIO())
+
+        call_command("explain_queries", "--baseline", self.baseline, stdout=StringIO())
+
+    def test_lost_index_is_regression(self):
+        """Query that stopped using an index of the baseline fail the check"""
+        call_command("explain_queries", "--save", self.baseline, stdout=StringIO())
+        with open(self.baseline) as file:
+            plans = json.load(file)
+        plans["index all"]["indexes"].append("polls_question_dropped_idx")
+        with open(self.baseline, "w") as file:
+            json.dump(plans, file)
+
+        with self.assertRaisesMessage(CommandError, "polls_question_dropped_idx"):
+            call_command("explain_queries", "--baseline", self.baseline, stdout=StringIO())
+
+    def test_analyze_sqlite_plan(self):
+        """Full scans and indexes are read from SQLite plan"""
+        plan = (
+            "2 0 0 SCAN polls_choice\n"
+            "14 6 0 SEARCH U0 USING COVERING INDEX polls_vote_choice_idx (choice_id=?)"
+        )
+
+        self.assertEqual(
+            analyze(plan, "sqlite"),
+            {"full_scans": ["polls_choice"], "indexes": ["polls_vote_choice_idx"]}
+        )
+
+    def test_analyze_postgresql_plan(self):
+        """Full scans and indexes are read from PostgreSQL plan"""
+        plan = (
+            "Nested Loop\n"
+            "  ->  Seq Scan on polls_choice\n"
+            "  ->  Index Scan using polls_vote_unique_user_question on polls_vote"
+        )
+
+        self.assertEqual(
+            analyze(plan, "postgresql"),
+            {"full_scans": ["polls_choice"], "indexes": ["polls_vote_unique_user_question"]}
+        )
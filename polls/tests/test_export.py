@@ -0,0 +1,102 @@
+"""Polls app test file"""
+
+import csv
+import io
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from polls.models import Vote
+from .helper import *
+
+
+class ExportTest(TestCase):
+    """
+    Test export of results and raw votes
+    """
+
+    def setUp(self):
+        self.staff = create_test_user(username="staff")
+        self.staff.is_staff = True
+        self.staff.save()
+        self.client.force_login(self.staff)
+
+        self.old_q, self.old_c1, _ = create_dummies_question_and_2_choice(
+            "Old question", pub_days=-30
+        )
+        self.new_q, self.new_c1, self.new_c2 = create_dummies_question_and_2_choice(
+            "New, question", pub_days=-1
+        )
+        for index, choice in enumerate([self.old_c1, self.new_c1, self.new_c2]):
+            user = create_test_user(username=f"voter{index}")
+            Vote.objects.cast(user, choice)
+
+    def export(self, kind, **params):
+        """Return streamed content of an export."""
+        response = self.client.get(reverse("polls:export", args=(kind,)), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_results_csv(self):
+        """Every choice is a row with its tally"""
+        rows = list(csv.DictReader(io.StringIO(self.export("results"))))
+
+        self.assertEqual(len(rows), 4)
+        new_row = next(row for row in rows if row["choice_id"] == str(self.new_c1.id))
+        self.assertEqual(new_row["question_text"], "New, question")
+        self.assertEqual(new_row["votes"], "1")
+
+    def test_votes_ndjson_of_question(self):
+        """Vote rows of one question are exported as JSON lines"""
+        content = self.export("votes", format="ndjson", question=self.new_q.id)
+        rows = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual(
+            sorted(row["choice_id"] for row in rows),
+            [self.new_c1.id, self.new_c2.id]
+        )
+        self.assertEqual(set(rows[0]), {"vote_id", "question_id", "choice_id", "user_id"})
+
+    def test_date_range(self):
+        """Only questions published in range are exported"""
+        since = (timezone.now() - datetime.timedelta(days=7)).date().isoformat()
+        rows = list(csv.DictReader(io.StringIO(self.export("votes", since=since))))
+
+        self.assertEqual(
+            {row["question_id"] for row in rows}, {str(self.new_q.id)}
+        )
+
+    def test_invalid_parameters(self):
+        """Bad format or date is a bad request"""
+        url = reverse("polls:export", args=("votes",))
+        self.assertEqual(self.client.get(url, {"format": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"since": "yesterday"}).status_code, 400)
+
+    def test_staff_only(self):
+        """User who isn't staff can't export"""
+        self.client.force_login(create_test_user(username="visitor"))
+
+        response = self.client.get(reverse("polls:export", args=("votes",)))
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_command(self):
+        """Command write the same export"""
+        out = StringIO()
+
+        call_command(
+            "export_polls_data", "results", "--question", str(self.old_q.id), stdout=out
+        )
+
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual([row["votes"] for row in rows], ["1", "0"])
+
+    def test_command_invalid_date(self):
+        """Command reject a date it can't read"""
+        with self.assertRaises(CommandError):
+            call_command("export_polls_data", "votes", "--until", "soon", stdout=StringIO())
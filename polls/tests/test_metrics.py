@@ -0,0 +1,90 @@
+"""Polls app test file"""
+
+import re
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from polls.metrics import get_metrics_registry
+from .helper import *
+
+
+def metric(text: str, name: str, view: str) -> float:
+    """Return value of a metric line of a view."""
+    match = re.search(rf'^{name}{{view="{re.escape(view)}"}} (\S+)$', text, re.M)
+    return float(match.group(1)) if match else None
+
+
+@override_settings(POLLS_METRICS=True, POLLS_METRICS_SLOW_REQUEST=0)
+class MetricsTest(TestCase):
+    """
+    Test per-view request metrics
+    """
+
+    def setUp(self):
+        get_metrics_registry().reset()
+        self.question, _, _ = create_dummies_question_and_2_choice()
+
+    def scrape(self) -> str:
+        """Return metrics text."""
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        return response.content.decode()
+
+    def test_latency_and_queries_by_view(self):
+        """Request is counted under its URL name with its queries"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("polls:detail", args=(self.question.id,)))
+        expected_queries = len(queries)
+
+        text = self.scrape()
+
+        view = "polls:detail"
+        self.assertEqual(metric(text, "polls_request_duration_seconds_count", view), 1)
+        self.assertEqual(
+            metric(text, "polls_request_db_queries_sum", view), expected_queries
+        )
+        self.assertGreater(metric(text, "polls_request_db_duration_seconds_total", view), 0)
+        self.assertIn(
+            'polls_request_duration_seconds_bucket{view="polls:detail",le="+Inf"} 1',
+            text
+        )
+
+    def test_unresolved_request(self):
+        """Request that match no URL is counted apart"""
+        self.client.get("/no-such-page/")
+
+        self.assertEqual(
+            metric(self.scrape(), "polls_request_duration_seconds_count", "<unresolved>"),
+            1
+        )
+
+    async def test_async_request(self):
+        """Queries of requests handled by the async handler are counted"""
+        await self.async_client.get(reverse("polls:index"))
+
+        text = await self.async_client.get(reverse("metrics"))
+
+        self.assertGreater(
+            metric(text.content.decode(), "polls_request_db_queries_sum", "polls:index"),
+            0
+        )
+
+    @override_settings(POLLS_METRICS_SLOW_REQUEST=1e-9)
+    def test_slow_request_logged(self):
+        """Request slower than the threshold is logged"""
+        with self.assertLogs("polls", "WARNING") as logs:
+            self.client.get(reverse("polls:index"))
+
+        self.assertIn("Slow request GET /polls/ (polls:index)", logs.output[0])
+
+    @override_settings(POLLS_METRICS=False)
+    def test_disabled(self):
+        """Nothing is recorded or served when metrics are off"""
+        self.client.get(reverse("polls:index"))
+
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+        self.assertNotIn("polls:index", get_metrics_registry().render())
@@ -0,0 +1,86 @@
+"""Polls app test file"""
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.cache import get_max_age
+
+from .helper import *
+
+
+class PublicPagesTest(TestCase):
+    """
+    Test pages of anonymous visitors that shared caches can keep
+    """
+
+    def setUp(self):
+        self.question, self.c1, _ = create_dummies_question_and_2_choice(pub_days=-1)
+        self.pages = [
+            reverse("polls:index"),
+            reverse("polls:results", args=(self.question.id,)),
+        ]
+
+    def assert_public(self, response):
+        """Response can be kept by shared caches."""
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+        self.assertEqual(get_max_age(response), 10)
+        self.assertNotIn("Cookie", response.get("Vary", ""))
+
+    def assert_private(self, response):
+        """Response must not be kept by shared caches."""
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_anonymous_page_without_session(self):
+        """Anonymous pages don't read the session and are public"""
+        for url in self.pages:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+
+                self.assertFalse(
+                    any("django_session" in query["sql"] for query in queries)
+                )
+                self.assertFalse(response.wsgi_request.session.accessed)
+                self.assert_public(response)
+                self.assertContains(response, "To vote on polls please login")
+
+    def test_logged_in_page_is_private(self):
+        """Pages of logged in user show the user and stay private"""
+        self.client.force_login(create_test_user())
+
+        for url in self.pages:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+
+                self.assert_private(response)
+                self.assertIn("Cookie", response["Vary"])
+                self.assertContains(response, "tester")
+
+    def test_message_after_redirect(self):
+        """Message of a redirect is kept in a cookie and shown once"""
+        unpublished = create_question("Future question", pub_days=5)
+
+        response = self.client.get(
+            reverse("polls:detail", args=(unpublished.id,)), follow=True
+        )
+
+        self.assertContains(response, "Polls is unavailable right now")
+        self.assertFalse(response.wsgi_request.session.accessed)
+        self.assert_private(response)
+        self.assert_public(self.client.get(reverse("polls:index")))
+
+    def test_index_json_is_public(self):
+        """Poll list as JSON is the same for every visitor"""
+        self.client.force_login(create_test_user())
+
+        self.assert_public(self.client.get(reverse("polls:index_json")))
+
+    @override_settings(POLLS_PUBLIC_CACHE_MAX_AGE=0)
+    def test_public_cache_disabled(self):
+        """Anonymous pages are private when public cache is off"""
+        for url in self.pages:
+            with self.subTest(url=url):
+                self.assert_private(self.client.get(url))
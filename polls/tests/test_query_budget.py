@@ -0,0 +1,37 @@
+"""Polls app test file"""
+
+from django.test import TestCase
+
+from benchmarks.endpoints import (
+    QUERY_BUDGETS,
+    over_budget,
+    run_benchmark,
+    seed_dataset
+)
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Test that query count of every endpoint stays within its budget
+    """
+
+    def run_endpoints(self, prefix: str, polls: int, users: int, votes_per_user: int):
+        """Seed a dataset and return query count of every endpoint."""
+        questions, voters = seed_dataset(
+            polls, users, votes_per_user, seed=0, prefix=prefix
+        )
+        question = next(q for q in reversed(questions) if q.can_vote())
+        self.client.force_login(voters[0])
+        results = run_benchmark(
+            self.client, question, list(question.choice_set.all()), 3
+        )
+        self.assertEqual(set(results), set(QUERY_BUDGETS))
+        self.assertEqual(over_budget(results), [])
+        return {name: result["queries"] for name, result in results.items()}
+
+    def test_query_count_does_not_grow_with_data(self):
+        """More polls, users and votes don't add queries to any endpoint"""
+        small = self.run_endpoints("small", polls=4, users=2, votes_per_user=2)
+        large = self.run_endpoints("large", polls=30, users=10, votes_per_user=20)
+
+        self.assertEqual(small, large)
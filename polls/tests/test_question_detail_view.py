@@ -66,3 +66,28 @@ class QuestionDetailViewTests(TestCase):
         res = self.client.get(reverse("polls:detail", args=(question.id,)))
         
         self.assertContains(res, f'value="{c1.id}" checked')
+
+    def test_visitor_detail_page_load_question_once(self):
+        """Detail page must read question once then its choices"""
+        question, _, _ = create_dummies_question_and_2_choice()
+
+        url = reverse("polls:detail", args=(question.id,))
+
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_user_detail_page_load_question_once(self):
+        """
+        Detail page of logged in user cost session, user, question,
+        previous vote and choices query only
+        """
+        question, c1, _ = create_dummies_question_and_2_choice()
+        user = create_test_user()
+
+        self.client.force_login(user)
+        user_vote(self.client, c1)
+
+        url = reverse("polls:detail", args=(question.id,))
+
+        with self.assertNumQueries(5):
+            self.client.get(url)
@@ -4,9 +4,10 @@ Polls app test file
 
 import datetime
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
+from polls.models import Question
 from .helper import *
 
 
@@ -112,3 +113,133 @@ class QuestionIndexViewTests(TestCase):
             response.context["latest_question_list"],
             []
         )
+
+
+@override_settings(POLLS_INDEX_PAGE_SIZE=2)
+class QuestionIndexPaginationTests(TestCase):
+    """
+    Test case for cursor pagination of index view
+    """
+    def setUp(self):
+        """Create 5 published question, q5 is the latest one"""
+        self.questions = [
+            create_question(question_text=f"q{n}", pub_days=n - 10)
+            for n in range(1, 6)
+        ]
+        self.questions.reverse()
+
+    def test_first_page(self):
+        """
+        First page show only latest questions and a cursor to the next page.
+        """
+        response = self.client.get(reverse("polls:index"))
+        self.assertQuerySetEqual(
+            response.context["latest_question_list"],
+            self.questions[:2]
+        )
+        self.assertTrue(response.context["page_obj"].has_next)
+        self.assertContains(response, "Older polls")
+
+    def test_follow_cursor_to_last_page(self):
+        """
+        Following the cursor must walk every question exactly once.
+        """
+        seen = []
+        cursor = None
+        while True:
+            params = {"cursor": cursor} if cursor else {}
+            response = self.client.get(reverse("polls:index"), params)
+            seen.extend(response.context["latest_question_list"])
+            cursor = response.context["page_obj"].next_cursor
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, self.questions)
+
+    def test_same_pub_date_question_are_not_skipped(self):
+        """
+        Question that share pub_date must be ordered by id across pages.
+        """
+        Question.objects.update(pub_date=self.questions[0].pub_date)
+        expected = sorted(self.questions, key=lambda q: q.id, reverse=True)
+
+        first = self.client.get(reverse("polls:index"))
+        cursor = first.context["page_obj"].next_cursor
+        second = self.client.get(reverse("polls:index"), {"cursor": cursor})
+
+        self.assertEqual(
+            first.context["latest_question_list"]
+            + second.context["latest_question_list"],
+            expected[:4]
+        )
+
+    def test_invalid_cursor_show_first_page(self):
+        """
+        Invalid cursor must fall back to the first page.
+        """
+        response = self.client.get(reverse("polls:index"), {"cursor": "@@"})
+        self.assertQuerySetEqual(
+            response.context["latest_question_list"],
+            self.questions[:2]
+        )
+
+    def test_json_index(self):
+        """
+        JSON index must list the same page with cursor of the next page.
+        """
+        response = self.client.get(reverse("polls:index_json"))
+        data = response.json()
+
+        self.assertEqual(
+            [q["id"] for q in data["results"]],
+            [q.id for q in self.questions[:2]]
+        )
+
+        response = self.client.get(
+            reverse("polls:index_json"),
+            {"cursor": data["next"]}
+        )
+        self.assertEqual(
+            [q["id"] for q in response.json()["results"]],
+            [q.id for q in self.questions[2:4]]
+        )
+
+
+class QuestionIndexStatusTests(TestCase):
+    """
+    Test case for open/closed filter tabs of index view
+    """
+    def setUp(self):
+        """Create open and closed question"""
+        self.open = create_question("Open question", pub_days=-5, end_days=5)
+        self.closed = create_question("Closed question", pub_days=-5, end_days=-2)
+
+    def test_open_tab(self):
+        """Open tab must list only question that can be voted"""
+        response = self.client.get(reverse("polls:index"), {"status": "open"})
+        self.assertQuerySetEqual(
+            response.context["latest_question_list"],
+            [self.open]
+        )
+
+    def test_closed_tab(self):
+        """Closed tab must list only question that already ended"""
+        response = self.client.get(reverse("polls:index"), {"status": "closed"})
+        self.assertQuerySetEqual(
+            response.context["latest_question_list"],
+            [self.closed]
+        )
+
+    def test_unknown_tab_show_all(self):
+        """Unknown tab must fall back to all published question"""
+        response = self.client.get(reverse("polls:index"), {"status": "nope"})
+        self.assertEqual(response.context["status"], "all")
+        self.assertEqual(len(response.context["latest_question_list"]), 2)
+
+    def test_index_query_count_does_not_grow_with_question(self):
+        """Availability is read with the list so index cost a single query"""
+        for n in range(10):
+            create_question(f"question {n}", pub_days=-1)
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse("polls:index"))
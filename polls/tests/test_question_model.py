@@ -162,3 +162,40 @@ class QuestionModelTests(TestCase):
         """
         q = create_question(pub_days=0, end_days=0)
         self.assertFalse(q.can_vote())
+
+
+class QuestionQuerySetTests(TestCase):
+    """
+    Test case for availability computed by Question queryset.
+    """
+
+    def setUp(self):
+        """Create question in every state of availability"""
+        self.future = create_question("future", pub_days=1)
+        self.open = create_question("open", pub_days=-2)
+        self.open_until = create_question("open until", pub_days=-2, end_days=2)
+        self.closed = create_question("closed", pub_days=-2, end_days=-1)
+
+    def test_published(self):
+        """published() must return only question that pub_date passed"""
+        self.assertQuerySetEqual(
+            Question.objects.published().order_by("id"),
+            [self.open, self.open_until, self.closed]
+        )
+
+    def test_open(self):
+        """open() must return only question that can be voted"""
+        self.assertQuerySetEqual(
+            Question.objects.open().order_by("id"),
+            [self.open, self.open_until]
+        )
+
+    def test_closed(self):
+        """closed() must return only published question that already ended"""
+        self.assertQuerySetEqual(Question.objects.closed(), [self.closed])
+
+    def test_with_availability_match_can_vote(self):
+        """is_available annotation must agree with can_vote()"""
+        for question in Question.objects.with_availability():
+            self.assertEqual(question.is_available, question.can_vote())
+            self.assertEqual(question.available, question.can_vote())
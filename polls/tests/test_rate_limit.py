@@ -0,0 +1,183 @@
+"""Polls app test file"""
+
+import time
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+
+from polls import async_views
+from polls.ratelimit import LocalBuckets, get_rate_limiter, rate_limit
+from .helper import *
+
+LIMITS = {
+    "vote": {"ip": (4, 1.0), "user": (2, 0.5)},
+    "login": {"ip": (10, 1.0), "username": (2, 0.1)},
+    "signup": {"ip": (1, 0.01)},
+}
+
+urlpatterns = [
+    path("polls/", include(([
+        path("<int:pk>/results/", async_views.AsyncResultsView.as_view(), name="results"),
+        path(
+            "<int:question_id>/vote/",
+            rate_limit("vote")(async_views.vote),
+            name="vote"
+        ),
+    ], "polls"))),
+]
+
+
+class FakeClock:
+    """Clock moved forward by tests."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class TokenBucketTest(TestCase):
+    """
+    Test token buckets kept in process
+    """
+
+    def test_burst_then_refill(self):
+        """Bucket allow a burst then a token per 1/rate seconds"""
+        buckets = LocalBuckets()
+
+        self.assertEqual([buckets.take("k", 3, 0.5, 0.0) for _ in range(3)], [0, 0, 0])
+        self.assertEqual(buckets.take("k", 3, 0.5, 0.0), 2.0)
+        self.assertEqual(buckets.take("k", 3, 0.5, 1.0), 1.0)
+        self.assertEqual(buckets.take("k", 3, 0.5, 2.0), 0)
+        # Buckets of other keys are untouched
+        self.assertEqual(buckets.take("other", 3, 0.5, 2.0), 0)
+
+    def test_least_recently_used_dropped(self):
+        """Oldest bucket is dropped when the store is full"""
+        buckets = LocalBuckets(max_buckets=2)
+        for key in ("a", "b", "a", "c"):
+            buckets.take(key, 1, 0.1, 0.0)
+
+        self.assertEqual(buckets.take("a", 1, 0.1, 0.0), 10.0)
+        self.assertEqual(buckets.take("b", 1, 0.1, 0.0), 0)
+
+
+@override_settings(
+    POLLS_RATE_LIMIT=True, POLLS_RATE_LIMITS=LIMITS, POLLS_RATE_LIMIT_LOG_INTERVAL=60
+)
+class RateLimitTest(TestCase):
+    """
+    Test 429 answer to clients voting or logging in too fast
+    """
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = get_rate_limiter()
+        self.limiter.clock = self.clock
+        self.limiter.reset()
+        self.question, self.c1, _ = create_dummies_question_and_2_choice(pub_days=-1)
+        self.vote_url = reverse("polls:vote", args=(self.question.id,))
+
+    def tearDown(self):
+        self.limiter.clock = time.time
+        self.limiter.reset()
+
+    def vote(self, ip="10.0.0.1"):
+        """Post a vote from ip."""
+        return self.client.post(
+            self.vote_url, {"choice": self.c1.id}, REMOTE_ADDR=ip
+        )
+
+    def assert_limited(self, response, retry_after: str):
+        """Response is a 429 with Retry-After."""
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], retry_after)
+
+    def test_vote_limited_by_user(self):
+        """User voting too fast wait for a new token"""
+        self.client.force_login(create_test_user())
+
+        self.assertEqual([self.vote().status_code for _ in range(2)], [302, 302])
+        # Limited requests are counted in the stats, not logged one by one
+        with self.assertNoLogs("polls", "INFO"):
+            self.assert_limited(self.vote(), "2")
+        # Another address doesn't help
+        self.assert_limited(self.vote(ip="10.0.0.2"), "2")
+
+        self.clock.advance(2)
+        self.assertEqual(self.vote().status_code, 302)
+
+    def test_vote_limited_by_ip_without_query(self):
+        """Flood from one address is answered before any query"""
+        for _ in range(4):
+            self.vote()
+
+        with self.assertNumQueries(0):
+            response = self.vote()
+
+        self.assert_limited(response, "1")
+        self.assertEqual(self.vote(ip="10.0.0.2").status_code, 302)
+
+    def test_login_limited_by_username(self):
+        """Password guesses of one account are limited"""
+        create_test_user()
+        url = reverse("login")
+        guess = {"username": "tester", "password": "wrong"}
+
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, guess).status_code, 200)
+        self.assert_limited(self.client.post(url, guess), "10")
+        # Login page itself is not limited
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.clock.advance(10)
+        self.assertEqual(self.client.post(url, guess).status_code, 200)
+
+    def test_signup_limited_by_ip(self):
+        """Second signup from an address is limited"""
+        url = reverse("signup")
+        self.client.post(url, {"username": "first"})
+
+        self.assert_limited(self.client.post(url, {"username": "second"}), "100")
+
+    def test_stats_logged(self):
+        """Allowed and limited counts are logged once per interval"""
+        self.client.force_login(create_test_user())
+        for _ in range(3):
+            self.vote()
+
+        self.clock.advance(60)
+        with self.assertLogs("polls", "INFO") as logs:
+            self.vote()
+
+        self.assertIn(
+            "INFO:polls:Rate limit stats: vote allowed=3, vote limited=1",
+            logs.output
+        )
+
+    @override_settings(ROOT_URLCONF="polls.tests.test_rate_limit")
+    async def test_async_vote_limited_by_user(self):
+        """Async vote view is limited by the user of the session"""
+        user = await sync_to_async(create_test_user)()
+        await sync_to_async(self.client.force_login)(user)
+        self.async_client.cookies = self.client.cookies
+        url = reverse("polls:vote", args=(self.question.id,))
+
+        statuses = [
+            (await self.async_client.post(url, {"choice": self.c1.id})).status_code
+            for _ in range(3)
+        ]
+
+        self.assertEqual(statuses, [302, 302, 429])
+
+    @override_settings(POLLS_RATE_LIMIT=False)
+    def test_disabled(self):
+        """Nothing is limited when rate limit is off"""
+        self.client.force_login(create_test_user())
+
+        self.assertEqual({self.vote().status_code for _ in range(5)}, {302})
@@ -61,4 +61,45 @@ class QuestionResultViewTests(TestCase):
         self.assertRedirects(
             response,
             expected_url="/polls/"
-            )
\ No newline at end of file
+            )
+
+    def test_result_show_vote_count_and_percentage(self):
+        """Result page must show count, percentage and total of the votes"""
+        q, c1, c2 = create_dummies_question_and_2_choice()
+        for name in ("tester1", "tester2", "tester3"):
+            self.client.force_login(create_test_user(name))
+            user_vote(self.client, c1)
+        self.client.force_login(create_test_user("tester4"))
+        user_vote(self.client, c2)
+        self.client.logout()
+
+        response = self.client.get(reverse("polls:results", args=(q.id, )))
+
+        choice_list = response.context["choice_list"]
+        self.assertEqual([c.votes for c in choice_list], [3, 1])
+        self.assertEqual([c.percentage for c in choice_list], [75.0, 25.0])
+        self.assertEqual(response.context["total_votes"], 4)
+        self.assertContains(response, "75.0%")
+
+    def test_result_without_vote_show_zero_percent(self):
+        """Result of question that nobody vote yet must show 0 percent"""
+        q, _, _ = create_dummies_question_and_2_choice()
+
+        response = self.client.get(reverse("polls:results", args=(q.id, )))
+
+        self.assertEqual(response.context["total_votes"], 0)
+        self.assertEqual(
+            [c.percentage for c in response.context["choice_list"]],
+            [0.0, 0.0]
+        )
+
+    def test_result_query_count_does_not_grow_with_choices(self):
+        """Result page must read question and all tallies in 2 queries"""
+        q, _, _ = create_dummies_question_and_2_choice()
+        for n in range(10):
+            q.choice_set.create(choice_text=f"extra choice {n}")
+
+        url = reverse("polls:results", args=(q.id, ))
+
+        with self.assertNumQueries(2):
+            self.client.get(url)
@@ -0,0 +1,142 @@
+"""Polls app test file"""
+
+import os
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from polls.checks import check_shared_cache
+from polls.models import Choice, Vote
+from polls.results_cache import cache_stats
+from .helper import *
+
+
+class ResultsCacheTest(TestCase):
+    """
+    Test caching of poll results
+    """
+
+    def setUp(self):
+        """Start every test with an empty cache"""
+        cache.clear()
+        self.question, self.c1, self.c2 = create_dummies_question_and_2_choice()
+        self.url = reverse("polls:results", args=(self.question.id,))
+
+    def get_votes(self) -> list[int]:
+        """Return vote count of each choice shown in the result page"""
+        response = self.client.get(self.url)
+        return [c.votes for c in response.context["choice_list"]]
+
+    def test_second_visit_is_served_from_cache(self):
+        """
+        Second visit must read only the question, not the tally
+        """
+        self.client.get(self.url)
+
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+        self.assertEqual(cache_stats(), {"hits": 1, "misses": 1})
+
+    def test_vote_invalidate_cache(self):
+        """
+        Vote must show up in the result page right away
+        """
+        self.assertEqual(self.get_votes(), [0, 0])
+
+        self.client.force_login(create_test_user())
+        user_vote(self.client, self.c1)
+
+        self.assertEqual(self.get_votes(), [1, 0])
+
+    def test_vote_save_and_delete_invalidate_cache(self):
+        """
+        Saving or deleting a vote (e.g. from admin) must drop cached tally
+        """
+        self.assertEqual(self.get_votes(), [0, 0])
+
+        # update() doesn't send signal so cached tally is still served
+        Choice.objects.filter(pk=self.c1.pk).update(vote_count=1)
+        self.assertEqual(self.get_votes(), [0, 0])
+
+        vote = Vote.objects.create(user=create_test_user(), choice=self.c1)
+        self.assertEqual(self.get_votes(), [2, 0])
+
+        vote.delete()
+        self.assertEqual(self.get_votes(), [1, 0])
+
+    def test_new_choice_invalidate_cache(self):
+        """
+        New choice must show up in the result page right away
+        """
+        self.assertEqual(len(self.get_votes()), 2)
+
+        self.question.choice_set.create(choice_text="choice3")
+
+        self.assertEqual(len(self.get_votes()), 3)
+
+    def test_rebuild_vote_counts_invalidate_cache(self):
+        """
+        Rebuilding tally must invalidate every cached result
+        """
+        # bulk_create send no signal, like votes loaded as fixtures
+        Vote.objects.bulk_create([
+            Vote(user=create_test_user(), question=self.question, choice=self.c1)
+        ])
+        self.assertEqual(self.get_votes(), [0, 0])
+
+        call_command("rebuild_vote_counts", stdout=StringIO())
+
+        self.assertEqual(self.get_votes(), [1, 0])
+
+    def test_results_cache_stats_command(self):
+        """
+        Command must show hits and misses and able to reset them
+        """
+        self.client.get(self.url)
+        self.client.get(self.url)
+
+        out = StringIO()
+        call_command("results_cache_stats", "--reset", stdout=out, stderr=StringIO())
+
+        self.assertIn("hits: 1", out.getvalue())
+        self.assertIn("misses: 1", out.getvalue())
+        self.assertIn("hit ratio: 50.0%", out.getvalue())
+        self.assertEqual(cache_stats(), {"hits": 0, "misses": 0})
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    """
+    Test production refuse a cache private to each worker
+    """
+
+    def errors(self) -> list[str]:
+        """Return ids of errors of the shared cache check."""
+        return [error.id for error in check_shared_cache(None)]
+
+    @override_settings(SERVER_MODE="production")
+    def test_local_cache_with_workers_refused(self):
+        """LocMemCache is an error when several workers run"""
+        with mock.patch.dict(os.environ, {"GUNICORN_WORKERS": "3"}):
+            self.assertEqual(self.errors(), ["polls.E001"])
+        with mock.patch.dict(os.environ, {"GUNICORN_WORKERS": "1"}):
+            self.assertEqual(self.errors(), [])
+
+    @override_settings(
+        SERVER_MODE="production",
+        CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": "/tmp/ku-polls-cache",
+        }},
+    )
+    def test_shared_cache_accepted(self):
+        """File cache is shared by the workers"""
+        self.assertEqual(self.errors(), [])
+
+    def test_development_local_cache_accepted(self):
+        """Development server is a single process"""
+        self.assertEqual(self.errors(), [])
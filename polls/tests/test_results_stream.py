@@ -0,0 +1,208 @@
+"""Polls app test file"""
+
+import asyncio
+import json
+import threading
+import time
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from polls.broadcast import ResultsBroadcaster, Subscription
+from polls.views import record_vote
+from .helper import *
+
+
+class ResultsBroadcasterTest(TestCase):
+    """
+    Test pushing tally to subscribers of a question
+    """
+
+    def setUp(self):
+        self.broadcaster = ResultsBroadcaster(autostart=False)
+
+    def test_votes_are_aggregated_once_per_tick(self):
+        """Many votes and viewers of a question cost one tally read per tick"""
+        q, c1, _ = create_dummies_question_and_2_choice()
+        subscriptions = [self.broadcaster.subscribe(q.id) for _ in range(3)]
+
+        for _ in range(5):
+            self.broadcaster.publish(q.id)
+
+        self.assertEqual(self.broadcaster.tick(), 1)
+        self.assertEqual(self.broadcaster.aggregations, 1)
+        for subscription in subscriptions:
+            update = subscription.get(timeout=0)
+            self.assertEqual(update["total"], 0)
+            self.assertIn(c1.id, update["choices"])
+
+    def test_only_changed_choices_are_pushed(self):
+        """Update contain only choices whose tally changed since last tick"""
+        user = create_test_user()
+        q, c1, c2 = create_dummies_question_and_2_choice()
+        subscription = self.broadcaster.subscribe(q.id)
+        self.broadcaster.publish(q.id)
+        self.broadcaster.tick()
+        subscription.get(timeout=0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record_vote(user, c2)
+        self.broadcaster.publish(q.id)
+        self.broadcaster.tick()
+
+        self.assertEqual(
+            subscription.get(timeout=0),
+            {"total": 1, "choices": {c2.id: 1}}
+        )
+
+    def test_publish_without_subscriber_is_ignored(self):
+        """Tally of a question nobody is watching is never read"""
+        q, _, _ = create_dummies_question_and_2_choice()
+
+        self.broadcaster.publish(q.id)
+
+        self.assertEqual(self.broadcaster.tick(), 0)
+        self.assertEqual(self.broadcaster.aggregations, 0)
+
+    def test_unsubscribe(self):
+        """Question without subscriber is forgotten"""
+        subscription = self.broadcaster.subscribe(1)
+
+        self.broadcaster.unsubscribe(subscription)
+
+        self.assertEqual(self.broadcaster.subscribers(1), 0)
+
+
+class SubscriptionTest(TestCase):
+    """
+    Test waiting for tally updates
+    """
+
+    def test_updates_are_merged(self):
+        """Slow viewer get one update with the latest tally"""
+        subscription = Subscription(1)
+
+        subscription.push(1, {10: 1})
+        subscription.push(3, {10: 2, 11: 1})
+
+        self.assertEqual(
+            subscription.get(timeout=0),
+            {"total": 3, "choices": {10: 2, 11: 1}}
+        )
+        self.assertIsNone(subscription.get(timeout=0))
+
+    def test_get_timeout(self):
+        """None is returned when nothing changed"""
+        self.assertIsNone(Subscription(1).get(timeout=0.01))
+
+    def test_aget_wake_up_on_push(self):
+        """Async viewer is woken up by a push from another thread"""
+        subscription = Subscription(1)
+
+        async def wait_for_update():
+            waiting = asyncio.ensure_future(subscription.aget(timeout=5))
+            await asyncio.sleep(0.01)
+            threading.Thread(target=subscription.push, args=(1, {10: 1})).start()
+            return await waiting
+
+        self.assertEqual(
+            asyncio.run(wait_for_update()),
+            {"total": 1, "choices": {10: 1}}
+        )
+
+
+class ResultsStreamViewTest(TestCase):
+    """
+    Test results stream endpoint
+    """
+
+    def setUp(self):
+        self.broadcaster = ResultsBroadcaster(autostart=False)
+        patcher = mock.patch(
+            "polls.broadcast.get_results_broadcaster",
+            return_value=self.broadcaster
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(POLLS_SYNC_STREAM_MAX_AGE=0)
+    def test_stream_start_with_current_tally(self):
+        """First event is tally of every choice"""
+        q, c1, c2 = create_dummies_question_and_2_choice()
+
+        response = self.client.get(reverse("polls:results_stream", args=(q.id,)))
+        events = iter(response.streaming_content)
+        self.assertEqual(next(events), b"retry: 0\n\n")
+        first = next(events).decode()
+        self.assertEqual(self.broadcaster.subscribers(q.id), 1)
+        # Stream end right after the first event
+        self.assertEqual(list(events), [])
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertTrue(first.startswith("event: results\ndata: "))
+        data = json.loads(first.split("data: ", 1)[1])
+        self.assertEqual(data, {"total": 0, "choices": {str(c1.id): 0, str(c2.id): 0}})
+        self.assertEqual(self.broadcaster.subscribers(q.id), 0)
+
+    @override_settings(POLLS_SYNC_STREAM_MAX_AGE=0.2)
+    def test_sync_stream_closed_after_max_age(self):
+        """Sync worker thread is released after max age, browser retry later"""
+        q, _, _ = create_dummies_question_and_2_choice()
+
+        start = time.monotonic()
+        response = self.client.get(reverse("polls:results_stream", args=(q.id,)))
+        events = list(response.streaming_content)
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 2)
+        self.assertEqual(events[0], b"retry: 200\n\n")
+        self.assertEqual(len(events), 2)
+        self.assertEqual(self.broadcaster.subscribers(q.id), 0)
+
+    @override_settings(POLLS_SYNC_STREAMS=1, POLLS_SYNC_STREAM_MAX_AGE=0.2)
+    def test_sync_streams_limited(self):
+        """Stream past the limit only get the current tally"""
+        q, _, _ = create_dummies_question_and_2_choice()
+        url = reverse("polls:results_stream", args=(q.id,))
+        # Retry hint then first tally, the stream is now open
+        held = iter(self.client.get(url).streaming_content)
+        next(held)
+        next(held)
+
+        events = list(self.client.get(url).streaming_content)
+
+        self.assertEqual(len(events), 2)
+        self.assertTrue(events[1].startswith(b"event: results\n"))
+        self.assertEqual(self.broadcaster.subscribers(q.id), 1)
+        list(held)
+        self.assertEqual(self.broadcaster.subscribers(q.id), 0)
+
+    def test_sync_results_page_dont_open_stream(self):
+        """Result page served by sync views doesn't hold a thread with a stream"""
+        q, _, _ = create_dummies_question_and_2_choice()
+
+        response = self.client.get(reverse("polls:results", args=(q.id,)))
+
+        self.assertNotContains(response, "results.js")
+        self.assertNotContains(response, "data-stream-url")
+
+    def test_stream_of_unpublished_question(self):
+        """Question that isn't published can't be streamed"""
+        q, _, _ = create_dummies_question_and_2_choice(pub_days=1)
+
+        response = self.client.get(reverse("polls:results_stream", args=(q.id,)))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_vote_is_published(self):
+        """Vote mark its question as changed after commit"""
+        q, c1, _ = create_dummies_question_and_2_choice()
+        self.client.force_login(create_test_user())
+        self.broadcaster.subscribe(q.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("polls:vote", args=(q.id,)), {"choice": c1.id})
+        self.broadcaster.tick()
+
+        self.assertEqual(self.broadcaster.aggregations, 1)
@@ -0,0 +1,72 @@
+"""Polls app test file"""
+
+import datetime
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .helper import *
+
+
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.db")
+class PurgeSessionsTest(TestCase):
+    """
+    Test deleting expired sessions in batches
+    """
+
+    def create_sessions(self, count: int, days: int) -> None:
+        """Create sessions that expire days from now."""
+        expire_date = timezone.now() + datetime.timedelta(days=days)
+        Session.objects.bulk_create([
+            Session(session_key=f"{days}-{index}", session_data="", expire_date=expire_date)
+            for index in range(count)
+        ])
+
+    def test_delete_expired_in_batches(self):
+        """Only expired sessions are deleted, a batch at a time"""
+        self.create_sessions(5, days=-1)
+        self.create_sessions(3, days=1)
+        out = StringIO()
+
+        call_command("purge_sessions", "--batch-size", "2", stdout=out)
+
+        self.assertIn("Deleted 5 expired session(s) in 3 batch(es)", out.getvalue())
+        self.assertEqual(Session.objects.count(), 3)
+        self.assertFalse(Session.objects.filter(expire_date__lt=timezone.now()).exists())
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
+    def test_cookie_sessions_nothing_to_purge(self):
+        """Sessions kept in cookies aren't in the database"""
+        self.create_sessions(2, days=-1)
+        out = StringIO()
+
+        call_command("purge_sessions", stdout=out)
+
+        self.assertIn("nothing to purge", out.getvalue())
+        self.assertEqual(Session.objects.count(), 2)
+
+
+class VoteSessionWriteTest(TestCase):
+    """
+    Test that a vote doesn't write the session
+    """
+
+    def test_vote_and_results_without_session_write(self):
+        """Confirmation message of a vote isn't stored in the session"""
+        _, c1, _ = create_dummies_question_and_2_choice(pub_days=-1)
+        self.client.force_login(create_test_user())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = user_vote(self.client, c1)
+            response = self.client.get(response.url)
+
+        self.assertEqual(len(response.context["messages"]), 1)
+        self.assertFalse([
+            query["sql"] for query in queries
+            if "django_session" in query["sql"] and not query["sql"].startswith("SELECT")
+        ])
@@ -0,0 +1,58 @@
+"""Polls app test file"""
+
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import SimpleTestCase, override_settings
+
+BOOTSTRAP_CSS = "polls/vendor/bootstrap/css/bootstrap.min.css"
+
+
+class CollectedStaticTest(SimpleTestCase):
+    """
+    Test hashed, precompressed static files served by WhiteNoise
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        static_root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(static_root.cleanup)
+        settings = override_settings(STATIC_ROOT=static_root.name)
+        settings.enable()
+        cls.addClassCleanup(settings.disable)
+        call_command(
+            "collectstatic", interactive=False, verbosity=0, ignore_patterns=["admin"]
+        )
+
+    def test_hashed_name_immutable(self):
+        """Collected file has a hashed URL cached forever"""
+        url = static(BOOTSTRAP_CSS)
+        self.assertRegex(url, r"bootstrap\.min\.[0-9a-f]{12}\.css$")
+
+        response = self.client.get(url, headers={"accept-encoding": "br, gzip"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["Content-Encoding"], "br")
+
+    def test_background_url_hashed(self):
+        """Images referenced by the stylesheet get hashed names"""
+        response = self.client.get(static("polls/style.css"))
+        css = b"".join(response.streaming_content).decode()
+
+        self.assertRegex(css, r"images/background-1920\.[0-9a-f]{12}\.webp")
+
+    def test_static_request_skip_session_and_auth(self):
+        """Static file is served before session and auth middleware"""
+        with mock.patch.object(SessionMiddleware, "process_request") as session, \
+                mock.patch.object(AuthenticationMiddleware, "process_request") as auth:
+            response = self.client.get(static(BOOTSTRAP_CSS))
+
+        self.assertEqual(response.status_code, 200)
+        session.assert_not_called()
+        auth.assert_not_called()
@@ -0,0 +1,159 @@
+"""Polls app test file"""
+
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from polls.buffer import VoteBuffer
+from polls.models import Vote
+from .helper import *
+
+
+class CastManyTest(TestCase):
+    """
+    Test writing a batch of votes
+    """
+
+    def test_cast_many_keep_last_vote_of_user(self):
+        """
+        Only the last vote of a user on a question in the batch is written
+        """
+        user = create_test_user()
+        q, c1, c2 = create_dummies_question_and_2_choice()
+
+        written = Vote.objects.cast_many([
+            (user.id, q.id, c1.id),
+            (user.id, q.id, c2.id),
+        ])
+
+        self.assertEqual(written, 1)
+        self.assertEqual(Vote.objects.get(user=user).choice, c2)
+        c1.refresh_from_db()
+        c2.refresh_from_db()
+        self.assertEqual((c1.votes, c2.votes), (0, 1))
+
+    def test_cast_many_move_existing_vote(self):
+        """
+        Batch must move tally of users that already voted
+        """
+        user1 = create_test_user("tester1")
+        user2 = create_test_user("tester2")
+        q, c1, c2 = create_dummies_question_and_2_choice()
+        Vote.objects.cast(user1, c1)
+        Vote.objects.cast(user2, c1)
+
+        Vote.objects.cast_many([
+            (user1.id, q.id, c2.id),
+            (user2.id, q.id, c1.id),
+        ])
+
+        c1.refresh_from_db()
+        c2.refresh_from_db()
+        self.assertEqual((c1.votes, c2.votes), (1, 1))
+        self.assertEqual(Vote.objects.count(), 2)
+
+
+@override_settings(POLLS_VOTE_BUFFER=True)
+class BufferedVotingTest(TestCase):
+    """
+    Test vote() view when votes are buffered
+    """
+
+    def setUp(self):
+        """Use a buffer without worker so test decide when it flush"""
+        self.buffer = VoteBuffer(autostart=False)
+        patcher = mock.patch("polls.views.get_vote_buffer", return_value=self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = create_test_user()
+        self.client.force_login(self.user)
+        self.question, self.c1, self.c2 = create_dummies_question_and_2_choice()
+
+    def test_vote_is_queued(self):
+        """
+        Vote must be queued instead of written
+        """
+        response = user_vote(self.client, self.c1)
+
+        self.assertRedirects(
+            response,
+            reverse("polls:results", args=(self.question.id,))
+        )
+        self.assertEqual(self.buffer.pending(), 1)
+        self.assertFalse(Vote.objects.exists())
+
+    def test_user_see_own_vote_before_flush(self):
+        """
+        Results and detail page must show vote of this user before flush
+        """
+        user_vote(self.client, self.c1)
+
+        response = self.client.get(
+            reverse("polls:results", args=(self.question.id,))
+        )
+        self.assertEqual(
+            [c.votes for c in response.context["choice_list"]], [1, 0]
+        )
+        self.assertEqual(response.context["total_votes"], 1)
+
+        response = self.client.get(
+            reverse("polls:detail", args=(self.question.id,))
+        )
+        self.assertContains(response, f'value="{self.c1.id}" checked')
+
+    def test_user_see_changed_vote_before_flush(self):
+        """
+        Changed vote must move the tally shown to the user before flush
+        """
+        Vote.objects.cast(self.user, self.c1)
+
+        user_vote(self.client, self.c2)
+
+        response = self.client.get(
+            reverse("polls:results", args=(self.question.id,))
+        )
+        self.assertEqual(
+            [c.votes for c in response.context["choice_list"]], [0, 1]
+        )
+
+    def test_flush_write_vote(self):
+        """
+        After flush the vote is in database and shown only once
+        """
+        user_vote(self.client, self.c1)
+        self.buffer.flush()
+
+        self.assertEqual(Vote.objects.get(user=self.user).choice, self.c1)
+
+        response = self.client.get(
+            reverse("polls:results", args=(self.question.id,))
+        )
+        self.assertEqual(
+            [c.votes for c in response.context["choice_list"]], [1, 0]
+        )
+        self.assertNotIn("pending_votes", dict(self.client.session))
+
+
+class VoteBufferWorkerTest(TransactionTestCase):
+    """
+    Test the background worker of vote buffer
+    """
+
+    def test_worker_flush_within_max_latency(self):
+        """
+        Worker must write queued votes in batches
+        """
+        q, c1, c2 = create_dummies_question_and_2_choice()
+        users = [create_test_user(f"tester{n}") for n in range(5)]
+
+        buffer = VoteBuffer(batch_size=2, max_latency=0.05)
+        for user in users:
+            buffer.submit(user.id, q.id, c1.id)
+        buffer.stop()
+
+        self.assertEqual(buffer.pending(), 0)
+        self.assertEqual(buffer.flushed, 5)
+        c1.refresh_from_db()
+        self.assertEqual(c1.votes, 5)
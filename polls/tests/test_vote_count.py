@@ -0,0 +1,177 @@
+"""Polls app test file"""
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from polls.models import Choice, Vote
+from .helper import *
+
+
+class VoteCountTest(TestCase):
+    """
+    Test the denormalized vote tally on Choice
+    """
+
+    def test_new_vote_increase_vote_count(self):
+        """
+        Voting for the first time must add one to the selected choice tally
+        """
+        user = create_test_user()
+        self.client.force_login(user)
+
+        _, c1, c2 = create_dummies_question_and_2_choice()
+
+        user_vote(self.client, c1)
+
+        c1.refresh_from_db()
+        c2.refresh_from_db()
+        self.assertEqual(c1.votes, 1)
+        self.assertEqual(c2.votes, 0)
+
+    def test_change_vote_move_vote_count(self):
+        """
+        Changing vote must move the tally from previous choice to the new one
+        """
+        user = create_test_user()
+        self.client.force_login(user)
+
+        _, c1, c2 = create_dummies_question_and_2_choice()
+
+        user_vote(self.client, c1)
+        user_vote(self.client, c2)
+
+        c1.refresh_from_db()
+        c2.refresh_from_db()
+        self.assertEqual(c1.votes, 0)
+        self.assertEqual(c2.votes, 1)
+
+    def test_same_vote_keep_vote_count(self):
+        """
+        Voting the same choice again must not change the tally
+        """
+        user = create_test_user()
+        self.client.force_login(user)
+
+        _, c1, _ = create_dummies_question_and_2_choice()
+
+        user_vote(self.client, c1)
+        user_vote(self.client, c1)
+
+        c1.refresh_from_db()
+        self.assertEqual(c1.votes, 1)
+
+    def test_delete_voter_decrease_vote_count(self):
+        """
+        Deleting a user must take their votes out of the tally
+        """
+        _, c1, c2 = create_dummies_question_and_2_choice()
+        voter = create_test_user("tester1")
+        for user, choice in ((voter, c1), (create_test_user("tester2"), c2)):
+            self.client.force_login(user)
+            user_vote(self.client, choice)
+
+        voter.delete()
+
+        c1.refresh_from_db()
+        c2.refresh_from_db()
+        self.assertEqual(c1.votes, 0)
+        self.assertEqual(c2.votes, 1)
+        self.assertFalse(Choice.objects.out_of_sync().exists())
+
+    def test_vote_saved_outside_vote_path_counted(self):
+        """
+        Vote created and deleted with the model, e.g. from admin, keep the tally
+        """
+        _, c1, c2 = create_dummies_question_and_2_choice()
+        vote = Vote.objects.create(user=create_test_user("tester1"), choice=c1)
+        Vote.objects.create(user=create_test_user("tester2"), choice=c1)
+
+        c1.refresh_from_db()
+        self.assertEqual(c1.votes, 2)
+
+        vote.delete()
+        Vote.objects.filter(choice=c1).delete()
+
+        c1.refresh_from_db()
+        self.assertEqual(c1.votes, 0)
+        self.assertFalse(Choice.objects.out_of_sync().exists())
+
+    def test_change_vote_with_stale_tally(self):
+        """
+        Stale tally of the previous choice must not fail the vote
+        """
+        user = create_test_user()
+        self.client.force_login(user)
+        q, c1, c2 = create_dummies_question_and_2_choice()
+        Vote.objects.bulk_create([Vote(user=user, question=q, choice=c1)])
+
+        response = user_vote(self.client, c2)
+
+        self.assertEqual(response.status_code, 302)
+        c1.refresh_from_db()
+        c2.refresh_from_db()
+        self.assertEqual(c1.votes, 0)
+        self.assertEqual(c2.votes, 1)
+
+    def test_delete_question_without_loading_votes(self):
+        """
+        Votes of a deleted question are deleted in bulk, not one by one
+        """
+        def delete_queries(voters):
+            question, c1, _ = create_dummies_question_and_2_choice()
+            Vote.objects.bulk_create([
+                Vote(user=user, question=question, choice=c1) for user in voters
+            ])
+            with CaptureQueriesContext(connection) as queries:
+                question.delete()
+            return len(queries)
+
+        users = [create_test_user(f"tester{index}") for index in range(20)]
+
+        self.assertEqual(delete_queries(users[:1]), delete_queries(users))
+        self.assertFalse(Vote.objects.exists())
+
+    def test_delete_voter_with_one_update(self):
+        """
+        Votes of a deleted user leave the tally with a single UPDATE
+        """
+        voter = create_test_user()
+        for index in range(5):
+            _, c1, _ = create_dummies_question_and_2_choice(f"question{index}")
+            Vote.objects.create(user=voter, choice=c1)
+
+        with CaptureQueriesContext(connection) as queries:
+            voter.delete()
+
+        updates = [q["sql"] for q in queries if 'UPDATE "polls_choice"' in q["sql"]]
+        self.assertEqual(len(updates), 1)
+        self.assertFalse(Choice.objects.filter(vote_count__gt=0).exists())
+
+    def test_rebuild_vote_counts_fix_stale_tally(self):
+        """
+        rebuild_vote_counts must recompute tally from Vote rows
+        """
+        q, c1, c2 = create_dummies_question_and_2_choice()
+        # bulk_create send no signal, like votes loaded as fixtures
+        Vote.objects.bulk_create([
+            Vote(user=create_test_user(f"tester{index}"), question=q, choice=c1)
+            for index in range(2)
+        ])
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_vote_counts", "--check", stdout=StringIO())
+
+        call_command("rebuild_vote_counts", stdout=StringIO())
+
+        c1.refresh_from_db()
+        c2.refresh_from_db()
+        self.assertEqual(c1.votes, 2)
+        self.assertEqual(c2.votes, 0)
+
+        # Tally is now in sync so check must pass
+        call_command("rebuild_vote_counts", "--check", stdout=StringIO())
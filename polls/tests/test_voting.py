@@ -2,9 +2,12 @@
 
 import datetime
 
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from polls.models import Vote
 from .helper import *
 
 
@@ -131,5 +134,126 @@ class VotingTest(TestCase):
         user_vote(self.client, c1)
 
         self.assertEqual(c1.vote_set.count(), 1)
-        
-    
\ No newline at end of file
+
+    def test_vote_store_question_of_choice(self):
+        """
+        Vote must store question of selected choice
+        """
+        user = create_test_user()
+        self.client.force_login(user)
+
+        q, c1, _ = create_dummies_question_and_2_choice()
+
+        user_vote(self.client, c1)
+
+        self.assertEqual(Vote.objects.get(user=user).question, q)
+
+    def test_user_can_not_have_two_votes_on_same_question(self):
+        """
+        Database must reject second vote row of a user on the same question
+        """
+        user = create_test_user()
+        _, c1, c2 = create_dummies_question_and_2_choice()
+
+        Vote.objects.create(user=user, choice=c1)
+
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Vote.objects.create(user=user, choice=c2)
+
+    def test_cast_return_previous_choice(self):
+        """
+        Vote.objects.cast must upsert vote and return previous choice
+        """
+        user = create_test_user()
+        _, c1, c2 = create_dummies_question_and_2_choice()
+
+        self.assertIsNone(Vote.objects.cast(user, c1))
+        self.assertEqual(Vote.objects.cast(user, c2), c1)
+        self.assertEqual(Vote.objects.cast(user, c2), c2)
+
+        self.assertEqual(Vote.objects.filter(user=user).count(), 1)
+        c1.refresh_from_db()
+        c2.refresh_from_db()
+        self.assertEqual((c1.votes, c2.votes), (0, 1))
+
+    def test_change_vote_query_count(self):
+        """
+        Changing vote cost a read of previous vote, one upsert and one tally update
+
+        SQLite has no row lock, so there is no SELECT ... FOR UPDATE of the
+        user row here as on PostgreSQL.
+        """
+        user = create_test_user()
+        _, c1, c2 = create_dummies_question_and_2_choice()
+        Vote.objects.cast(user, c1)
+
+        with CaptureQueriesContext(connection) as queries:
+            Vote.objects.cast(user, c2)
+
+        statements = [
+            q["sql"] for q in queries.captured_queries
+            if not q["sql"].startswith(("SAVEPOINT", "RELEASE", "BEGIN"))
+        ]
+        self.assertEqual(len(statements), 3)
+        self.assertTrue(statements[0].startswith("SELECT"))
+        self.assertIn("ON CONFLICT", statements[1])
+
+    def test_vote_without_choice_redirect_to_detail(self):
+        """
+        Vote without selecting a choice must redirect back to detail page
+        """
+        user = create_test_user()
+        self.client.force_login(user)
+        q, _, _ = create_dummies_question_and_2_choice()
+
+        response = self.client.post(reverse("polls:vote", args=(q.id,)))
+
+        self.assertRedirects(response, reverse("polls:detail", args=(q.id,)))
+        self.assertFalse(Vote.objects.exists())
+
+    def test_vote_invalid_choice_redirect_to_detail(self):
+        """
+        Vote for choice of other question or malformed choice must be rejected
+        """
+        user = create_test_user()
+        self.client.force_login(user)
+        q, _, _ = create_dummies_question_and_2_choice()
+        _, other_choice, _ = create_dummies_question_and_2_choice("Other")
+
+        url = reverse("polls:vote", args=(q.id,))
+        for choice in (other_choice.id, "abc"):
+            response = self.client.post(url, {"choice": choice})
+            self.assertRedirects(response, reverse("polls:detail", args=(q.id,)))
+
+        self.assertFalse(Vote.objects.exists())
+
+    def test_vote_non_existent_question_redirect_to_index(self):
+        """
+        Vote on question that doesn't exist must redirect to index page
+        """
+        self.client.force_login(create_test_user())
+
+        response = self.client.post(
+            reverse("polls:vote", args=(100,)), {"choice": 1}
+        )
+
+        self.assertRedirects(response, reverse("polls:index"))
+
+    def test_new_vote_is_logged_without_traceback(self):
+        """
+        Successful vote must be logged as a plain info record
+        """
+        user = create_test_user()
+        self.client.force_login(user)
+        q, c1, _ = create_dummies_question_and_2_choice()
+
+        with self.assertLogs("polls", level="DEBUG") as logs:
+            user_vote(self.client, c1)
+
+        self.assertEqual(len(logs.records), 1)
+        record = logs.records[0]
+        self.assertEqual(record.levelname, "INFO")
+        self.assertIsNone(record.exc_info)
+        self.assertEqual(record.question_id, q.id)
+        self.assertEqual(record.choice_id, c1.id)
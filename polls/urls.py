@@ -1,14 +1,36 @@
 """Module for set up URL path and it's handler."""
 
+from django.conf import settings
 from django.urls import path
 
 from . import views
+from .ratelimit import rate_limit
+
+if settings.POLLS_ASYNC_VIEWS:
+    from . import async_views
+
+    detail_view = async_views.AsyncDetailView.as_view()
+    results_view = async_views.AsyncResultsView.as_view()
+    results_stream_view = async_views.results_stream
+    vote_view = async_views.vote
+else:
+    detail_view = views.DetailView.as_view()
+    results_view = views.ResultsView.as_view()
+    results_stream_view = views.results_stream
+    vote_view = views.vote
 
 app_name = "polls"
 
 urlpatterns = [
     path("", views.IndexView.as_view(), name="index"),
-    path("<int:pk>/", views.DetailView.as_view(), name="detail"),
-    path("<int:pk>/results/", views.ResultsView.as_view(), name="results"),
-    path("<int:question_id>/vote/", views.vote, name="vote"),
+    path("index.json", views.IndexJSONView.as_view(), name="index_json"),
+    path("<int:pk>/", detail_view, name="detail"),
+    path("<int:pk>/results/", results_view, name="results"),
+    path(
+        "<int:pk>/results/stream/",
+        results_stream_view,
+        name="results_stream"
+    ),
+    path("<int:question_id>/vote/", rate_limit("vote")(vote_view), name="vote"),
+    path("export/<str:kind>/", views.export, name="export"),
 ]
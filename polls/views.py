@@ -1,13 +1,25 @@
 """Module for render and response a request."""
 
 import logging
-from typing import Any
+from typing import Any, Optional
+from django.conf import settings
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponseRedirect
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.urls import reverse
 from django.views import generic
 from django.utils import timezone
 from django.contrib import messages
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.signals import (
     user_logged_in,
@@ -16,7 +28,27 @@ from django.contrib.auth.signals import (
 )
 from django.dispatch import receiver
 
+from .broadcast import publish_results, stream_results
+from .buffer import (
+    forget_pending_vote,
+    get_vote_buffer,
+    overlay_pending_vote,
+    pending_choice_id,
+    remember_pending_vote
+)
+from .conditional import index_version, make_etag
+from .export import (
+    EXPORT_FIELDS,
+    EXPORT_FORMATS,
+    export_lines,
+    export_questions,
+    parse_bound
+)
+from .metrics import render_metrics
 from .models import Choice, Question, Vote
+from .pagination import keyset_paginate
+from .results_cache import get_results, invalidate_results, results_version
+from .retry import retry_on_lock
 
 # Create your views here.
 
@@ -72,39 +104,200 @@ def user_login_failed_callback(sender, credentials, **kwargs):
     logger.warning(f'login failed for: {credentials}')
 
 
-class IndexView(generic.ListView):
+def has_session(request) -> bool:
+    """Return True if request carry a session cookie, reading no session."""
+    return settings.SESSION_COOKIE_NAME in request.COOKIES
+
+
+def has_messages(request) -> bool:
+    """Return True if flash messages wait to be shown to the visitor."""
+    return bool(len(messages.get_messages(request)))
+
+
+class ConditionalGetMixin:
+    """Answer 304 Not Modified when the page didn't change since last visit.
+
+    Subclass return versions of what the page shows from
+    get_version_parts(), the ETag also depends on the logged in user. The
+    check runs before dispatch() of other mixins so nothing is loaded for
+    an unchanged page.
+
+    Visitor without a session cookie is anonymous, their page is rendered
+    without reading the session (so without ``Vary: Cookie``) and can be
+    kept by shared caches for ``POLLS_PUBLIC_CACHE_MAX_AGE`` seconds.
+    """
+
+    def get_version_parts(self) -> list:
+        """Return versions of the content of the page."""
+        raise NotImplementedError
+
+    def is_public(self) -> bool:
+        """Return True if the page is the same for every anonymous visitor."""
+        return not has_session(self.request)
+
+    def get_etag(self) -> Optional[str]:
+        """Return ETag of the page for this visitor, None to always render."""
+        request = self.request
+        # Flash messages must be rendered once
+        if has_messages(request):
+            return None
+        if self.is_public():
+            return make_etag(*self.get_version_parts())
+        return make_etag(*self.get_version_parts(), request.session.get(SESSION_KEY))
+
+    def dispatch(self, request, *args, **kwargs):
+        """Return 304 if visitor has the current page, set ETag otherwise."""
+        if not has_session(request):
+            # No session means no logged in user, don't load it from session
+            request.user = AnonymousUser()
+        public = self.is_public()
+
+        etag = self.get_etag() if request.method in ("GET", "HEAD") else None
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = super().dispatch(request, *args, **kwargs)
+        return set_page_cache_headers(request, response, etag, public)
+
+
+def not_modified_response(request, etag: Optional[str]):
+    """Return 304 response if visitor has the page of etag, else None."""
+    if etag is None:
+        return None
+    return get_conditional_response(request, etag=etag)
+
+
+def set_page_cache_headers(request, response, etag: Optional[str], public: bool):
+    """Set ETag and Cache-Control of a rendered page and return it.
+
+    Page of an anonymous visitor can be kept by shared caches, other pages
+    must be revalidated by the browser.
+    """
+    if response.status_code != 200 or request.method not in ("GET", "HEAD"):
+        return response
+
+    max_age = settings.POLLS_PUBLIC_CACHE_MAX_AGE
+    if etag is not None:
+        response["ETag"] = etag
+    if etag is not None and public and max_age:
+        patch_cache_control(response, public=True, max_age=max_age)
+    else:
+        # Page differ between users, ask browsers to revalidate it
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class IndexView(ConditionalGetMixin, generic.ListView):
     """Class responsible to show list of question."""
 
     template_name = "polls/index.html"
     context_object_name = "latest_question_list"
 
+    # Filter tabs on the index, map status to name of queryset method
+    status_filters = {
+        "all": "published",
+        "open": "open",
+        "closed": "closed",
+    }
+
+    def get_version_parts(self) -> list:
+        """Return version of the poll list."""
+        return [index_version()]
+
+    def get_status(self) -> str:
+        """Return selected filter tab, fall back to all."""
+        status = self.request.GET.get("status", "all")
+        return status if status in self.status_filters else "all"
+
     def get_queryset(self):
-        """Return the last five published questions."""
-        return Question.objects.filter(
-            pub_date__lte=timezone.now()
-        ).order_by("-pub_date")
+        """Return published questions of selected tab, latest first."""
+        now = timezone.now()
+        questions = getattr(Question.objects, self.status_filters[self.get_status()])
+        return questions(now).with_availability(now).order_by(
+            "-pub_date", "-id"
+        )
 
+    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        """Add selected filter tab into context."""
+        context = super().get_context_data(**kwargs)
+        context["status"] = self.get_status()
+        return context
 
-class DetailView(generic.DetailView):
-    """Class responsible to show detail of each question."""
+    def get_paginate_by(self, queryset) -> int:
+        """Return number of question per page."""
+        return settings.POLLS_INDEX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, page_size):
+        """Paginate by cursor on (pub_date, id) instead of page number."""
+        page = keyset_paginate(
+            queryset,
+            self.request.GET.get("cursor"),
+            page_size
+        )
+        return None, page, page.object_list, page.has_next
+
+
+class IndexJSONView(IndexView):
+    """Class responsible to show list of question as JSON."""
+
+    def is_public(self) -> bool:
+        """Return True, the list is the same for every visitor."""
+        return True
+
+    def render_to_response(self, context, **response_kwargs):
+        """Return JSON of question in current page and cursor of next page."""
+        results = [
+            {
+                "id": question.id,
+                "question_text": question.question_text,
+                "pub_date": question.pub_date,
+                "end_date": question.end_date,
+                "available": question.available,
+                "detail_url": reverse("polls:detail", args=(question.id,)),
+                "results_url": reverse("polls:results", args=(question.id,)),
+            }
+            for question in context["latest_question_list"]
+        ]
+        return JsonResponse(
+            {"results": results, "next": context["page_obj"].next_cursor}
+        )
+
+
+class PublishedQuestionMixin:
+    """Load question once per request and allow only published question.
+
+    The question is fetched in dispatch() and kept in ``self.object`` so
+    get() and get_context_data() doesn't need to query it again.
+    """
 
     model = Question
-    template_name = "polls/detail.html"
 
     def dispatch(self, request, *args, **kwargs):
         """Check does polls available or not before do anything else."""
         try:
-            question = self.get_object()
+            self.object = self.get_object()
         except Exception:
             messages.warning(request, "Polls doesn't exist")
             return HttpResponseRedirect(reverse("polls:index"), request)
 
-        if question.is_published():
+        if self.object.is_published():
             return super().dispatch(request, *args, **kwargs)
         else:
             messages.warning(request, "Polls is unavailable right now")
             return HttpResponseRedirect(reverse("polls:index"), request)
 
+    def get(self, request, *args, **kwargs):
+        """Render the question that already loaded by dispatch."""
+        context = self.get_context_data(object=self.object)
+        return self.render_to_response(context)
+
+
+class DetailView(PublishedQuestionMixin, generic.DetailView):
+    """Class responsible to show detail of each question."""
+
+    template_name = "polls/detail.html"
+
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         """
         Return a context data for passing into template.
@@ -114,46 +307,164 @@ class DetailView(generic.DetailView):
         """
         # Get original context
         context = super().get_context_data(**kwargs)
+        context["choice_list"] = self.object.choice_set.all()
 
         # Get current user
         this_user = self.request.user
 
-        # Get selected question
-        question = self.get_object()
-
         if this_user.is_authenticated:
-            try:
-                # Try to got vote that got vote by this user
-                previous_vote = this_user.vote_set.get(
+            # Queued vote is newer than anything stored in database
+            pending_id = pending_choice_id(self.request.session, self.object.pk)
+            if pending_id is not None:
+                context["previous_selected_id"] = pending_id
+            else:
+                # Id of choice that this user voted for, None if never vote
+                context["previous_selected_id"] = Vote.objects.filter(
                     user=this_user,
-                    choice__question=question
-                )
-                context['previous_selected_id'] = previous_vote.choice.id
-            except Vote.DoesNotExist:
-                context["previous_selected_id"] = None
+                    question=self.object
+                ).values_list("choice_id", flat=True).first()
 
         return context
 
 
-class ResultsView(generic.DetailView):
+class ResultsView(ConditionalGetMixin, PublishedQuestionMixin, generic.DetailView):
     """Class responsible to polls result."""
 
-    model = Question
     template_name = "polls/results.html"
 
-    def dispatch(self, request, *args, **kwargs):
-        """Check does polls available or not before do anything else."""
-        try:
-            question = self.get_object()
-        except Exception:
-            messages.warning(request, "Polls doesn't exist")
-            return HttpResponseRedirect(reverse("polls:index"), request)
+    def get_version_parts(self) -> list:
+        """Return version of the results and queued vote of this visitor."""
+        question_id = self.kwargs["pk"]
+        if self.is_public():
+            return [results_version(question_id)]
+        return [
+            results_version(question_id),
+            pending_choice_id(self.request.session, question_id),
+        ]
 
-        if question.is_published():
-            return super().dispatch(request, *args, **kwargs)
-        else:
-            messages.warning(request, "Polls is unavailable right now")
-            return HttpResponseRedirect(reverse("polls:index"), request)
+    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        """
+        Return a context data with precomputed tally of every choice.
+
+        Returns:
+            dict[str, Any]: Dict that map string with a context data
+        """
+        context = super().get_context_data(**kwargs)
+
+        # Tally is cached, on a miss it is read with a single query
+        choice_list = get_results(self.object)
+
+        context["choice_list"] = choice_list
+        context["total_votes"] = sum(choice.votes for choice in choice_list)
+
+        if self.request.user.is_authenticated:
+            total = self.apply_pending_vote(choice_list)
+            if total is not None:
+                context["total_votes"] = total
+
+        return context
+
+    def apply_pending_vote(self, choice_list) -> Optional[int]:
+        """Show queued vote of this user that isn't flushed yet.
+
+        Returns:
+            int | None: total votes after overlay, None if nothing pending
+        """
+        session = self.request.session
+        pending_id = pending_choice_id(session, self.object.pk)
+        if pending_id is None:
+            return None
+
+        stored_id = Vote.objects.filter(
+            user=self.request.user,
+            question=self.object
+        ).values_list("choice_id", flat=True).first()
+
+        if stored_id == pending_id:
+            # Vote already flushed, database is up to date
+            forget_pending_vote(session, self.object.pk)
+            return None
+
+        return overlay_pending_vote(choice_list, pending_id, stored_id)
+
+
+def results_stream(request, pk):
+    """Stream live tally of a published question as Server-Sent Events.
+
+    Args:
+        request (django.http.HttpRequest): http request from django
+        pk (int): question id
+
+    Returns:
+        django.http.StreamingHttpResponse: event stream of tally updates
+    """
+    question = get_object_or_404(Question.objects.published(), pk=pk)
+    return event_stream_response(stream_results(question))
+
+
+def event_stream_response(events) -> StreamingHttpResponse:
+    """Return response that stream events without buffering."""
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Ask nginx not to buffer the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@staff_member_required
+def export(request, kind):
+    """Stream results or raw votes as CSV or NDJSON for staff.
+
+    Query parameters are ``format`` (csv or ndjson, csv by default),
+    ``question`` to export a single question, ``since`` and ``until`` to
+    export questions published in that range.
+
+    Args:
+        request (django.http.HttpRequest): http request from django
+        kind (str): "results" or "votes"
+
+    Returns:
+        django.http.StreamingHttpResponse: export file
+    """
+    if kind not in EXPORT_FIELDS:
+        raise Http404(f"No {kind} export")
+
+    fmt = request.GET.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(f"Unknown format {fmt!r}")
+    try:
+        question_id = request.GET.get("question")
+        questions = export_questions(
+            question_id=int(question_id) if question_id else None,
+            since=parse_bound(request.GET.get("since")),
+            until=parse_bound(request.GET.get("until")),
+        )
+    except ValueError as err:
+        return HttpResponseBadRequest(str(err))
+
+    response = StreamingHttpResponse(
+        export_lines(kind, fmt, questions),
+        content_type=EXPORT_FORMATS[fmt]
+    )
+    filename = f"polls-{kind}-{question_id}" if question_id else f"polls-{kind}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+def metrics(request):
+    """Return per-view request metrics of this process in Prometheus format.
+
+    Args:
+        request (django.http.HttpRequest): http request from django
+
+    Returns:
+        django.http.HttpResponse: metrics as plain text
+    """
+    if not settings.POLLS_METRICS:
+        raise Http404("Metrics are disabled")
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 @login_required
@@ -174,15 +485,15 @@ def vote(request, question_id):
 
     username = request.user.username
 
-    # Check does question exist or not
-    try:
-        question = get_object_or_404(Question, pk=question_id)
-        q_text = question.question_text
-    # If not, redirect user to index page and warn them
-    except Question.DoesNotExist as err:
-
-        logger.exception(f"Non-existent question {question_id} %s", err)
-
+    # Check does question exist or not,
+    # if not, redirect user to index page and warn them
+    question = Question.objects.filter(pk=question_id).first()
+    if question is None:
+        logger.warning(
+            "Non-existent question %s",
+            question_id,
+            extra={"username": username, "question_id": question_id}
+        )
         messages.warning(request, "Polls doesn't exist")
         return HttpResponseRedirect(reverse("polls:index"), request)
 
@@ -192,85 +503,187 @@ def vote(request, question_id):
         messages.warning(request, "Polls is unavailable right now")
         return HttpResponseRedirect(reverse("polls:index"), request)
 
-    # Try to get user choice from request
-    try:
-        selected_choice = question.choice_set.get(  # type: ignore
-                pk=request.POST["choice"]
-            )
-        c_text = selected_choice.choice_text
-    except KeyError as err:
-
-        # Warn user if they doesn't select any choice
-        messages.warning(request, "You haven't select the choice")
-
-        # Log an exception
-        logger.exception(f"User {username} doesn't select a choice %s", err)
-
+    # Get user choice from request, None if missing or not from this question
+    selected_choice = get_selected_choice(request, question)
+    if selected_choice is None:
         # Redirect user back to question detail with a message
         return HttpResponseRedirect(
             reverse("polls:detail", args=(question.id,))
         )
 
-    except Choice.DoesNotExist as err:
+    if settings.POLLS_VOTE_BUFFER:
+        queue_vote(request, question, selected_choice)
+        remember_pending_vote(request.session, question.id, selected_choice.id)
+    else:
+        # Record vote and tally, get previous choice of this user if any
+        previous_choice = record_vote(request.user, selected_choice)
+        confirm_vote(request, question, selected_choice, previous_choice)
+
+    # Always return an HttpResponseRedirect after successfully dealing
+    # with POST data. This prevents data from being posted twice if a
+    # user hits the Back button.
+    return HttpResponseRedirect(
+            reverse("polls:results", args=(question.id,))  # type: ignore
+            )
+
 
-        # Warn user if they select a choice from different polls
-        messages.warning(request, "You have selected a invalid choice")
+def record_vote(user, choice) -> Optional[Choice]:
+    """Write vote and tally then drop cached result of the question.
 
-        # Log an exception
-        logger.exception(f"User {username} select invalid choice %s", err)
+    Args:
+        user (User): user who vote
+        choice (Choice): selected choice
 
-        # Redirect user back to question detail with a message
-        return HttpResponseRedirect(
-            reverse("polls:detail", args=(question.id,))
-        )
+    Returns:
+        Choice | None: previous choice of user, None if it is the first vote
+    """
+    previous_choice = retry_on_lock(Vote.objects.cast, user, choice)
+    invalidate_results(choice.question_id)
+    publish_results(choice.question_id)
+    return previous_choice
 
-    # Get current user
-    this_user = request.user
 
-    try:
-        # Get vote from this user that vote to this question
-        vote = this_user.vote_set.get(choice__question=question)
-        previous_choice = vote.choice.choice_text
+def confirm_vote(request, question, selected_choice, previous_choice) -> None:
+    """Log a recorded vote and confirm it to the user.
 
-        vote.choice = selected_choice
-        vote.save()
+    Args:
+        request (django.http.HttpRequest): http request from django
+        question (Question): question that user vote
+        selected_choice (Choice): choice that user select
+        previous_choice (Choice | None): choice that user voted before
+    """
+    username = request.user.username
+    log_extra = {
+        "username": username,
+        "question_id": question.id,
+        "choice_id": selected_choice.id,
+    }
+
+    if previous_choice is not None:
 
         # Log user vote
-        log_string = "User {} change vote from {} to {} for question {}"
         logger.info(
-            log_string.format(
-                request.user.username,
-                previous_choice,
-                selected_choice.choice_text,
-                question.question_text
-                )
-            )
+            "User %s change vote from %s to %s for question %s",
+            username,
+            previous_choice.choice_text,
+            selected_choice.choice_text,
+            question.question_text,
+            extra=log_extra
+        )
 
         # Visual confirmation to user that their change already got recorded
         message_txt = "You have change your voted from {} to {}"
         messages.success(
             request,
-            message_txt.format(previous_choice, selected_choice.choice_text)
+            message_txt.format(
+                previous_choice.choice_text,
+                selected_choice.choice_text
+            )
         )
 
-    except Vote.DoesNotExist as err:
-
-        # If user hasn't vote yet just insert a new vote to model
-        Vote.objects.create(user=this_user, choice=selected_choice)
+    else:
 
         # Log user vote
-        logger.exception(
-            f"User {username} never vote for question {q_text} %s",
-            err
-            )
-        logger.info(f"User {username} has vote {c_text} for question {q_text}")
+        logger.info(
+            "User %s has vote %s for question %s",
+            username,
+            selected_choice.choice_text,
+            question.question_text,
+            extra=log_extra
+        )
 
         # Visual confirmation to user that their vote already got recorded
-        messages.success(request, f"Your vote for {c_text} has been updated")
+        messages.success(
+            request,
+            f"Your vote for {selected_choice.choice_text} has been updated"
+        )
 
-    # Always return an HttpResponseRedirect after successfully dealing
-    # with POST data. This prevents data from being posted twice if a
-    # user hits the Back button.
-    return HttpResponseRedirect(
-            reverse("polls:results", args=(question.id,))  # type: ignore
-            )
+
+def get_choice_id(request, question) -> Optional[str]:
+    """Return choice id from vote form, warn user if it is missing.
+
+    Args:
+        request (django.http.HttpRequest): http request from django
+        question (Question): question that user vote
+
+    Returns:
+        str | None: choice id, None if user doesn't select any choice
+    """
+    choice_id = request.POST.get("choice", "")
+    if choice_id:
+        return choice_id
+
+    # Warn user if they doesn't select any choice
+    messages.warning(request, "You haven't select the choice")
+    logger.warning(
+        "User %s doesn't select a choice",
+        request.user.username,
+        extra={"username": request.user.username, "question_id": question.id}
+    )
+    return None
+
+
+def warn_invalid_choice(request, question, choice_id: str) -> None:
+    """Warn user that selected a choice from different polls."""
+    messages.warning(request, "You have selected a invalid choice")
+    logger.warning(
+        "User %s select invalid choice %s",
+        request.user.username,
+        choice_id,
+        extra={"username": request.user.username, "question_id": question.id}
+    )
+
+
+def get_selected_choice(request, question) -> Optional[Choice]:
+    """Return choice that user select, warn user if it is invalid.
+
+    Args:
+        request (django.http.HttpRequest): http request from django
+        question (Question): question that user vote
+
+    Returns:
+        Choice | None: selected choice, None if user doesn't select any
+                       choice or select a choice from different polls
+    """
+    choice_id = get_choice_id(request, question)
+    if choice_id is None:
+        return None
+
+    selected_choice = None
+    if choice_id.isdecimal():
+        selected_choice = question.choice_set.filter(pk=choice_id).first()
+
+    if selected_choice is None:
+        warn_invalid_choice(request, question, choice_id)
+
+    return selected_choice
+
+
+def queue_vote(request, question, selected_choice) -> None:
+    """Queue a validated vote to be written by the vote buffer.
+
+    Caller must remember the vote in session with remember_pending_vote()
+    so this user see their vote before the buffer got flushed.
+
+    Args:
+        request (django.http.HttpRequest): http request from django
+        question (Question): question that user vote
+        selected_choice (Choice): choice that user select
+    """
+    get_vote_buffer().submit(request.user.id, question.id, selected_choice.id)
+
+    logger.info(
+        "User %s queued vote %s for question %s",
+        request.user.username,
+        selected_choice.choice_text,
+        question.question_text,
+        extra={
+            "username": request.user.username,
+            "question_id": question.id,
+            "choice_id": selected_choice.id,
+        }
+    )
+    messages.success(
+        request,
+        f"Your vote for {selected_choice.choice_text} has been recorded"
+    )